@@ -197,6 +197,46 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'scrapper': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+
+# Local model bundle (scrapper.registry); build it with 'manage.py build_model_bundle'
+MODEL_BUNDLE_DIR = env('MODEL_BUNDLE_DIR', default=str(BASE_DIR / 'models'))
+MODEL_BUNDLE_ALLOW_REMOTE = env.bool('MODEL_BUNDLE_ALLOW_REMOTE', default=False)
+
+# Sentiment model (scrapper.service.SentimentEngine)
+SENTIMENT_MODEL_NAME = env('SENTIMENT_MODEL_NAME', default='nlptown/bert-base-multilingual-uncased-sentiment')
+SENTIMENT_BATCH_SIZE = env.int('SENTIMENT_BATCH_SIZE', default=32)
+SENTIMENT_MAX_LENGTH = env.int('SENTIMENT_MAX_LENGTH', default=128)
+TORCH_NUM_THREADS = env.int('TORCH_NUM_THREADS', default=None)
+# torch (fp32), quantized (int8 dynamic quantization) or onnx (needs onnxruntime)
+SENTIMENT_BACKEND = env('SENTIMENT_BACKEND', default='torch')
+SENTIMENT_ONNX_PATH = env('SENTIMENT_ONNX_PATH', default=str(BASE_DIR / 'models' / 'sentiment.onnx'))
+
+# Emergency classifier (scrapper.service.EmergencyClassifier)
+EMERGENCY_MODEL_PATH = env('EMERGENCY_MODEL_PATH', default='TWEETS_MODEL.model')
+EMERGENCY_BATCH_SIZE = env.int('EMERGENCY_BATCH_SIZE', default=64)
+
+# Background search poller ('manage.py poll_tweets'); queries come from the
+# WatchQuery watchlist, POLL_QUERIES is used while it is empty
+POLL_QUERIES = env.list('POLL_QUERIES', default=['#indianrailway'])
+POLL_INTERVAL = env.int('POLL_INTERVAL', default=15)
+POLL_PAGE_SIZE = env.int('POLL_PAGE_SIZE', default=100)
+POLL_MAX_PAGES = env.int('POLL_MAX_PAGES', default=10)
+POLL_WORKERS = env.int('POLL_WORKERS', default=8)
+# Search requests allowed per window for the whole app (standard v1.1 search: 180 per 15 minutes)
+POLL_RATE_LIMIT = env.int('POLL_RATE_LIMIT', default=180)
+POLL_RATE_WINDOW = env.int('POLL_RATE_WINDOW', default=900)
+
 
 API_KEY = env('API_KEY')
 API_SECRET = env('API_SECRET')
@@ -9,4 +9,12 @@ class TweetAdmin(admin.ModelAdmin):
     list_display = ('id', 'score', 'text', 'is_negative', 'is_reviewd', 'is_emergency', 'created')
     list_editable = ('is_negative', 'is_reviewd', 'is_emergency')
 
-admin.site.register(models.Tweet, TweetAdmin)
\ No newline at end of file
+admin.site.register(models.Tweet, TweetAdmin)
+
+class WatchQueryAdmin(admin.ModelAdmin):
+    model = models.WatchQuery
+    list_display = ('term', 'kind', 'exclude', 'max_requests', 'is_active', 'created')
+    list_editable = ('max_requests', 'is_active')
+    list_filter = ('kind', 'is_active')
+
+admin.site.register(models.WatchQuery, WatchQueryAdmin)
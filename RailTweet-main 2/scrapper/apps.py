@@ -1,5 +1,17 @@
+import logging
+import time
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+_import_started = time.perf_counter()
+
 
 class ScrapperConfig(AppConfig):
     name = 'scrapper'
+
+    def ready(self):
+        # ML models are loaded lazily by scrapper.registry, so this should stay small
+        logger.info(
+            f"scrapper app loaded in {time.perf_counter() - _import_started:.2f}s "
+            f"(ML models load on first use or via 'manage.py warm_models')")
@@ -0,0 +1,126 @@
+import csv
+import hashlib
+import io
+import time
+import uuid
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Tweet
+
+# Columns written for each imported row; everything else keeps its NULL default
+COPY_COLUMNS = [
+    'id', 'content_hash', 'text', 'username', 'likes', 'score', 'is_negative',
+    'is_reviewd', 'is_emergency', 'is_testing_record', 'created',
+]
+
+
+def row_hash(label, text):
+    return hashlib.sha256(f"{label}\x1f{text}".encode('utf-8')).hexdigest()
+
+
+def iter_labelled_rows(path):
+    """
+    Stream (label, text) pairs from a labelled tweet CSV
+    :param path: CSV with the label ("emergency" or "feedback") in the first
+                 column and the tweet text in the second
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) > 1:
+                yield row[0].strip(), row[1]
+
+
+def iter_chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TweetCsvImporter:
+    """
+    Loads labelled training tweets in chunks. Every row carries a content
+    hash, so re-running an import only adds rows that are not stored yet.
+    PostgreSQL gets a COPY FROM STDIN fast path; other backends use bulk_create.
+    """
+
+    def __init__(self, chunk_size=5000, use_copy=None, username='sample'):
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.username = username
+
+    def run(self, path, progress=None):
+        """
+        :param path: CSV file to import
+        :param progress: optional callable receiving a stats dict after each chunk
+        :return: stats dict with rows, inserted, skipped, seconds and rows_per_sec
+        """
+        stats = {'rows': 0, 'inserted': 0, 'skipped': 0}
+        started = time.perf_counter()
+        for chunk in iter_chunks(iter_labelled_rows(path), self.chunk_size):
+            rows = self.prepare(chunk)
+            inserted = self.copy_rows(rows) if self.use_copy else self.bulk_create_rows(rows)
+            stats['rows'] += len(chunk)
+            stats['inserted'] += inserted
+            stats['skipped'] = stats['rows'] - stats['inserted']
+            stats['seconds'] = time.perf_counter() - started
+            stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+            if progress:
+                progress(dict(stats))
+        return stats
+
+    def prepare(self, chunk):
+        # Rows repeated within one chunk would conflict with each other
+        rows = {}
+        for label, text in chunk:
+            rows.setdefault(row_hash(label, text), (label, text))
+        return rows
+
+    def bulk_create_rows(self, rows):
+        with transaction.atomic():
+            existing = set(
+                Tweet.objects.filter(content_hash__in=list(rows)).values_list('content_hash', flat=True)
+            )
+            new = [
+                Tweet(
+                    content_hash=content_hash,
+                    text=text,
+                    username=self.username,
+                    is_emergency=label == 'emergency',
+                    is_testing_record=True,
+                )
+                for content_hash, (label, text) in rows.items()
+                if content_hash not in existing
+            ]
+            Tweet.objects.bulk_create(new, ignore_conflicts=True)
+        return len(new)
+
+    def copy_rows(self, rows):
+        table = Tweet._meta.db_table
+        columns = ', '.join(COPY_COLUMNS)
+        created = timezone.now().isoformat()
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for content_hash, (label, text) in rows.items():
+            writer.writerow([
+                uuid.uuid4().hex, content_hash, text, self.username, 0, 0, False,
+                False, label == 'emergency', True, created,
+            ])
+        buffer.seek(0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE tweet_import (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.cursor.copy_expert(
+                f"COPY tweet_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM tweet_import "
+                f"ON CONFLICT (content_hash) DO NOTHING")
+            return cursor.rowcount
@@ -0,0 +1,63 @@
+from django.db import transaction
+
+from .models import Tweet
+
+UPDATE_FIELDS = ['tweet', 'text', 'username', 'timestamp', 'likes']
+
+
+def normalize_status(item):
+    """
+    Map a tweepy Status from the search API to Tweet field values
+    :param item: tweepy Status
+    :return: dict of Tweet fields
+    """
+    return {
+        'tid': item.id_str,
+        'tweet': item.text,
+        'text': item.text,
+        'username': item.user.name,
+        'timestamp': item.created_at,
+        'likes': item.favorite_count,
+    }
+
+
+def ingest_tweets(rows, user=None):
+    """
+    Upsert a page of tweets keyed on tid with a constant number of queries
+    :param rows: dicts as returned by normalize_status
+    :param user: optional owner stored on every ingested tweet
+    :return: dict with inserted and updated counts
+    """
+    # Later duplicates in the page win, like repeated saves would
+    by_tid = {row['tid']: row for row in rows if row.get('tid')}
+    if not by_tid:
+        return {'inserted': 0, 'updated': 0}
+
+    fields = UPDATE_FIELDS + (['user'] if user is not None else [])
+
+    with transaction.atomic():
+        existing = {
+            tweet.tid: tweet
+            for tweet in Tweet.objects.filter(tid__in=list(by_tid)).only('id', 'tid')
+        }
+
+        to_update = []
+        to_create = []
+        for tid, row in by_tid.items():
+            tweet = existing.get(tid) or Tweet(tid=tid)
+            for field in UPDATE_FIELDS:
+                setattr(tweet, field, row.get(field))
+            if user is not None:
+                tweet.user = user
+            (to_update if tid in existing else to_create).append(tweet)
+
+        # ignore_conflicts covers a concurrent ingester inserting the same tid
+        Tweet.objects.bulk_create(to_create, ignore_conflicts=True)
+        Tweet.objects.bulk_update(to_update, fields)
+
+    return {'inserted': len(to_create), 'updated': len(to_update)}
+
+
+def ingest_statuses(statuses, user=None):
+    """Normalize and upsert tweepy search results"""
+    return ingest_tweets([normalize_status(item) for item in statuses], user=user)
@@ -0,0 +1,98 @@
+import csv
+import resource
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper.service import SENTIMENT_BACKENDS, create_sentiment_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Check a sentiment backend against the fp32 torch model and benchmark "
+        "throughput, batch latency and peak memory on the labelled tweet CSV. "
+        "Peak RSS is cumulative for the process, so compare memory using "
+        "separate runs with --backend torch and --backend <candidate>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', default='quantized', choices=sorted(SENTIMENT_BACKENDS))
+        parser.add_argument('--csv', default=str(settings.BASE_DIR / 'static' / 'tweets_formatted_data.csv'))
+        parser.add_argument('--limit', type=int, default=None, help="Number of tweets to score")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--repeat', type=int, default=3, help="Timed passes per backend")
+        parser.add_argument('--min-agreement', type=float, default=0.95,
+                            help="Minimum share of tweets that must get the same star rating")
+
+    def handle(self, *args, **options):
+        texts = self.load_texts(options['csv'], options['limit'])
+        self.stdout.write(f"Loaded {len(texts)} tweets from {options['csv']}")
+
+        reference = create_sentiment_engine('torch', batch_size=options['batch_size'])
+        reference_logits = self.benchmark('torch', reference, texts, options['repeat'])
+
+        if options['backend'] == 'torch':
+            return
+
+        candidate = create_sentiment_engine(options['backend'], batch_size=options['batch_size'])
+        candidate_logits = self.benchmark(options['backend'], candidate, texts, options['repeat'])
+
+        agreement = sum(
+            int(ref.argmax()) == int(cand.argmax())
+            for ref, cand in zip(reference_logits, candidate_logits)
+        ) / len(texts)
+        max_diff = max(
+            float(abs(ref - cand).max())
+            for ref, cand in zip(reference_logits, candidate_logits)
+        )
+        self.stdout.write(
+            f"Parity {options['backend']} vs torch: {agreement:.2%} identical ratings, "
+            f"max logit difference {max_diff:.4f}"
+        )
+        if agreement < options['min_agreement']:
+            raise CommandError(
+                f"{options['backend']} agrees with fp32 on only {agreement:.2%} of tweets "
+                f"(minimum {options['min_agreement']:.2%})"
+            )
+        self.stdout.write(self.style.SUCCESS("Parity check passed"))
+
+    def load_texts(self, path, limit):
+        with open(path, newline='') as f:
+            texts = [row[1] for row in csv.reader(f) if len(row) > 1]
+        if not texts:
+            raise CommandError(f"No tweets found in {path}")
+        return texts[:limit] if limit else texts
+
+    def benchmark(self, name, engine, texts, repeat):
+        started = time.perf_counter()
+        engine.load()
+        load_time = time.perf_counter() - started
+
+        # Warm-up pass so one-off allocations are not timed
+        logits = engine.logits_many(texts[:engine.batch_size])
+
+        batch_latencies = []
+        total_time = 0.0
+        for _ in range(repeat):
+            logits = []
+            for i in range(0, len(texts), engine.batch_size):
+                batch = texts[i:i + engine.batch_size]
+                started = time.perf_counter()
+                logits.extend(engine.logits_many(batch))
+                elapsed = time.perf_counter() - started
+                batch_latencies.append(elapsed)
+                total_time += elapsed
+
+        latencies_ms = sorted(latency * 1000 for latency in batch_latencies)
+        p95 = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(
+            f"{name}: load {load_time:.1f}s, "
+            f"{len(texts) * repeat / total_time:.1f} tweets/s, "
+            f"batch of {engine.batch_size} p50 {statistics.median(latencies_ms):.1f}ms "
+            f"p95 {p95:.1f}ms, peak RSS {peak_rss_mb:.0f}MB"
+        )
+        return logits
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper.registry import path_checksum, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch registered models from their sources into MODEL_BUNDLE_DIR and "
+        "record their checksums in manifest.json, so workers never download "
+        "models at runtime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Models to bundle (default: all registered)")
+
+    def handle(self, *args, **options):
+        import scrapper.service  # noqa: F401 registers the models
+
+        names = options['names'] or registry.names
+        unknown = set(names) - set(registry.names)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+
+        os.makedirs(registry.bundle_dir, exist_ok=True)
+        entries = {}
+        for name in names:
+            source = registry.source(name)
+            target = os.path.join(registry.bundle_dir, name)
+            self.stdout.write(f"Bundling {name} from {source}")
+            if os.path.exists(target):
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+            self.fetch(source, target)
+            entries[name] = {
+                'path': name,
+                'source': source,
+                'sha256': path_checksum(target),
+            }
+
+        registry.write_manifest(entries)
+        self.stdout.write(self.style.SUCCESS(
+            f"Bundled {len(entries)} models into {registry.bundle_dir}"))
+
+    def fetch(self, source, target):
+        if os.path.isdir(source):
+            shutil.copytree(source, target)
+        elif os.path.isfile(source):
+            shutil.copy2(source, target)
+        elif source.startswith('https://tfhub.dev/'):
+            import tensorflow_hub as hub
+            shutil.copytree(hub.resolve(source), target)
+        else:
+            # Hugging Face model id
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            AutoTokenizer.from_pretrained(source).save_pretrained(target)
+            AutoModelForSequenceClassification.from_pretrained(source).save_pretrained(target)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper.importer import TweetCsvImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a labelled tweet CSV (label,text) as testing records. Streams the "
+        "file in chunks, uses COPY on PostgreSQL and skips rows already imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help="Path to the CSV file")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Use bulk_create even on PostgreSQL")
+
+    def handle(self, *args, **options):
+        importer = TweetCsvImporter(
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+        )
+        self.stdout.write(
+            f"Importing {options['csv']} with {'COPY' if importer.use_copy else 'bulk_create'}")
+        try:
+            stats = importer.run(options['csv'], progress=self.report)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['inserted']} inserted, {stats['skipped']} already present, "
+            f"{stats['rows_per_sec']:.0f} rows/s"))
+
+    def report(self, stats):
+        self.stdout.write(
+            f"{stats['rows']} rows ({stats['inserted']} new) "
+            f"in {stats['seconds']:.1f}s, {stats['rows_per_sec']:.0f} rows/s")
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scrapper.poller import FakeSearchAPI, RateBudget, TweetPoller, analyze_tweets, search_api
+
+
+class Command(BaseCommand):
+    help = (
+        "Poll the Twitter search API for the watchlist on a schedule. Fetches queries "
+        "concurrently with a since_id cursor and rate budget each, drops tweets matched "
+        "by several queries and sends new tweets through bulk ingest and analysis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', dest='queries',
+                            help="Search query to poll instead of the watchlist; repeat for several")
+        parser.add_argument('--interval', type=float,
+                            default=getattr(settings, 'POLL_INTERVAL', 15),
+                            help="Seconds between polling rounds")
+        parser.add_argument('--once', action='store_true', help="Poll every query once and exit")
+        parser.add_argument('--count', type=int, default=getattr(settings, 'POLL_PAGE_SIZE', 100),
+                            help="Tweets per search page (at most 100)")
+        parser.add_argument('--max-pages', type=int, default=getattr(settings, 'POLL_MAX_PAGES', 10),
+                            help="Pages fetched per query and round; longer sweeps resume next round")
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'POLL_WORKERS', 8),
+                            help="Queries fetched concurrently")
+        parser.add_argument('--no-analyze', action='store_true',
+                            help="Only store tweets, skip sentiment and emergency analysis")
+        parser.add_argument('--fixtures',
+                            help="Replay statuses from a JSON or labelled CSV file instead of calling Twitter")
+        parser.add_argument('--speed', type=float,
+                            help="Replay fixtures this many times faster than real time "
+                                 "(default: everything is visible at once)")
+
+    def handle(self, *args, **options):
+        if options['fixtures']:
+            clients = {'api': FakeSearchAPI.from_file(options['fixtures'], speed=options['speed'])}
+        else:
+            # One client per fetch thread, so each reads its own rate-limit headers
+            clients = {'api_factory': search_api}
+
+        window = getattr(settings, 'POLL_RATE_WINDOW', 900)
+        poller = TweetPoller(
+            queries=options['queries'],
+            count=options['count'],
+            max_pages=options['max_pages'],
+            analyze=None if options['no_analyze'] else analyze_tweets,
+            workers=options['workers'],
+            budget=RateBudget(getattr(settings, 'POLL_RATE_LIMIT', 180), window),
+            window=window,
+            **clients,
+        )
+        queries = poller.watchlist()
+        self.stdout.write(f"Polling {len(queries)} queries every {options['interval']:g}s")
+        try:
+            poller.run(interval=options['interval'], once=options['once'], progress=self.report)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+
+    def report(self, stats):
+        if stats['fetched']:
+            self.stdout.write(
+                f"{stats['fetched']} fetched from {len(stats['queries'])} queries, "
+                f"{stats['duplicates']} duplicates, {stats['inserted']} new, "
+                f"{stats['updated']} updated in {stats['seconds']:.1f}s")
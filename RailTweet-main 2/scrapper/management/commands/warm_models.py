@@ -0,0 +1,29 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapper.registry import registry
+
+
+class Command(BaseCommand):
+    help = "Load ML models ahead of traffic, or only verify the model bundle checksums."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Models to load (default: all registered)")
+        parser.add_argument('--verify-only', action='store_true',
+                            help="Check bundle checksums without loading anything")
+
+    def handle(self, *args, **options):
+        import scrapper.service  # noqa: F401 registers the models
+
+        try:
+            if options['verify_only']:
+                for name in options['names'] or sorted(registry.manifest()):
+                    registry.verify(name)
+                    self.stdout.write(f"{name}: checksum ok")
+                return
+
+            for name, seconds in registry.warm_up(options['names'] or None).items():
+                self.stdout.write(f"{name}: loaded in {seconds:.1f}s")
+        except (ImproperlyConfigured, KeyError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS("Models ready"))
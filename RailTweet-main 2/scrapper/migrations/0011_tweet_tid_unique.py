@@ -0,0 +1,42 @@
+# Generated by Django 4.0 on 2026-10-16 10:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def clear_duplicate_tids(apps, schema_editor):
+    # Imported sample tweets have no Twitter id and 0003 back-filled tid=1,
+    # so keep the newest row per tid and clear it on the others
+    Tweet = apps.get_model('scrapper', 'Tweet')
+    Tweet.objects.filter(tid='').update(tid=None)
+    duplicates = (
+        Tweet.objects.exclude(tid=None)
+        .values('tid')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+        .values_list('tid', flat=True)
+    )
+    for tid in list(duplicates):
+        keep = Tweet.objects.filter(tid=tid).order_by('-created').values_list('id', flat=True).first()
+        Tweet.objects.filter(tid=tid).exclude(id=keep).update(tid=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper', '0010_tweet_tweet'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tweet',
+            name='tid',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(clear_duplicate_tids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tweet',
+            name='tid',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
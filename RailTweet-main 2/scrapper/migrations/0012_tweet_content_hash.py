@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-16 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper', '0011_tweet_tid_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0 on 2026-10-16 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper', '0012_tweet_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=500, unique=True)),
+                ('since_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
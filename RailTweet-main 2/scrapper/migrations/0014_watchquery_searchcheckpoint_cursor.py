@@ -0,0 +1,38 @@
+# Generated by Django 4.0 on 2026-10-16 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapper', '0013_searchcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchcheckpoint',
+            name='max_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchcheckpoint',
+            name='newest_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='WatchQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hashtag', 'Hashtag'), ('handle', 'Handle'), ('keyword', 'Keyword')], default='hashtag', max_length=10)),
+                ('term', models.CharField(max_length=200)),
+                ('exclude', models.CharField(blank=True, default='', help_text='Space separated words to leave out', max_length=200)),
+                ('max_requests', models.PositiveIntegerField(default=15)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'term')},
+            },
+        ),
+    ]
@@ -11,7 +11,7 @@ class Tweet(models.Model):
     user            = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     category        = models.ForeignKey('Category', on_delete=models.CASCADE, null=True, blank=True)
     id              = models.UUIDField(default = uuid.uuid4, primary_key=True, editable = False)
-    tid             = models.CharField(max_length=100)
+    tid             = models.CharField(max_length=100, unique=True, null=True, blank=True)
     username        = models.CharField(max_length=500, blank=True, null=True)
     tweet           = models.CharField(max_length=500, blank=True, null=True)
     text            = models.CharField(max_length=500, blank=True, null=True)
@@ -25,6 +25,7 @@ class Tweet(models.Model):
     is_emergency    = models.BooleanField(default=False)
 
     is_testing_record = models.BooleanField(default=False)
+    content_hash    = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
 
     created         = models.DateTimeField(auto_now_add=True)
@@ -51,4 +52,57 @@ class Category(models.Model):
     
     def __str__(self):
         return self.name
-    
\ No newline at end of file
+    
+
+class SearchCheckpoint(models.Model):
+    query     = models.CharField(max_length=500, unique=True)
+    since_id  = models.CharField(max_length=100, blank=True, null=True)
+    # A sweep that ran out of pages or budget resumes below max_id; newest_id
+    # becomes since_id once it reaches the old since_id
+    max_id    = models.CharField(max_length=100, blank=True, null=True)
+    newest_id = models.CharField(max_length=100, blank=True, null=True)
+
+    created   = models.DateTimeField(auto_now_add=True)
+    updated   = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.query
+
+
+class WatchQuery(models.Model):
+    HASHTAG = 'hashtag'
+    HANDLE = 'handle'
+    KEYWORD = 'keyword'
+    KIND_CHOICES = (
+        (HASHTAG, 'Hashtag'),
+        (HANDLE, 'Handle'),
+        (KEYWORD, 'Keyword'),
+    )
+
+    kind         = models.CharField(max_length=10, choices=KIND_CHOICES, default=HASHTAG)
+    term         = models.CharField(max_length=200)
+    exclude      = models.CharField(max_length=200, blank=True, default='',
+                                    help_text="Space separated words to leave out")
+    # Search requests this query may use per rate-limit window
+    max_requests = models.PositiveIntegerField(default=15)
+    is_active    = models.BooleanField(default=True)
+
+    created      = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('kind', 'term')
+
+    def __str__(self):
+        return self.query
+
+    @property
+    def query(self):
+        """Search API query string for this watchlist entry"""
+        term = self.term.strip()
+        if self.kind == self.HASHTAG:
+            query = '#' + term.lstrip('#')
+        elif self.kind == self.HANDLE:
+            query = '@' + term.lstrip('@')
+        else:
+            query = f'"{term}"' if ' ' in term else term
+        return ' '.join([query] + ['-' + word for word in self.exclude.split()])
@@ -0,0 +1,485 @@
+import json
+import logging
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import tweepy
+from django.conf import settings
+
+from .ingest import ingest_statuses
+from .models import SearchCheckpoint, Tweet, WatchQuery
+
+logger = logging.getLogger(__name__)
+
+TWITTER_DATE_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+
+
+def search_api():
+    """tweepy API client authenticated with the project's Twitter credentials"""
+    auth = tweepy.OAuthHandler(settings.API_KEY, settings.API_SECRET)
+    auth.set_access_token(settings.ACCESS_TOKEN, settings.ACCESS_SECRET)
+    return tweepy.API(auth)
+
+
+def analyze_tweets(tweets):
+    """
+    Score sentiment and classify emergencies for newly ingested tweets
+    :param tweets: list of Tweet objects
+    """
+    from .service import classify_many, get_sentiments
+
+    if not tweets:
+        return
+    for tweet, score in zip(tweets, get_sentiments([tweet.text for tweet in tweets])):
+        tweet.score = score
+    Tweet.objects.bulk_update(tweets, ['score'])
+    classify_many(tweets)
+
+
+class RateBudget:
+    """
+    Search requests left in a rate-limit window, shared between fetch threads.
+
+    The app-wide budget is re-synced from the x-rate-limit headers of each
+    response; per-query budgets only count their own requests. Responses
+    come back out of order from concurrent threads, so a sync never lowers
+    the count within a window.
+    """
+
+    def __init__(self, limit, window=900, clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self.used = 0
+        self.reset_at = clock() + window
+        self._synced_reset = None
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take one request from the budget; False once the window is spent"""
+        with self._lock:
+            now = self.clock()
+            if now >= self.reset_at:
+                self.used = 0
+                self.reset_at = now + self.window
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    def sync(self, headers):
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if remaining is None or reset is None:
+            return
+        reset = int(reset)
+        with self._lock:
+            if self._synced_reset is not None and reset < self._synced_reset:
+                return  # Response from a window already over
+            self.limit = int(headers.get('x-rate-limit-limit', self.limit))
+            used = self.limit - int(remaining)
+            if self._synced_reset is None or reset == self._synced_reset:
+                # Requests other threads have taken may not be counted in this response yet
+                used = max(self.used, used)
+            self.used = used
+            self.reset_at = self._synced_reset = reset
+
+
+class TweetPoller:
+    """
+    Incremental poller for the standard search API over a watchlist of queries.
+
+    Queries come from the active WatchQuery rows (re-read every round) or an
+    explicit list. Each round fetches all queries concurrently; fetch threads
+    only make HTTP calls. Tweets matched by several queries are collapsed in
+    memory, together with tweets stored in recent rounds, and the rest go
+    through one bulk ingest and analysis pass.
+
+    Every query keeps a SearchCheckpoint cursor. A sweep pages backwards with
+    max_id from the newest match down to since_id. A sweep cut short by
+    max_pages or by the query's or the app's rate budget resumes from max_id
+    next round, so nothing is skipped, and since_id only advances once the
+    sweep completes and its tweets are stored. Queries polled least recently
+    go first, so queries skipped for budget are not starved.
+
+    tweepy.API keeps the rate-limit headers of its last call in
+    ``last_response``, so concurrent fetch threads must not share one client.
+    Pass ``api_factory`` to give each thread its own; a single ``api`` is
+    called by one thread at a time.
+    """
+
+    def __init__(self, api=None, queries=None, count=100, max_pages=None, lang='en',
+                 analyze=analyze_tweets, user=None, workers=1, budget=None, window=900,
+                 sleep=time.sleep, clock=time.time, max_retries=5, max_backoff=300, seen_size=100000,
+                 api_factory=None):
+        if api is None and api_factory is None:
+            raise ValueError("TweetPoller needs an api or an api_factory")
+        self.api = api
+        self.api_factory = api_factory
+        self._local = threading.local()
+        self._api_lock = threading.Lock()
+        self.queries = list(queries) if queries is not None else None
+        self.count = count
+        self.max_pages = max_pages
+        self.lang = lang
+        self.analyze = analyze
+        self.user = user
+        self.workers = workers
+        self.budget = budget
+        self.window = window
+        self.sleep = sleep
+        self.clock = clock
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.seen_size = seen_size
+        self._seen = OrderedDict()
+        self._query_budgets = {}
+
+    def watchlist(self):
+        """
+        Queries to poll this round
+        :return: dict of query string to its per-window request budget, or None for no limit
+        """
+        if self.queries is not None:
+            return {query: None for query in self.queries}
+        watchlist = {
+            watch.query: watch.max_requests
+            for watch in WatchQuery.objects.filter(is_active=True)
+        }
+        return watchlist or {query: None for query in getattr(settings, 'POLL_QUERIES', [])}
+
+    def _query_budget(self, query, max_requests):
+        if max_requests is None:
+            return None
+        budget = self._query_budgets.get(query)
+        if budget is None:
+            budget = self._query_budgets[query] = RateBudget(max_requests, self.window, clock=self.clock)
+        budget.limit = max_requests
+        return budget
+
+    def _wait_for_reset(self, headers, attempt):
+        reset = (headers or {}).get('x-rate-limit-reset')
+        if reset is not None:
+            delay = max(0, int(reset) - self.clock()) + 1
+        else:
+            delay = min(self.max_backoff, 2 ** attempt * 15)
+        logger.info(f"Search rate limit reached, sleeping {delay:.0f}s")
+        self.sleep(delay)
+
+    def _client(self):
+        if self.api_factory is None:
+            return self.api
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._local.api = self.api_factory()
+        return api
+
+    def _search(self, query, **params):
+        api = self._client()
+        for attempt in range(self.max_retries):
+            try:
+                # Read last_response before another thread's call on a shared client replaces it
+                with self._api_lock if self.api_factory is None else nullcontext():
+                    page = api.search_tweets(
+                        q=query, count=self.count, lang=self.lang, result_type='recent', **params)
+                    response = getattr(api, 'last_response', None)
+            except tweepy.errors.TooManyRequests as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                self._wait_for_reset(e.response.headers, attempt)
+                continue
+            except tweepy.errors.TwitterServerError as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = min(self.max_backoff, 2 ** attempt)
+                logger.warning(f"Search failed for {query!r} ({e}), retrying in {delay}s")
+                self.sleep(delay)
+                continue
+
+            headers = response.headers if response is not None else {}
+            if self.budget is not None:
+                self.budget.sync(headers)
+            else:
+                # Spend the last call of a window, then wait instead of collecting a 429
+                remaining = headers.get('x-rate-limit-remaining')
+                if remaining is not None and int(remaining) <= 0:
+                    self._wait_for_reset(headers, attempt)
+            return page
+
+    def fetch(self, query, checkpoint, budget=None):
+        """
+        Page through new results for one query without touching the database
+        :param checkpoint: the query's SearchCheckpoint; its cursor is advanced in place
+        :param budget: optional RateBudget for this query's requests
+        :return: dict with the statuses, pages fetched and whether the sweep completed
+        """
+        statuses = []
+        max_id = checkpoint.max_id
+        newest = int(checkpoint.newest_id) if checkpoint.newest_id else None
+        pages = 0
+        complete = False
+
+        while self.max_pages is None or pages < self.max_pages:
+            if budget is not None and not budget.try_acquire():
+                break
+            if self.budget is not None and not self.budget.try_acquire():
+                break
+            params = {}
+            if checkpoint.since_id:
+                params['since_id'] = checkpoint.since_id
+            if max_id is not None:
+                params['max_id'] = max_id
+            page = self._search(query, **params)
+            pages += 1
+            if not page:
+                complete = True
+                break
+
+            statuses.extend(page)
+            ids = [item.id for item in page]
+            newest = max(ids) if newest is None else max(newest, max(ids))
+            max_id = min(ids) - 1
+            # search_metadata.next_results is absent on the last page
+            if not getattr(page, 'next_results', True):
+                complete = True
+                break
+
+        if complete:
+            if newest is not None:
+                checkpoint.since_id = str(newest)
+            checkpoint.max_id = checkpoint.newest_id = None
+        elif pages:
+            checkpoint.max_id = str(max_id) if max_id is not None else None
+            checkpoint.newest_id = str(newest) if newest is not None else None
+        return {'statuses': statuses, 'pages': pages, 'complete': complete}
+
+    def handle_page(self, page):
+        """
+        Ingest one page of statuses and analyze the tweets not scored yet
+        :return: dict with inserted and updated counts
+        """
+        stats = ingest_statuses(page, user=self.user)
+        if self.analyze is not None:
+            # score stays 0 until analysis, so a failed batch is picked up on the next poll
+            self.analyze(list(Tweet.objects.filter(tid__in=[item.id_str for item in page], score=0)))
+        return stats
+
+    def _remember(self, ids):
+        for id in ids:
+            self._seen[id] = None
+            self._seen.move_to_end(id)
+        while len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+
+    def poll(self):
+        """
+        Poll the watchlist once
+        :return: dict with per-query stats and the round's fetched, duplicates,
+                 inserted, updated and seconds totals
+        """
+        started = time.perf_counter()
+        watchlist = self.watchlist()
+        SearchCheckpoint.objects.bulk_create(
+            [SearchCheckpoint(query=query) for query in watchlist], ignore_conflicts=True)
+        checkpoints = {
+            checkpoint.query: checkpoint
+            for checkpoint in SearchCheckpoint.objects.filter(query__in=list(watchlist))
+        }
+        queries = sorted(watchlist, key=lambda query: checkpoints[query].updated)
+
+        def fetch(query):
+            try:
+                return self.fetch(query, checkpoints[query], self._query_budget(query, watchlist[query]))
+            except Exception:
+                logger.exception(f"Polling {query!r} failed")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = list(executor.map(fetch, queries))
+
+        stats = {'queries': [], 'fetched': 0, 'duplicates': 0, 'inserted': 0, 'updated': 0}
+        unique = {}
+        for query, result in zip(queries, results):
+            if result is None:
+                stats['queries'].append({'query': query, 'pages': 0, 'fetched': 0, 'failed': True})
+                continue
+            stats['queries'].append({
+                'query': query,
+                'pages': result['pages'],
+                'fetched': len(result['statuses']),
+                'complete': result['complete'],
+            })
+            for status in result['statuses']:
+                stats['fetched'] += 1
+                if status.id in unique or status.id in self._seen:
+                    stats['duplicates'] += 1
+                else:
+                    unique[status.id] = status
+
+        statuses = list(unique.values())
+        for i in range(0, len(statuses), 1000):
+            counts = self.handle_page(statuses[i:i + 1000])
+            stats['inserted'] += counts['inserted']
+            stats['updated'] += counts['updated']
+        self._remember(unique)
+
+        for query, result in zip(queries, results):
+            if result is not None and result['pages']:
+                checkpoints[query].save(update_fields=['since_id', 'max_id', 'newest_id', 'updated'])
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    def run(self, interval=15, once=False, progress=None):
+        """
+        Poll the watchlist every ``interval`` seconds
+        :param once: stop after a single round
+        :param progress: optional callable receiving the stats of each round
+        """
+        while True:
+            started = time.monotonic()
+            try:
+                stats = self.poll()
+            except Exception:
+                if once:
+                    raise
+                logger.exception("Polling round failed")
+            else:
+                if progress:
+                    progress(stats)
+                if once:
+                    return stats
+            self.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.reason = 'Too Many Requests' if status_code == 429 else 'OK'
+        self.headers = headers
+
+    def json(self):
+        return {'errors': [{'code': 88, 'message': 'Rate limit exceeded'}]} if self.status_code == 429 else {}
+
+
+def statuses_from_csv(path, spacing=1.0, first_id=1500000000000000000):
+    """
+    Build search API status dicts from a labelled tweet CSV (label,text)
+    :param spacing: seconds between consecutive tweets, starting now
+    """
+    from .importer import iter_labelled_rows
+
+    start = datetime.now(timezone.utc)
+    return [
+        {
+            'id': first_id + i,
+            'id_str': str(first_id + i),
+            'text': text,
+            'created_at': (start + timedelta(seconds=i * spacing)).strftime(TWITTER_DATE_FORMAT),
+            'favorite_count': 0,
+            'user': {'id': i, 'name': 'sample', 'screen_name': 'sample'},
+        }
+        for i, (_, text) in enumerate(iter_labelled_rows(path))
+    ]
+
+
+class FakeSearchAPI:
+    """
+    Offline stand-in for tweepy.API.search_tweets that replays fixture statuses.
+
+    Statuses are v1.1 JSON dicts. With ``speed`` set they become searchable
+    as replay time passes their created_at (relative to the first status),
+    ``speed`` times faster than real time; otherwise all are visible at once.
+    since_id/max_id paging, next_results and the rate-limit headers and 429
+    behaviour of the real endpoint are emulated, so TweetPoller can be
+    exercised without credentials or network. ``latency`` adds a delay to
+    every call, like a round trip to Twitter would.
+    """
+
+    def __init__(self, statuses, speed=None, match=True, rate_limit=180, window=900,
+                 latency=0.0, clock=time.time):
+        self.statuses = sorted(statuses, key=lambda status: status['id'], reverse=True)
+        self.offsets = {}
+        if self.statuses:
+            created = {status['id']: parsedate_to_datetime(status['created_at']) for status in self.statuses}
+            first = min(created.values())
+            self.offsets = {id: (at - first).total_seconds() for id, at in created.items()}
+        self.speed = speed
+        self.match = match
+        self.rate_limit = rate_limit
+        self.window = window
+        self.latency = latency
+        self.clock = clock
+        self.started = clock()
+        self.window_start = self.started
+        self.calls = 0
+        self.last_response = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load fixtures from a JSON list of statuses or a labelled tweet CSV"""
+        if str(path).endswith('.csv'):
+            kwargs.setdefault('match', False)
+            return cls(statuses_from_csv(path), **kwargs)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('statuses', []) if isinstance(data, dict) else data, **kwargs)
+
+    def _rate_headers(self):
+        return {
+            'x-rate-limit-limit': str(self.rate_limit),
+            'x-rate-limit-remaining': str(max(0, self.rate_limit - self.calls)),
+            'x-rate-limit-reset': str(int(self.window_start + self.window)),
+        }
+
+    def _matches(self, query, text):
+        if not self.match:
+            return True
+        try:
+            terms = shlex.split(query.lower())
+        except ValueError:
+            terms = query.lower().split()
+        text = text.lower()
+        for term in terms:
+            if term == 'or' or ':' in term:
+                continue
+            if term.startswith('-'):
+                if term[1:] in text:
+                    return False
+            elif term not in text:
+                return False
+        return True
+
+    def search_tweets(self, q, count=15, since_id=None, max_id=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        now = self.clock()
+        with self._lock:
+            if now >= self.window_start + self.window:
+                self.window_start, self.calls = now, 0
+            if self.calls >= self.rate_limit:
+                self.last_response = _FakeResponse(429, self._rate_headers())
+                raise tweepy.errors.TooManyRequests(self.last_response)
+            self.calls += 1
+            self.last_response = _FakeResponse(200, self._rate_headers())
+
+        replayed = None if self.speed is None else (now - self.started) * self.speed
+        matches = [
+            status for status in self.statuses
+            if (replayed is None or self.offsets[status['id']] <= replayed)
+            and (since_id is None or status['id'] > int(since_id))
+            and (max_id is None or status['id'] <= int(max_id))
+            and self._matches(q, status['text'])
+        ]
+        page = matches[:count]
+
+        results = tweepy.models.SearchResults()
+        results.extend(tweepy.models.Status.parse(self, status) for status in page)
+        results.next_results = f"?max_id={page[-1]['id'] - 1}" if len(matches) > count else None
+        return results
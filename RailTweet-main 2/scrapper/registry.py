@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def path_checksum(path):
+    """
+    SHA-256 of a model file, or of every file below a model directory
+    :param path: file or directory in the bundle
+    :return: hex digest, stable across machines
+    """
+    digest = hashlib.sha256()
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    for file in files:
+        digest.update(os.path.relpath(file, path).encode('utf-8'))
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Lazily loaded ML models, resolved from a local on-disk bundle.
+
+    Each model is registered with a loader and the source it was built from
+    (a TF-Hub URL, a Hugging Face id or a local path). Nothing is loaded or
+    downloaded until ``get`` is called, either on first use or from the
+    ``warm_models`` management command. Bundled models are checked against
+    the checksums in ``manifest.json`` before their first load.
+    """
+
+    def __init__(self, bundle_dir=None, allow_remote=None):
+        self._bundle_dir = bundle_dir
+        self._allow_remote = allow_remote
+        self._models = {}
+        self._loaded = {}
+        self._verified = set()
+        self._manifest = None
+        self._lock = threading.RLock()
+
+    @property
+    def bundle_dir(self):
+        return str(self._bundle_dir or getattr(
+            settings, 'MODEL_BUNDLE_DIR', os.path.join(settings.BASE_DIR, 'models')))
+
+    @property
+    def allow_remote(self):
+        if self._allow_remote is not None:
+            return self._allow_remote
+        return getattr(settings, 'MODEL_BUNDLE_ALLOW_REMOTE', False)
+
+    @property
+    def names(self):
+        return list(self._models)
+
+    def register(self, name, source, loader):
+        """
+        :param name: registry key, also the entry name in manifest.json
+        :param source: remote id or local path used to build the bundle
+        :param loader: callable taking the resolved path and returning the model
+        """
+        self._models[name] = {'source': source, 'loader': loader}
+
+    def source(self, name):
+        return self._models[name]['source']
+
+    def manifest(self):
+        if self._manifest is None:
+            manifest_path = os.path.join(self.bundle_dir, MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {}
+        return self._manifest
+
+    def write_manifest(self, entries):
+        """Record bundle entries, keeping entries for models not rebuilt"""
+        with self._lock:
+            self._manifest = None
+            manifest = dict(self.manifest())
+            manifest.update(entries)
+            manifest_path = os.path.join(self.bundle_dir, MANIFEST_NAME)
+            tmp_path = manifest_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, manifest_path)
+            self._manifest = manifest
+            self._verified.clear()
+
+    def verify(self, name):
+        """Check a bundled model against its manifest checksum"""
+        entry = self.manifest()[name]
+        path = os.path.join(self.bundle_dir, entry['path'])
+        if not os.path.exists(path):
+            raise ImproperlyConfigured(f"Model bundle entry {name!r} is missing: {path}")
+        checksum = path_checksum(path)
+        if checksum != entry['sha256']:
+            raise ImproperlyConfigured(
+                f"Checksum mismatch for model {name!r} in {path}: "
+                f"expected {entry['sha256']}, got {checksum}")
+        return path
+
+    def path(self, name):
+        """
+        Resolve where a model should be loaded from
+        :return: verified bundle path, or the registered source when it is a
+                 local path or MODEL_BUNDLE_ALLOW_REMOTE is set
+        """
+        if name in self.manifest():
+            with self._lock:
+                if name not in self._verified:
+                    self.verify(name)
+                    self._verified.add(name)
+            return os.path.join(self.bundle_dir, self.manifest()[name]['path'])
+
+        source = self.source(name)
+        if os.path.exists(source) or self.allow_remote:
+            return source
+        raise ImproperlyConfigured(
+            f"Model {name!r} is not in the bundle at {self.bundle_dir}. "
+            f"Run 'manage.py build_model_bundle' or set MODEL_BUNDLE_ALLOW_REMOTE.")
+
+    def get(self, name):
+        """Return the loaded model, loading it on first use"""
+        if name not in self._loaded:
+            with self._lock:
+                if name not in self._loaded:
+                    started = time.perf_counter()
+                    self._loaded[name] = self._models[name]['loader'](self.path(name))
+                    logger.info(f"Loaded model {name} in {time.perf_counter() - started:.2f}s")
+        return self._loaded[name]
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def warm_up(self, names=None):
+        """Load the given models, or every registered model, ahead of traffic"""
+        timings = {}
+        for name in names or self.names:
+            started = time.perf_counter()
+            self.get(name)
+            timings[name] = time.perf_counter() - started
+        return timings
+
+
+registry = ModelRegistry()
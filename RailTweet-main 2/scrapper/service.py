@@ -1,27 +1,253 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import tensorflow as tf
-import tensorflow_hub as hub
-import tensorflow_text as text
-import pandas as pd
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .registry import registry
 import os
+import threading
 
-bert_preprocess = hub.KerasLayer("https://tfhub.dev/tensorflow/bert_en_uncased_preprocess/3")
-bert_encoder = hub.KerasLayer("https://tfhub.dev/tensorflow/bert_en_uncased_L-12_H-768_A-12/4")
+# torch, tensorflow and transformers are imported inside the functions that
+# need them, so web workers that never run inference do not pay for them.
+
+BERT_PREPROCESS_URL = "https://tfhub.dev/tensorflow/bert_en_uncased_preprocess/3"
+BERT_ENCODER_URL = "https://tfhub.dev/tensorflow/bert_en_uncased_L-12_H-768_A-12/4"
 tr_model = None
 
 
+def _load_keras_layer(path):
+    import tensorflow_hub as hub
+    import tensorflow_text  # noqa: F401 registers the ops used by the preprocess model
+    return hub.KerasLayer(path)
+
+
+registry.register('bert_preprocess', BERT_PREPROCESS_URL, _load_keras_layer)
+registry.register('bert_encoder', BERT_ENCODER_URL, _load_keras_layer)
+
+
+class SentimentEngine:
+    """
+    Long-lived wrapper around the nlptown BERT sentiment model.
+
+    The tokenizer and model are loaded once, on first use, and reused for
+    every prediction in the process. Texts are scored in padded batches
+    under ``torch.inference_mode()``.
+    """
+
+    def __init__(self, model_name=None, batch_size=None, max_length=None, num_threads=None):
+        # None resolves through the model registry on load
+        self.model_name = model_name
+        self.batch_size = batch_size or getattr(settings, 'SENTIMENT_BATCH_SIZE', 32)
+        self.max_length = max_length or getattr(settings, 'SENTIMENT_MAX_LENGTH', 128)
+        self.num_threads = num_threads or getattr(settings, 'TORCH_NUM_THREADS', None)
+        self.tokenizer = None
+        self.model = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            import torch
+            from transformers import AutoTokenizer
+
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            if self.model_name is None:
+                self.model_name = registry.path('sentiment')
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._load_model()
+            self._loaded = True
+
+    def _load_model(self):
+        from transformers import AutoModelForSequenceClassification
+
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        self.model = model
+
+    def _tokenize(self, batch, return_tensors='pt'):
+        return self.tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors=return_tensors,
+        )
+
+    def _logits(self, batch):
+        import torch
+
+        tokens = self._tokenize(batch)
+        with torch.inference_mode():
+            return self.model(**tokens).logits.numpy()
+
+    def logits_many(self, texts):
+        """Return the raw 5-class logits for every text, in input order"""
+        self.load()
+        rows = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = [text or '' for text in texts[i:i + self.batch_size]]
+            rows.extend(self._logits(batch))
+        return rows
+
+    def predict_many(self, texts):
+        """Return a 1-5 star score for every text, in input order"""
+        return [int(row.argmax()) + 1 for row in self.logits_many(texts)]
+
+    def predict(self, text):
+        return self.predict_many([text])[0]
+
+
+class QuantizedSentimentEngine(SentimentEngine):
+    """SentimentEngine with int8 dynamically quantized Linear layers for CPU inference"""
+
+    def _load_model(self):
+        import torch
+
+        super()._load_model()
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentimentEngine(SentimentEngine):
+    """
+    SentimentEngine backed by onnxruntime. The model is exported to
+    ``SENTIMENT_ONNX_PATH`` the first time it is loaded if the file is missing.
+    """
+
+    def __init__(self, onnx_path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.onnx_path = str(onnx_path or getattr(
+            settings, 'SENTIMENT_ONNX_PATH', os.path.join(settings.BASE_DIR, 'models', 'sentiment.onnx')))
+
+    def _load_model(self):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImproperlyConfigured("SENTIMENT_BACKEND 'onnx' requires the onnxruntime package")
+
+        if not os.path.exists(self.onnx_path):
+            self.export(self.onnx_path)
+
+        options = onnxruntime.SessionOptions()
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.model = onnxruntime.InferenceSession(
+            self.onnx_path, options, providers=['CPUExecutionProvider'])
+        self._input_names = [i.name for i in self.model.get_inputs()]
+
+    # Different lengths, so the parity check also covers padding and the attention mask
+    PARITY_TEXTS = [
+        'Train was on time and the coach was clean',
+        'Terrible',
+        'No water in the coach for six hours, nobody from the staff responded to complaints',
+    ]
+
+    def export(self, path):
+        import inspect
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        sample = self._tokenize(self.PARITY_TEXTS)
+        # Graph inputs follow forward()'s parameter order, not the tokenizer's key
+        # order; naming them in tokenizer order would feed token_type_ids as the mask
+        input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['logits'] = {0: 'batch'}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                ({name: sample[name] for name in input_names},),
+                path,
+                input_names=input_names,
+                output_names=['logits'],
+                dynamic_axes=dynamic_axes,
+                opset_version=13,
+            )
+            expected = model(**sample).logits.numpy()
+        self._check_parity(path, expected)
+
+    def _check_parity(self, path, expected, atol=1e-3):
+        """Compare the exported graph's logits with PyTorch's; removes the file on mismatch"""
+        import numpy as np
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+        tokens = self._tokenize(self.PARITY_TEXTS, return_tensors='np')
+        feed = {i.name: tokens[i.name] for i in session.get_inputs()}
+        actual = session.run(['logits'], feed)[0]
+        if not np.allclose(actual, expected, atol=atol):
+            os.remove(path)
+            raise RuntimeError(
+                f"ONNX export of {self.model_name} does not match PyTorch "
+                f"(max logit difference {np.abs(actual - expected).max():.4f})")
+
+    def _logits(self, batch):
+        tokens = self._tokenize(batch, return_tensors='np')
+        feed = {name: tokens[name] for name in self._input_names}
+        return self.model.run(['logits'], feed)[0]
+
+
+SENTIMENT_BACKENDS = {
+    'torch': SentimentEngine,
+    'quantized': QuantizedSentimentEngine,
+    'onnx': OnnxSentimentEngine,
+}
+
+_sentiment_engine = None
+_sentiment_engine_lock = threading.Lock()
+
+
+def create_sentiment_engine(backend=None, **kwargs):
+    backend = backend or getattr(settings, 'SENTIMENT_BACKEND', 'torch')
+    try:
+        engine_class = SENTIMENT_BACKENDS[backend]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown SENTIMENT_BACKEND {backend!r}, expected one of {sorted(SENTIMENT_BACKENDS)}")
+    return engine_class(**kwargs)
+
+
+def get_sentiment_engine():
+    global _sentiment_engine
+    if _sentiment_engine is None:
+        with _sentiment_engine_lock:
+            if _sentiment_engine is None:
+                _sentiment_engine = create_sentiment_engine()
+    return _sentiment_engine
+
+
+def _load_sentiment_engine(path):
+    engine = get_sentiment_engine()
+    engine.load()
+    return engine
+
+
+registry.register(
+    'sentiment',
+    getattr(settings, 'SENTIMENT_MODEL_NAME', 'nlptown/bert-base-multilingual-uncased-sentiment'),
+    _load_sentiment_engine,
+)
+
+
 def get_sentiment(text):
+    return get_sentiment_engine().predict(text)
+
 
-    tokenizer = AutoTokenizer.from_pretrained('nlptown/bert-base-multilingual-uncased-sentiment')
-    model = AutoModelForSequenceClassification.from_pretrained('nlptown/bert-base-multilingual-uncased-sentiment')
-    tokens = tokenizer.encode(text, return_tensors='pt')
-    result = model(tokens)
-    return int(torch.argmax(result.logits))+1
+def get_sentiments(texts):
+    return get_sentiment_engine().predict_many(list(texts))
 
 
 def train_model(tweets):
+    import pandas as pd
+    import tensorflow as tf
+
+    bert_preprocess = registry.get('bert_preprocess')
+    bert_encoder = registry.get('bert_encoder')
+
     df = pd.DataFrame(list(tweets.values()))
     print(df)
     desc = df.groupby('is_emergency').describe()
@@ -109,25 +335,110 @@ def train_model(tweets):
     return classification_report(y_test, y_predicted)
 
 
+class EmergencyClassifier:
+    """
+    TWEETS_MODEL emergency classifier, loaded once per process and applied
+    to tweets in batches. Results are written back with ``bulk_update``.
+    """
+
+    def __init__(self, model_path=None, batch_size=None, threshold=0.5):
+        # None resolves through the model registry on load
+        self.model_path = model_path
+        self.batch_size = batch_size or getattr(settings, 'EMERGENCY_BATCH_SIZE', 64)
+        self.threshold = threshold
+        self.model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                import tensorflow as tf
+                import tensorflow_text  # noqa: F401 needed by the BERT preprocess layer
+
+                if self.model_path is None:
+                    self.model_path = registry.path('emergency')
+                self.model = tf.keras.models.load_model(self.model_path)
+
+    def predict_many(self, texts):
+        """Return the emergency probability for every text, in input order"""
+        self.load()
+        if not texts:
+            return []
+        scores = self.model.predict([text or '' for text in texts], batch_size=self.batch_size)
+        return [float(score) for score in scores.flatten()]
+
+    def classify_many(self, tweets, save=True):
+        """
+        Classify tweets as emergency or feedback
+        :param tweets: Tweet queryset or iterable of Tweet objects
+        :param save: persist is_emergency/is_negative with bulk_update
+        :return: list of dicts with the tweet, its score and is_emergency
+        """
+        if hasattr(tweets, 'iterator'):
+            tweets = tweets.iterator(chunk_size=self.batch_size * 10)
+
+        results = []
+        chunk = []
+        for tweet in tweets:
+            chunk.append(tweet)
+            if len(chunk) == self.batch_size * 10:
+                results.extend(self._classify_chunk(chunk, save))
+                chunk = []
+        if chunk:
+            results.extend(self._classify_chunk(chunk, save))
+        return results
+
+    def _classify_chunk(self, tweets, save):
+        from .models import Tweet
+
+        scores = self.predict_many([tweet.text for tweet in tweets])
+        results = []
+        for tweet, score in zip(tweets, scores):
+            tweet.is_emergency = score > self.threshold
+            tweet.is_negative = tweet.is_emergency
+            results.append({
+                'tweet': tweet,
+                'score': score,
+                'is_emergency': tweet.is_emergency,
+            })
+        if save:
+            Tweet.objects.bulk_update(tweets, ['is_emergency', 'is_negative'])
+        return results
+
+
+_emergency_classifier = None
+_emergency_classifier_lock = threading.Lock()
+
+
+def get_emergency_classifier():
+    global _emergency_classifier
+    if _emergency_classifier is None:
+        with _emergency_classifier_lock:
+            if _emergency_classifier is None:
+                _emergency_classifier = EmergencyClassifier()
+    return _emergency_classifier
+
+
+def _load_emergency_classifier(path):
+    classifier = get_emergency_classifier()
+    classifier.load()
+    return classifier
+
+
+registry.register(
+    'emergency',
+    getattr(settings, 'EMERGENCY_MODEL_PATH', 'TWEETS_MODEL.model'),
+    _load_emergency_classifier,
+)
+
+
+def classify_many(tweets, save=True):
+    return get_emergency_classifier().classify_many(tweets, save=save)
+
+
 def test_model(tweet):
-    arr = []
-    arr.append(tweet.text)
-    model = tf.keras.models.load_model('TWEETS_MODEL.model')
-    score = model.predict(arr)
-    print(score)
-    if float(score) > 0.5:
-        review = 'Emergency'
-        tweet.is_negative = True
-        tweet.is_emergency = True
-        tweet.save
-    else:
-        review = 'Feedback'
-        tweet.is_negative = False
-        tweet.save
-
-    data = {
-        'score': score,
-        'is_emergency': True if score > 0.5 else False
+    result = classify_many([tweet])[0]
+    return {
+        'score': result['score'],
+        'is_emergency': result['is_emergency'],
     }
-
-    return data
@@ -1,3 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import SearchCheckpoint, Tweet
+from .poller import TWITTER_DATE_FORMAT, FakeSearchAPI, RateBudget, TweetPoller
+
+FIRST_ID = 1500000000000000000
+
+
+def status(offset, text):
+    """A search API status dict, ``offset`` ids and seconds after the first one"""
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=offset)
+    return {
+        'id': FIRST_ID + offset,
+        'id_str': str(FIRST_ID + offset),
+        'text': text,
+        'created_at': created.strftime(TWITTER_DATE_FORMAT),
+        'favorite_count': 0,
+        'user': {'id': offset, 'name': 'passenger', 'screen_name': 'passenger'},
+    }
+
+
+class FakeClock:
+    """Clock and sleep for FakeSearchAPI and TweetPoller that only move when slept"""
+
+    def __init__(self, now=1700000000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TweetPollerTests(TestCase):
+
+    def poller(self, api, queries, **kwargs):
+        return TweetPoller(api, queries=queries, count=2, analyze=None, **kwargs)
+
+    def test_since_id_advances_to_newest_stored_tweet(self):
+        api = FakeSearchAPI([status(i, f'train {i} delayed') for i in range(5)])
+        poller = self.poller(api, ['train'])
+
+        stats = poller.poll()
+        self.assertEqual(stats['inserted'], 5)
+        self.assertEqual(SearchCheckpoint.objects.get(query='train').since_id, str(FIRST_ID + 4))
+
+        api.statuses.insert(0, status(5, 'train 5 delayed'))
+        api.offsets[FIRST_ID + 5] = 5
+        calls = api.calls
+        stats = poller.poll()
+        self.assertEqual(stats['fetched'], 1)
+        self.assertEqual(stats['inserted'], 1)
+        self.assertEqual(api.calls - calls, 1)
+        self.assertEqual(SearchCheckpoint.objects.get(query='train').since_id, str(FIRST_ID + 5))
+
+    def test_sweep_cut_short_by_max_pages_resumes_from_max_id(self):
+        api = FakeSearchAPI([status(i, f'train {i} delayed') for i in range(5)])
+        poller = self.poller(api, ['train'], max_pages=1)
+
+        fetched = []
+        for _ in range(3):
+            stats = poller.poll()
+            fetched.append(stats['fetched'])
+            checkpoint = SearchCheckpoint.objects.get(query='train')
+            if stats['queries'][0]['complete']:
+                break
+            self.assertIsNone(checkpoint.since_id)
+            self.assertIsNotNone(checkpoint.max_id)
+
+        self.assertEqual(fetched, [2, 2, 1])
+        self.assertEqual(checkpoint.since_id, str(FIRST_ID + 4))
+        self.assertIsNone(checkpoint.max_id)
+        self.assertIsNone(checkpoint.newest_id)
+        self.assertEqual(Tweet.objects.count(), 5)
+
+    def test_rate_limited_search_sleeps_until_window_reset(self):
+        clock = FakeClock()
+        api = FakeSearchAPI([status(0, 'train delayed')], rate_limit=1, window=900, clock=clock)
+        api.calls = api.rate_limit  # window already spent
+        poller = self.poller(api, ['train'], sleep=clock.sleep, clock=clock)
+
+        stats = poller.poll()
+        self.assertEqual(stats['inserted'], 1)
+        # Until the window resets after the 429, then again after the last call of the new window
+        self.assertEqual(clock.sleeps, [901, 901])
+
+    def test_tweets_matched_by_several_queries_are_ingested_once(self):
+        api = FakeSearchAPI([
+            status(0, 'train delayed'),
+            status(1, 'fire in train'),
+            status(2, 'fire at station'),
+        ])
+        poller = self.poller(api, ['train', 'fire'], workers=2)
+
+        stats = poller.poll()
+        self.assertEqual(stats['fetched'], 4)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['inserted'], 3)
+        self.assertEqual(Tweet.objects.count(), 3)
+
+        stats = poller.poll()
+        self.assertEqual(stats['fetched'], 0)
+        self.assertEqual(stats['inserted'], 0)
+
+    def test_concurrent_fetches_stay_within_a_tight_app_budget(self):
+        clock = FakeClock()
+        queries = [f'train {n}' for n in range(8)]
+        api = FakeSearchAPI(
+            [status(i, f'train {i % 8} delayed') for i in range(80)], rate_limit=5, latency=0.01, clock=clock)
+        budget = RateBudget(5, clock=clock)
+        poller = self.poller(api, queries, workers=4, budget=budget, sleep=clock.sleep, clock=clock)
+
+        stats = poller.poll()
+        self.assertEqual(api.calls, 5)
+        self.assertEqual(budget.used, 5)
+        self.assertEqual(clock.sleeps, [])  # no 429 to wait out
+        self.assertFalse(any(query.get('failed') for query in stats['queries']))
+        self.assertEqual(sum(query['pages'] for query in stats['queries']), 5)
+
+
+class RateBudgetTests(TestCase):
+
+    def test_sync_from_an_older_response_keeps_later_requests(self):
+        budget = RateBudget(10, clock=FakeClock())
+        for _ in range(3):
+            budget.try_acquire()
+        budget.sync({'x-rate-limit-limit': '10', 'x-rate-limit-remaining': '9', 'x-rate-limit-reset': '1700000900'})
+        self.assertEqual(budget.used, 3)
+        budget.sync({'x-rate-limit-limit': '10', 'x-rate-limit-remaining': '4', 'x-rate-limit-reset': '1700000900'})
+        self.assertEqual(budget.used, 6)
+        # A late response from the previous window is ignored, a new window starts over
+        budget.sync({'x-rate-limit-limit': '10', 'x-rate-limit-remaining': '0', 'x-rate-limit-reset': '1700000000'})
+        self.assertEqual(budget.used, 6)
+        budget.sync({'x-rate-limit-limit': '10', 'x-rate-limit-remaining': '9', 'x-rate-limit-reset': '1700001800'})
+        self.assertEqual(budget.used, 1)
@@ -9,5 +9,6 @@ urlpatterns = [
     path('train/', views.train, name='train'),
     path('test/', views.test, name='test'),
     path('test/<slug:id>/', views.test, name='test'),
+    path('classify/', views.classify, name='classify'),
     path('import_data/', views.import_data, name='import_data')
 ]
@@ -3,10 +3,9 @@ from django.contrib.auth.decorators import login_required
 from scrapper.models import Tweet
 from django.views.generic import ListView
 import requests
-import tweepy
 from django.conf import settings
+from django.core.exceptions import ValidationError
 import re
-import csv
 
 
 @login_required
@@ -48,52 +47,50 @@ def test(request, id=None):
     }
     return render(request, template, context)
 
+def classify(request):
+    from scrapper.service import classify_many
+    template = 'dashboard/train.html'
+    ids = request.POST.getlist('id') or request.GET.getlist('id')
+    if not ids:
+        ids = [i for i in (request.POST.get('ids') or request.GET.get('ids', '')).split(',') if i]
+
+    try:
+        result = classify_many(Tweet.objects.filter(id__in=ids)) if ids else "Give the ids in input to process"
+    except ValidationError:
+        result = "Invalid tweet id in input"
+
+    context = {
+        "title": "Classification Result",
+        "is_batch_test_result": isinstance(result, list),
+        "is_train_result": not isinstance(result, list),
+        "result": result
+    }
+    return render(request, template, context)
+
 def import_data(request):
-    template = 'dashboard/import.html'
-    file = open('static/tweets_formatted_data.csv')
-    csv_file = csv.reader(file)
-    for row in csv_file:
-        is_emergency = True if str(row[0]) == "emergency" else False
-        Tweet.objects.create(
-            text=row[1],
-            username="sample",
-            is_emergency=is_emergency,
-            is_testing_record=True
-        )
+    from scrapper.importer import TweetCsvImporter
+    template = 'dashboard/train.html'
+    # Large datasets should go through 'manage.py import_tweets' instead
+    stats = TweetCsvImporter().run(settings.BASE_DIR / 'static' / 'tweets_formatted_data.csv')
+    context = {
+        "title": "Import Result",
+        "is_train_result": True,
+        "result": f"Imported {stats['inserted']} tweets, {stats['skipped']} already present",
+    }
+    return render(request, template, context)
 
 
 @login_required
 def fetch_tweets(request):
     template = 'dashboard/fetch_tweets.html'
 
-    api_key = settings.API_KEY
-    api_secret = settings.API_SECRET
-    bearer_token = settings.BEARER_TOKEN
-    access_token = settings.ACCESS_TOKEN
-    aacess_secret = settings.ACCESS_SECRET
-
-    auth = tweepy.OAuthHandler(api_key, api_secret)
-    auth.set_access_token(access_token, aacess_secret)
-    api = tweepy.API(auth)
-
-    result = api.search_tweets(q='#indianrailway', lang='en', count=20)
-    for item in result:
-        try:
-            t = Tweet.objects.get(tid=item.id_str)
-        except Tweet.DoesNotExist:
-            t = Tweet.objects.create(tid=item.id_str)
-
-        t.tid=item.id_str
-        t.tweet = item.text
-        t.text= item.text
-        t.username= item.user.name
-        t.user= request.user
-        t.timestamp= item.created_at
-        t.likes= item.favorite_count
-        t.save()
+    # Tweets are fetched from Twitter by 'manage.py poll_tweets' only; searching
+    # here would hold the request through rate-limit waits and race the
+    # worker's checkpoints, so show what it has stored
+    result = Tweet.objects.exclude(timestamp=None).order_by('-timestamp')[:20]
 
     context = {
-        "result": result
+        "result": result,
     }
     return render(request, template, context)
 
@@ -0,0 +1,142 @@
+from azure.ai.textanalytics import TextAnalyticsClient
+from azure.ai.textanalytics.aio import TextAnalyticsClient as AsyncTextAnalyticsClient
+from azure.core.credentials import AzureKeyCredential
+from azure.identity import DefaultAzureCredential
+from azure.keyvault.secrets import SecretClient
+from azure.storage.blob import BlobServiceClient
+from concurrent.futures import ThreadPoolExecutor
+from .azure_settings import AZURE_COGNITIVE_ENDPOINT, AZURE_COGNITIVE_KEY, AZURE_SECRET_TTL, KEY_VAULT_URL
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class AzureProvider:
+    """
+    Process-wide Azure credential, clients and Key Vault secret cache.
+
+    Clients are created on first use and shared, so their connection pools
+    and the credential's token cache are reused across requests. Secrets are
+    cached for ``secret_ttl`` seconds; once stale they are still served while
+    a background refresh fetches the new value. Credentials, clients and the
+    refresh thread are recreated after a fork (gunicorn preloading), while
+    cached secret values carry over.
+    """
+
+    def __init__(self, secret_ttl=None):
+        self.secret_ttl = AZURE_SECRET_TTL if secret_ttl is None else secret_ttl
+        self._secrets = {}  # name -> (value, fetched_at)
+        self._lock = threading.RLock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._clients = {}
+        self._refreshing = set()
+        self._executor = None
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # Sockets, locks held by other threads and worker threads do not survive a fork
+        if self._pid != os.getpid():
+            self._lock = threading.RLock()
+            self._reset()
+
+    def _client(self, key, factory):
+        self._check_fork()
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = factory()
+        return client
+
+    @property
+    def credential(self):
+        return self._client('credential', DefaultAzureCredential)
+
+    def secret_client(self):
+        return self._client(
+            'secrets', lambda: SecretClient(vault_url=KEY_VAULT_URL, credential=self.credential))
+
+    @property
+    def text_analytics_credential(self):
+        # Shared by the sync and async clients, so clear() rotates the key for both
+        return self._client('text_analytics_credential', lambda: AzureKeyCredential(AZURE_COGNITIVE_KEY))
+
+    def text_analytics_client(self):
+        return self._client('text_analytics', lambda: TextAnalyticsClient(
+            endpoint=AZURE_COGNITIVE_ENDPOINT,
+            credential=self.text_analytics_credential,
+        ))
+
+    def async_text_analytics_client(self):
+        """
+        Return a new aio TextAnalyticsClient on the shared credential. Its
+        connection pool is bound to the calling event loop, so it is not
+        cached here; get_async_analyzer keeps one per loop.
+        """
+        return AsyncTextAnalyticsClient(
+            endpoint=AZURE_COGNITIVE_ENDPOINT,
+            credential=self.text_analytics_credential,
+        )
+
+    def blob_service_client(self):
+        connection_string = self.get_secret('AZURE-STORAGE-CONNECTION-STRING')
+        # Keyed by the connection string so a rotated key gets a new client
+        return self._client(
+            ('blob', connection_string),
+            lambda: BlobServiceClient.from_connection_string(connection_string),
+        )
+
+    def _fetch_secret(self, name):
+        value = self.secret_client().get_secret(name).value
+        self._secrets[name] = (value, time.monotonic())
+        return value
+
+    def _refresh_secret(self, name):
+        try:
+            self._fetch_secret(name)
+        except Exception as e:
+            logger.error(f"Error refreshing secret {name}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def get_secret(self, name):
+        """
+        Return a Key Vault secret, from the cache when possible
+        Args:
+            name: Secret name
+        Returns:
+            str: Secret value, or None if it has never been fetched successfully
+        """
+        self._check_fork()
+        cached = self._secrets.get(name)
+        if cached is None:
+            try:
+                return self._fetch_secret(name)
+            except Exception as e:
+                logger.error(f"Error retrieving secret {name}: {str(e)}")
+                return None
+
+        value, fetched_at = cached
+        if time.monotonic() - fetched_at > self.secret_ttl:
+            with self._lock:
+                if name not in self._refreshing:
+                    self._refreshing.add(name)
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='azure-secrets')
+                    self._executor.submit(self._refresh_secret, name)
+        return value
+
+    def clear(self):
+        """Forget cached secrets and clients, e.g. after rotating credentials"""
+        with self._lock:
+            self._secrets = {}
+            self._clients = {}
+
+provider = AzureProvider()
@@ -1,6 +1,4 @@
 import os
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 
 # Azure Configuration
 AZURE_TENANT_ID = os.getenv('AZURE_TENANT_ID')
@@ -10,6 +8,8 @@ AZURE_CLIENT_SECRET = os.getenv('AZURE_CLIENT_SECRET')
 # Key Vault Configuration
 KEY_VAULT_NAME = os.getenv('KEY_VAULT_NAME')
 KEY_VAULT_URL = f"https://{KEY_VAULT_NAME}.vault.azure.net/"
+# Seconds a Key Vault secret is served from cache before it is refreshed in the background
+AZURE_SECRET_TTL = int(os.getenv('AZURE_SECRET_TTL', '300'))
 
 # Azure PostgreSQL Configuration
 AZURE_POSTGRESQL_HOST = os.getenv('AZURE_POSTGRESQL_HOST')
@@ -20,19 +20,54 @@ AZURE_POSTGRESQL_PASSWORD = os.getenv('AZURE_POSTGRESQL_PASSWORD')
 # Azure Cognitive Services
 AZURE_COGNITIVE_ENDPOINT = os.getenv('AZURE_COGNITIVE_ENDPOINT')
 AZURE_COGNITIVE_KEY = os.getenv('AZURE_COGNITIVE_KEY')
+# Pinned, because cached scores are tagged with it; 'latest' would keep serving
+# scores from before an Azure model upgrade
+AZURE_SENTIMENT_MODEL_VERSION = os.getenv('AZURE_SENTIMENT_MODEL_VERSION', '2022-11-01')
+AZURE_COGNITIVE_MAX_WORKERS = int(os.getenv('AZURE_COGNITIVE_MAX_WORKERS', '4'))
+AZURE_COGNITIVE_MAX_RETRIES = int(os.getenv('AZURE_COGNITIVE_MAX_RETRIES', '2'))
+
+# Sentiment result cache
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '10000'))
+SENTIMENT_CACHE_USE_DB = os.getenv('SENTIMENT_CACHE_USE_DB', 'True').lower() == 'true'
+
+# Micro-batching of single-tweet sentiment requests
+SENTIMENT_COALESCE_ENABLED = os.getenv('SENTIMENT_COALESCE_ENABLED', 'True').lower() == 'true'
+SENTIMENT_COALESCE_BATCH_SIZE = int(os.getenv('SENTIMENT_COALESCE_BATCH_SIZE', '10'))
+SENTIMENT_COALESCE_MAX_WAIT_MS = float(os.getenv('SENTIMENT_COALESCE_MAX_WAIT_MS', '5'))
+
+# Monthly tweet partitions kept in PostgreSQL before tiering to archive storage
+TWEET_HOT_DAYS = int(os.getenv('TWEET_HOT_DAYS', '90'))
+TWEET_PARTITION_MONTHS_AHEAD = int(os.getenv('TWEET_PARTITION_MONTHS_AHEAD', '3'))
+
+# Tweet archive storage: 'azure' (Blob Storage) or 'local' (a directory, for development)
+ARCHIVE_BACKEND = os.getenv('ARCHIVE_BACKEND', 'azure')
+ARCHIVE_LOCAL_DIR = os.getenv('ARCHIVE_LOCAL_DIR', 'archives')
+# Format for new archives: 'ndjson' (gzip NDJSON) or 'parquet' (day-partitioned, queryable)
+ARCHIVE_FORMAT = os.getenv('ARCHIVE_FORMAT', 'ndjson')
+# Seconds the archive manifest is cached in each process
+ARCHIVE_MANIFEST_TTL = int(os.getenv('ARCHIVE_MANIFEST_TTL', '60'))
+
+# Twitter API v2 recent search (scrapper.sources.TwitterSearchSource)
+TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN')
+TWITTER_SEARCH_QUERY = os.getenv('TWITTER_SEARCH_QUERY', '#indianrailway lang:en')
+
+# Ingest pipeline ('manage.py run_pipeline'): tweets per batch, queue capacity per
+# stage and concurrent sentiment batches
+PIPELINE_BATCH_SIZE = int(os.getenv('PIPELINE_BATCH_SIZE', '100'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '1000'))
+PIPELINE_SENTIMENT_WORKERS = int(os.getenv('PIPELINE_SENTIMENT_WORKERS', '4'))
+# Near-duplicate clustering: word-set Jaccard similarity at which tweets join a
+# cluster, and seconds a cluster keeps sharing its results
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.7'))
+NEAR_DUPLICATE_WINDOW = int(os.getenv('NEAR_DUPLICATE_WINDOW', '21600'))
 
 # Azure Application Insights
 APPLICATIONINSIGHTS_CONNECTION_STRING = os.getenv('APPLICATIONINSIGHTS_CONNECTION_STRING')
 
 def get_secret(secret_name):
-    """Retrieve a secret from Azure Key Vault"""
-    credential = DefaultAzureCredential()
-    client = SecretClient(vault_url=KEY_VAULT_URL, credential=credential)
-    try:
-        return client.get_secret(secret_name).value
-    except Exception as e:
-        print(f"Error retrieving secret {secret_name}: {str(e)}")
-        return None
+    """Retrieve a secret from Azure Key Vault, cached for AZURE_SECRET_TTL seconds"""
+    from .azure_clients import provider
+    return provider.get_secret(secret_name)
 
 # Database Configuration for Azure PostgreSQL
 DATABASES = {
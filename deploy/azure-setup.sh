@@ -100,6 +100,13 @@ az webapp create \
     --runtime "PYTHON|3.9" \
     --deployment-local-git
 
+# Serve the app through ASGI so async views do not block worker threads
+echo "Configuring startup command..."
+az webapp config set \
+    --resource-group $RESOURCE_GROUP \
+    --name $APP_NAME \
+    --startup-file "gunicorn railtweet.asgi:application -k uvicorn.workers.UvicornWorker"
+
 # Enable managed identity for the web app
 echo "Enabling managed identity..."
 az webapp identity assign \
@@ -0,0 +1,37 @@
+"""
+ASGI config for railtweet project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server so async views such as ``analyze_tweet_async``
+do not tie up a worker thread per request, e.g.:
+
+    gunicorn railtweet.asgi:application -k uvicorn.workers.UvicornWorker
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'railtweet.settings')
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """Route HTTP to Django and handle lifespan events it does not support"""
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Close the shared aio Text Analytics client and its connection pool
+            from scrapper.sentiment import close_async_analyzer
+            await close_async_analyzer()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -80,6 +80,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'railtweet.wsgi.application'
+ASGI_APPLICATION = 'railtweet.asgi.application'
 
 # Authentication settings
 AUTHENTICATION_BACKENDS = (
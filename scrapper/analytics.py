@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.db.models import Count, Q, Sum
+from .models import Tweet, TweetHourlyStats
+from .rollups import SENTIMENT_SCORES, hour_bucket
+
+def _raw_totals(start, end=None):
+    tweets = Tweet.objects.filter(timestamp__gte=start)
+    if end is not None:
+        tweets = tweets.filter(timestamp__lt=end)
+
+    # Conditional aggregates let the database compute everything in a single
+    # pass over the timestamp index instead of one scan per statistic
+    return tweets.aggregate(
+        tweet_count=Count('id'),
+        sentiment_sum=Sum('sentiment_score'),
+        emergency_count=Count('id', filter=Q(is_emergency=True)),
+        **{
+            f'sentiment_{score}_count': Count('id', filter=Q(sentiment_score=score))
+            for score in SENTIMENT_SCORES
+        },
+    )
+
+def _rollup_totals(start, end=None):
+    stats = TweetHourlyStats.objects.filter(hour__gte=start)
+    if end is not None:
+        stats = stats.filter(hour__lt=end)
+
+    fields = ['tweet_count', 'sentiment_sum', 'emergency_count'] + [
+        f'sentiment_{score}_count' for score in SENTIMENT_SCORES
+    ]
+    return stats.aggregate(**{field: Sum(field) for field in fields})
+
+def _summarize(totals):
+    tweet_count = totals['tweet_count'] or 0
+    # Unscored tweets add 0 to the sum and are left out of the average
+    scored_count = sum(totals[f'sentiment_{score}_count'] or 0 for score in SENTIMENT_SCORES)
+    return {
+        'total_tweets': tweet_count,
+        'avg_sentiment': (totals['sentiment_sum'] or 0) / scored_count if scored_count else 0,
+        'emergency_count': totals['emergency_count'] or 0,
+        'sentiment_distribution': [
+            {'sentiment_score': score, 'count': totals[f'sentiment_{score}_count']}
+            for score in SENTIMENT_SCORES
+            if totals[f'sentiment_{score}_count']
+        ],
+    }
+
+def analytics_for_window(start, end=None, use_rollups=False):
+    """
+    Compute dashboard analytics for tweets in a time window
+    Args:
+        start: Inclusive lower bound on tweet timestamp
+        end: Optional exclusive upper bound on tweet timestamp
+        use_rollups: Read whole hours from TweetHourlyStats instead of
+            scanning raw tweets; only the partial first hour is read raw
+    Returns:
+        dict: total_tweets, avg_sentiment, emergency_count and
+            sentiment_distribution (list of {'sentiment_score', 'count'})
+    """
+    if not use_rollups:
+        return _summarize(_raw_totals(start, end))
+
+    first_full_hour = hour_bucket(start)
+    if first_full_hour != start:
+        first_full_hour += timedelta(hours=1)
+    if end is not None and hour_bucket(end) != end:
+        # A partial last hour would need a second raw query; the dashboard never asks for one
+        raise ValueError("end must be on an hour boundary when use_rollups is set")
+    if end is not None and first_full_hour >= end:
+        return _summarize(_raw_totals(start, end))
+
+    totals = _rollup_totals(first_full_hour, end)
+    if first_full_hour != start:
+        for field, value in _raw_totals(start, first_full_hour).items():
+            totals[field] = (totals[field] or 0) + (value or 0)
+    return _summarize(totals)
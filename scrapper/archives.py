@@ -0,0 +1,301 @@
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobBlock, ContentSettings
+import base64
+import fcntl
+import hashlib
+import io
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Compressed bytes buffered before a block is staged or flushed
+BLOCK_SIZE = 4 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+# Archive formats and the name extension each is stored under
+ARCHIVE_FORMATS = {
+    'ndjson': '.ndjson.gz',
+    'parquet': '.parquet',
+}
+
+class ArchiveConflict(Exception):
+    """A versioned write lost a race with another writer"""
+
+class ChecksumWriter:
+    """Wraps an archive writer to count and hash the bytes passed through it"""
+
+    def __init__(self, writer, digest):
+        self.writer = writer
+        self.digest = digest
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        self.writer.write(data)
+
+    def commit(self):
+        self.writer.commit()
+
+    def abort(self):
+        self.writer.abort()
+
+class ChecksumBackend:
+    """
+    Backend wrapper that totals size and SHA-256 over every file written
+    through it, in write order. Parquet archives are several day files, so
+    their checksum covers the files in date order.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.digest = hashlib.sha256()
+        self.writers = []
+
+    @property
+    def size(self):
+        return sum(writer.size for writer in self.writers)
+
+    @property
+    def checksum(self):
+        return self.digest.hexdigest()
+
+    def open_writer(self, name, content_type='application/octet-stream'):
+        writer = ChecksumWriter(self.backend.open_writer(name, content_type), self.digest)
+        self.writers.append(writer)
+        return writer
+
+def _gzip_compressor():
+    return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+def _gzip_decompressor():
+    return zlib.decompressobj(31)
+
+class AzureBlobWriter:
+    """Uploads an archive as staged blocks, committed in one call at the end"""
+
+    def __init__(self, blob_client, content_type):
+        self.blob_client = blob_client
+        self.content_type = content_type
+        self.block_ids = []
+
+    def write(self, data):
+        block_id = base64.b64encode(f'{len(self.block_ids):08d}'.encode()).decode()
+        self.blob_client.stage_block(block_id, data)
+        self.block_ids.append(block_id)
+
+    def commit(self):
+        self.blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in self.block_ids],
+            content_settings=ContentSettings(content_type=self.content_type),
+        )
+
+    def abort(self):
+        # Uncommitted blocks are garbage collected by the service
+        self.block_ids = []
+
+class AzureBlobReader(io.RawIOBase):
+    """Seekable read-only view of a blob that fetches only the byte ranges asked for"""
+
+    def __init__(self, blob_client):
+        self.blob_client = blob_client
+        self.size = blob_client.get_blob_properties().size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = base + offset
+        return self.position
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self.blob_client.download_blob(offset=self.position, length=length).readall()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+class AzureBlobArchiveBackend:
+    """Archive storage in an Azure Blob Storage container"""
+
+    def __init__(self, container_client):
+        self.container_client = container_client
+
+    def open_writer(self, name, content_type='application/octet-stream'):
+        return AzureBlobWriter(self.container_client.get_blob_client(name), content_type)
+
+    def read_chunks(self, name):
+        yield from self.container_client.get_blob_client(name).download_blob().chunks()
+
+    def open_reader(self, name):
+        return io.BufferedReader(AzureBlobReader(self.container_client.get_blob_client(name)), READ_SIZE)
+
+    def list(self, prefix=None):
+        return [blob.name for blob in self.container_client.list_blobs(name_starts_with=prefix)]
+
+    def delete(self, name):
+        self.container_client.get_blob_client(name).delete_blob()
+
+    @property
+    def location(self):
+        return self.container_client.url
+
+    def read_versioned(self, name):
+        """Return (data, etag), or (None, None) if the blob does not exist"""
+        try:
+            downloader = self.container_client.get_blob_client(name).download_blob()
+        except ResourceNotFoundError:
+            return None, None
+        return downloader.readall(), downloader.properties.etag
+
+    def write_versioned(self, name, data, version):
+        """Replace a blob only if it is still at the version read, else raise ArchiveConflict"""
+        blob_client = self.container_client.get_blob_client(name)
+        try:
+            if version is None:
+                blob_client.upload_blob(data, overwrite=False)
+            else:
+                blob_client.upload_blob(
+                    data, overwrite=True, etag=version, match_condition=MatchConditions.IfNotModified)
+        except (ResourceExistsError, ResourceModifiedError) as e:
+            raise ArchiveConflict(name) from e
+
+class LocalFileWriter:
+    """Writes to a temporary file that replaces the archive on commit"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f'{path}.tmp'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(self.tmp_path, 'wb')
+
+    def write(self, data):
+        self.file.write(data)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+class LocalArchiveBackend:
+    """Archive storage in a local directory, for development and tests"""
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def _path(self, name):
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Archive name escapes the archive directory: {name}")
+        return path
+
+    def open_writer(self, name, content_type=None):
+        return LocalFileWriter(self._path(name))
+
+    def read_chunks(self, name):
+        with open(self._path(name), 'rb') as f:
+            yield from iter(lambda: f.read(READ_SIZE), b'')
+
+    def open_reader(self, name):
+        return open(self._path(name), 'rb')
+
+    def list(self, prefix=None):
+        if not os.path.isdir(self.root):
+            return []
+        names = sorted(
+            os.path.relpath(os.path.join(root, filename), self.root).replace(os.sep, '/')
+            for root, _, filenames in os.walk(self.root)
+            for filename in filenames
+            if not filename.endswith(('.tmp', '.lock'))
+        )
+        return [name for name in names if not prefix or name.startswith(prefix)]
+
+    def delete(self, name):
+        os.remove(self._path(name))
+
+    @property
+    def location(self):
+        return os.path.abspath(self.root)
+
+    def read_versioned(self, name):
+        """Return (data, version), or (None, None) if the file does not exist"""
+        try:
+            with open(self._path(name), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, None
+        # Content hash rather than mtime, which can be too coarse to tell writes apart
+        return data, hashlib.sha256(data).hexdigest()
+
+    def write_versioned(self, name, data, version):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.read_versioned(name)[1] != version:
+                raise ArchiveConflict(name)
+            writer = LocalFileWriter(path)
+            writer.write(data)
+            writer.commit()
+
+def write_ndjson_gz(backend, name, records, block_size=BLOCK_SIZE):
+    """
+    Stream records to an archive as gzip-compressed newline-delimited JSON.
+    At most about one block of compressed output is held in memory.
+    Args:
+        backend: Archive backend to write to
+        name: Archive name
+        records: Iterable of JSON-serializable dicts
+        block_size: Compressed bytes per uploaded block
+    Returns:
+        int: Number of records written
+    """
+    writer = backend.open_writer(name, content_type='application/gzip')
+    compressor = _gzip_compressor()
+    buffer = bytearray()
+    count = 0
+    try:
+        for record in records:
+            buffer += compressor.compress(json.dumps(record).encode('utf-8') + b'\n')
+            count += 1
+            if len(buffer) >= block_size:
+                writer.write(bytes(buffer))
+                buffer.clear()
+        buffer += compressor.flush()
+        writer.write(bytes(buffer))
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    return count
+
+def read_ndjson_gz(chunks):
+    """Yield records from a stream of gzip-compressed NDJSON chunks"""
+    decompressor = _gzip_decompressor()
+    pending = b''
+    for chunk in chunks:
+        pending += decompressor.decompress(chunk)
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line:
+                yield json.loads(line)
+    pending += decompressor.flush()
+    if pending.strip():
+        yield json.loads(pending)
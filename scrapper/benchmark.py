@@ -0,0 +1,168 @@
+from config.azure_settings import NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_WINDOW
+from django.db import connection
+from django.utils import timezone
+from .emergency import EmergencyDetector
+from .fakes import FakeTextAnalyticsClient
+from .models import EmergencyAlert, Tweet
+from .near_duplicates import NearDuplicateIndex
+from .pipeline import build_tweet_pipeline
+from .rollups import rebuild_hourly_stats
+from .sentiment import SentimentAnalyzer
+from .sources import ReplaySource
+import random
+import re
+import resource
+import sys
+import time
+
+BENCHMARK_USER = 'benchmark'
+
+_LONG_NUMBER = re.compile(r'\d{5,}')
+
+MENTIONS = ['@RailMinIndia', '@PiyushGoyal', '@IR_CRB', '@drmned', '@Central_Railway', '@WesternRly']
+HASHTAGS = ['#IndianRailways', '#railway', '#help', '#travel', '#complaint']
+STATIONS = ['NDLS', 'CSMT', 'HWH', 'MAS', 'SBC', 'PUNE', 'ADI', 'LKO', 'BPL', 'JP']
+
+def vary_text(text, rng):
+    """
+    Return a plausible variant of a tweet: PNR and train numbers re-rolled,
+    and a mention, station, coach or hashtag sometimes added
+    """
+    text = _LONG_NUMBER.sub(lambda match: ''.join(rng.choice('0123456789') for _ in match.group()), text)
+    if rng.random() < 0.5:
+        text = f"{rng.choice(MENTIONS)} {text}"
+    if rng.random() < 0.3:
+        text = f"{text} at {rng.choice(STATIONS)}"
+    if rng.random() < 0.3:
+        text = f"{text} coach {rng.choice('SBA')}{rng.randint(1, 12)} seat {rng.randint(1, 72)}"
+    if rng.random() < 0.4:
+        text = f"{text} {rng.choice(HASHTAGS)}"
+    return text
+
+def new_run_id():
+    """Return a tid prefix unique to one benchmark run"""
+    return f'{BENCHMARK_USER}-{time.time_ns() // 1000}'
+
+class LoadGenerator:
+    """
+    Turns the tweets of a labelled CSV into a stream of ``total`` varied tweets.
+
+    Yields (tweet, scheduled) pairs, where ``scheduled`` is the perf_counter
+    time the tweet was due at ``rate`` per second. Latency is measured from
+    that time rather than from when the pipeline accepted the tweet, so a
+    backed-up pipeline shows up as latency instead of a slower feed.
+
+    Tweets are marked as testing records and their tids start with ``run``,
+    so delete_benchmark_tweets removes exactly what this run wrote.
+    """
+
+    def __init__(self, path, total, rate=None, seed=0, user=BENCHMARK_USER, run=None):
+        self.texts = ReplaySource(path).texts()
+        self.total = total
+        self.rate = rate
+        self.seed = seed
+        self.user = user
+        self.run = run or new_run_id()
+        self.finished = None
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        started = time.perf_counter()
+        for count in range(self.total):
+            scheduled = started + count / self.rate if self.rate else time.perf_counter()
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield {
+                'tid': f'{self.run}-{count:09d}',
+                'user': self.user,
+                'tweet': vary_text(self.texts[count % len(self.texts)], rng),
+                'timestamp': timezone.now(),
+                'is_testing_record': True,
+            }, scheduled
+        self.finished = time.perf_counter()
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_benchmark(path, total, rate=None, azure_latency=0.1, azure_jitter=0.0, azure_error_rate=0.0,
+                  sentiment_workers=4, batch_size=100, max_wait=0.05, queue_size=1000,
+                  seed=0, near_duplicates=True, run=None, progress=None, report_interval=5.0):
+    """
+    Replay a CSV through the ingest pipeline against a fake Text Analytics backend
+    Args:
+        path: Labelled tweet CSV to replay
+        total: Number of tweets to generate
+        rate: Target tweets per second, or None to feed as fast as the pipeline accepts
+        azure_latency: Seconds each fake Text Analytics call takes
+        near_duplicates: Cluster near-duplicates so each cluster is scored once
+        run: tid prefix of the generated tweets, from new_run_id; a new one by default
+        progress: Optional callable receiving pipeline metrics every report_interval seconds
+    Returns:
+        dict: Run id, feed and storage throughput, tweet-to-stored and
+            tweet-to-alert percentiles, peak memory and the pipeline's per-stage metrics
+    """
+    client = FakeTextAnalyticsClient(
+        latency=azure_latency, jitter=azure_jitter, error_rate=azure_error_rate, seed=seed)
+    clusters = NearDuplicateIndex(NEAR_DUPLICATE_THRESHOLD, window=NEAR_DUPLICATE_WINDOW) if near_duplicates else None
+    pipeline = build_tweet_pipeline(
+        SentimentAnalyzer(client=client),
+        EmergencyDetector(),
+        sentiment_workers=sentiment_workers,
+        batch_size=batch_size,
+        max_wait=max_wait,
+        queue_size=queue_size,
+        clusters=clusters,
+    )
+    baseline_rss = peak_rss_mb()
+    generator = LoadGenerator(path, total, rate=rate, seed=seed, run=run)
+    metrics = pipeline.run(generator, progress=progress, report_interval=report_interval)
+    fed_seconds = generator.finished - pipeline.started
+    persist = metrics['stages']['persist']
+    alert = metrics['stages']['alert']
+    return {
+        'run': generator.run,
+        'tweets': total,
+        'target_rate': rate,
+        'feed_rate': total / fed_seconds if fed_seconds else 0.0,
+        'seconds': metrics['seconds'],
+        'stored': persist['emitted'],
+        'alerts': alert['emitted'],
+        'throughput': persist['emitted'] / metrics['seconds'] if metrics['seconds'] else 0.0,
+        'tweet_to_stored': {pct: persist[f'end_to_end_p{pct}'] for pct in (50, 95, 99)},
+        'tweet_to_alert': {pct: alert[f'end_to_end_p{pct}'] for pct in (50, 95, 99)},
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': peak_rss_mb() - baseline_rss,
+        'azure_calls': client.calls,
+        'azure_documents': client.documents,
+        'clusters': len(clusters) if clusters is not None else None,
+        'near_duplicates': clusters.members if clusters is not None else None,
+        'stages': metrics['stages'],
+    }
+
+def delete_benchmark_tweets(run, user=BENCHMARK_USER):
+    """
+    Remove the tweets and alerts written by a benchmark run and rebuild the rollups they touched
+    Args:
+        run: tid prefix the run's LoadGenerator used
+        user: User the run's tweets were written as
+    Returns:
+        int: Number of tweets deleted
+    """
+    # Only testing records of this run, never real tweets that happen to match the user
+    tweets = Tweet.objects.filter(is_testing_record=True, user=user, tid__startswith=f'{run}-')
+    span = tweets.order_by('timestamp').values_list('timestamp', flat=True)
+    start, end = span.first(), span.last()
+    if start is None:
+        return 0
+    EmergencyAlert.objects.filter(tweet__in=tweets).delete()
+    # A plain DELETE; Tweet.delete() would send a rollup signal per row
+    ids, params = tweets.values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {Tweet._meta.db_table} WHERE id IN ({ids})', params)
+        deleted = cursor.rowcount
+    rebuild_hourly_stats(start, end)
+    return deleted
@@ -0,0 +1,206 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from .sentiment import SentimentError, get_async_analyzer
+import abc
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+class _BatchCounters(abc.ABC):
+    """Batch instrumentation shared by the thread and asyncio coalescers"""
+
+    def __init__(self, max_batch_size):
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.documents = 0
+        self.batch_sizes = {}
+
+    def _record(self, size):
+        with self._lock:
+            self.batches += 1
+            self.documents += size
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    @abc.abstractmethod
+    def _queued(self):
+        """Return the number of documents waiting for a batch"""
+
+    def stats(self):
+        """Return batch counters and the average batch fill ratio"""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'documents': self.documents,
+                'avg_batch_size': self.documents / self.batches if self.batches else 0.0,
+                'avg_fill_ratio': (
+                    self.documents / (self.batches * self.max_batch_size) if self.batches else 0.0
+                ),
+                'batch_sizes': dict(self.batch_sizes),
+                'queued': self._queued(),
+            }
+
+class SentimentCoalescer(_BatchCounters):
+    """
+    Micro-batcher for single-document sentiment requests from threads.
+
+    Concurrent callers are collected for at most ``max_wait`` seconds, or
+    until ``max_batch_size`` documents are waiting, and sent to Azure as one
+    ``analyze_batch_sentiment`` call. Each caller gets its own result back.
+
+    Only threaded servers (WSGI, or gunicorn's gthread workers) have
+    concurrent callers here. Under ASGI Django runs sync views one at a time
+    on a single thread, so use AsyncSentimentCoalescer from async views.
+    """
+
+    def __init__(self, analyzer, max_batch_size=10, max_wait=0.005, max_in_flight=4):
+        super().__init__(max_batch_size)
+        self.analyzer = analyzer
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self._queue = queue.Queue()
+        self._pid = None
+        self._executor = None
+
+    def submit(self, text):
+        """
+        Queue a text for the next batch
+        Returns:
+            Future: Resolves to (score, confidence) or a SentimentError marker
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def analyze_sentiment(self, text, timeout=None):
+        """Drop-in replacement for SentimentAnalyzer.analyze_sentiment"""
+        if not text:
+            return 3, 0.0  # Neutral sentiment for empty text
+        return self.submit(text).result(timeout)
+
+    def _queued(self):
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so start them lazily in each worker process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+            threading.Thread(target=self._collect, name='sentiment-coalescer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        self._record(len(batch))
+        try:
+            results = self.analyzer.analyze_batch_sentiment([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Error analyzing coalesced sentiment batch: {str(e)}")
+            results = [SentimentError(str(e))] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+class AsyncSentimentCoalescer(_BatchCounters):
+    """
+    asyncio counterpart of SentimentCoalescer for async views.
+
+    Requests awaiting on one event loop are collected for at most
+    ``max_wait`` seconds, or until ``max_batch_size`` are waiting, and sent
+    as one AsyncSentimentAnalyzer.analyze_batch_sentiment call, with at most
+    ``max_in_flight`` batches outstanding. Bound to the loop it was created
+    on; use ``get_async_coalescer`` to share one per loop.
+    """
+
+    def __init__(self, analyzer, max_batch_size=10, max_wait=0.005, max_in_flight=4):
+        super().__init__(max_batch_size)
+        self.analyzer = analyzer
+        self.max_wait = max_wait
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def analyze_sentiment(self, text):
+        """Drop-in replacement for AsyncSentimentAnalyzer.analyze_sentiment"""
+        if not text:
+            return 3, 0.0  # Neutral sentiment for empty text
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _queued(self):
+        return len(self._pending)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        async with self._in_flight:
+            self._record(len(batch))
+            try:
+                results = await self.analyzer.analyze_batch_sentiment([text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Error analyzing coalesced sentiment batch: {str(e)}")
+                results = [SentimentError(str(e))] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have been cancelled, e.g. by a client disconnect
+            if not future.done():
+                future.set_result(result)
+
+# One AsyncSentimentCoalescer per event loop, like get_async_analyzer
+_async_coalescers = weakref.WeakKeyDictionary()
+
+def get_async_coalescer(cache=None, max_batch_size=10, max_wait=0.005, max_in_flight=4):
+    """
+    Return the AsyncSentimentCoalescer shared by every request on the running loop
+    Args:
+        cache: Optional SentimentCache to share with a sync SentimentAnalyzer
+    """
+    loop = asyncio.get_running_loop()
+    coalescer = _async_coalescers.get(loop)
+    if coalescer is None:
+        coalescer = AsyncSentimentCoalescer(
+            get_async_analyzer(cache=cache),
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+            max_in_flight=max_in_flight,
+        )
+        _async_coalescers[loop] = coalescer
+    return coalescer
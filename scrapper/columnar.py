@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = pa.schema([
+    ('tid', pa.string()),
+    ('user', pa.string()),
+    ('tweet', pa.string()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('sentiment_score', pa.int8()),
+    ('sentiment_confidence', pa.float64()),
+    ('is_emergency', pa.bool_()),
+    ('cluster_id', pa.string()),
+    ('created_at', pa.timestamp('us', tz='UTC')),
+    ('updated_at', pa.timestamp('us', tz='UTC')),
+])
+
+ROW_GROUP_SIZE = 10000
+DAY_FILE = re.compile(r'/date=(\d{4}-\d{2}-\d{2})/[^/]+\.parquet$')
+
+def day_file(name, day):
+    """Path of one day's file inside a Parquet archive"""
+    return f'{name}/date={day:%Y-%m-%d}/part-0.parquet'
+
+class _BlockSink:
+    """File-like adapter that hands an archive writer whole blocks instead of small writes"""
+
+    def __init__(self, writer, block_size):
+        self.writer = writer
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.block_size:
+            self.writer.write(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            if self.buffer:
+                self.writer.write(bytes(self.buffer))
+            self.writer.commit()
+            self.closed = True
+
+def _record(tweet):
+    return {name: getattr(tweet, name) for name in SCHEMA.names}
+
+def write_parquet_archive(backend, name, tweets, block_size, row_group_size=ROW_GROUP_SIZE):
+    """
+    Write tweets as one Parquet file per UTC day under the ``name`` prefix.
+    Each row group carries min/max statistics that query_parquet_archive
+    uses to skip data without reading it.
+    Args:
+        backend: Archive backend to write to
+        name: Archive name, used as the path prefix
+        tweets: Tweets ordered by timestamp
+        block_size: Bytes per uploaded block
+        row_group_size: Rows per Parquet row group
+    Returns:
+        int: Number of tweets written
+    """
+    count = 0
+    day = sink = writer = None
+    rows = []
+
+    def flush_rows():
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=SCHEMA), row_group_size=row_group_size)
+            rows.clear()
+
+    def close_day():
+        flush_rows()
+        writer.close()
+        sink.close()
+
+    try:
+        for tweet in tweets:
+            tweet_day = tweet.timestamp.astimezone(timezone.utc).date()
+            if tweet_day != day:
+                if writer is not None:
+                    close_day()
+                day = tweet_day
+                sink = _BlockSink(backend.open_writer(day_file(name, day)), block_size)
+                writer = pq.ParquetWriter(sink, SCHEMA, compression='zstd')
+            rows.append(_record(tweet))
+            count += 1
+            if len(rows) >= row_group_size:
+                flush_rows()
+        if writer is not None:
+            close_day()
+    except Exception:
+        if sink is not None and not sink.closed:
+            sink.writer.abort()
+        raise
+    return count
+
+def _archive_days(backend, name):
+    days = []
+    for path in backend.list(f'{name}/date='):
+        match = DAY_FILE.search(path)
+        if match:
+            day = datetime.strptime(match.group(1), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            days.append((day, path))
+    return sorted(days)
+
+def _as_utc(value):
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _may_match(row_group, start, end, sentiments, is_emergency):
+    # Row group statistics rule out groups that cannot contain a matching row
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        stats = column.statistics
+        if stats is None or not stats.has_min_max:
+            continue
+        low, high = _as_utc(stats.min), _as_utc(stats.max)
+        if column.path_in_schema == 'timestamp':
+            if (start is not None and high < start) or (end is not None and low >= end):
+                return False
+        elif column.path_in_schema == 'sentiment_score' and sentiments is not None:
+            if not any(low <= score <= high for score in sentiments):
+                return False
+        elif column.path_in_schema == 'is_emergency' and is_emergency is not None:
+            if not low <= is_emergency <= high:
+                return False
+    return True
+
+def query_parquet_archive(backend, name, start=None, end=None, sentiment=None,
+                          is_emergency=None, columns=None):
+    """
+    Read matching tweets from a Parquet archive, touching as little data as possible.
+
+    Day files outside [start, end) are never opened. Within a file only the
+    footer, the row groups whose statistics can match, and the columns
+    needed for filtering and projection are read.
+    Args:
+        backend: Archive backend to read from
+        name: Archive name
+        start: Optional inclusive lower bound on timestamp
+        end: Optional exclusive upper bound on timestamp
+        sentiment: Optional sentiment score, or list of scores
+        is_emergency: Optional emergency flag
+        columns: Optional list of columns to return; defaults to all
+    Returns:
+        pyarrow.Table: Matching rows with the requested columns
+    """
+    columns = list(columns or SCHEMA.names)
+    sentiments = None
+    if sentiment is not None:
+        sentiments = [sentiment] if isinstance(sentiment, int) else list(sentiment)
+    filter_columns = [
+        column for column, value in (
+            ('timestamp', start if start is not None else end),
+            ('sentiment_score', sentiments),
+            ('is_emergency', is_emergency),
+        ) if value is not None
+    ]
+    read_columns = columns + [column for column in filter_columns if column not in columns]
+
+    tables = []
+    for day, path in _archive_days(backend, name):
+        if (start is not None and day + timedelta(days=1) <= start) or (end is not None and day >= end):
+            continue
+        parquet_file = pq.ParquetFile(backend.open_reader(path))
+        row_groups = [
+            i for i in range(parquet_file.num_row_groups)
+            if _may_match(parquet_file.metadata.row_group(i), start, end, sentiments, is_emergency)
+        ]
+        if not row_groups:
+            continue
+        # Archives written before a column was added to SCHEMA lack it
+        available = set(parquet_file.schema_arrow.names)
+        table = parquet_file.read_row_groups(
+            row_groups, columns=[column for column in read_columns if column in available])
+        for column in read_columns:
+            if column not in available:
+                table = table.append_column(SCHEMA.field(column), pa.nulls(table.num_rows, SCHEMA.field(column).type))
+
+        mask = None
+        conditions = []
+        if start is not None:
+            conditions.append(pc.greater_equal(table['timestamp'], pa.scalar(start, SCHEMA.field('timestamp').type)))
+        if end is not None:
+            conditions.append(pc.less(table['timestamp'], pa.scalar(end, SCHEMA.field('timestamp').type)))
+        if sentiments is not None:
+            conditions.append(pc.is_in(table['sentiment_score'], value_set=pa.array(sentiments, pa.int8())))
+        if is_emergency is not None:
+            conditions.append(pc.equal(table['is_emergency'], is_emergency))
+        for condition in conditions:
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is not None:
+            table = table.filter(mask)
+        tables.append(table.select(columns))
+
+    if not tables:
+        return pa.schema([SCHEMA.field(column) for column in columns]).empty_table()
+    return pa.concat_tables(tables)
+
+def iter_parquet_archive(backend, name, batch_size=ROW_GROUP_SIZE):
+    """Yield every tweet in a Parquet archive in the same dict form as Tweet.to_dict"""
+    for _, path in _archive_days(backend, name):
+        parquet_file = pq.ParquetFile(backend.open_reader(path))
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            for record in batch.to_pylist():
+                for field in ('timestamp', 'created_at', 'updated_at'):
+                    record[field] = record[field].isoformat()
+                yield record
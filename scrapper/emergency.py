@@ -0,0 +1,64 @@
+from .sentiment_cache import normalize_text
+import re
+
+# Alert levels from least to most severe, as used by EmergencyAlert.alert_level
+ALERT_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+
+# Word stem -> alert level it raises on its own
+EMERGENCY_TERMS = {
+    'fire': 'CRITICAL',
+    'smoke': 'CRITICAL',
+    'accident': 'CRITICAL',
+    'derail': 'CRITICAL',
+    'unconscious': 'CRITICAL',
+    'blood': 'CRITICAL',
+    'molest': 'CRITICAL',
+    'harass': 'HIGH',
+    'injur': 'HIGH',
+    'medical': 'HIGH',
+    'mdical': 'HIGH',
+    'doctor': 'HIGH',
+    'ambulance': 'HIGH',
+    'police': 'HIGH',
+    'fight': 'HIGH',
+    'stolen': 'HIGH',
+    'theft': 'HIGH',
+    'robbed': 'HIGH',
+    'emergency': 'MEDIUM',
+    'urgent': 'MEDIUM',
+    'immediately': 'MEDIUM',
+    'help': 'LOW',
+    'lost': 'LOW',
+}
+
+class EmergencyDetector:
+    """
+    Keyword-based emergency classifier for incoming tweets.
+
+    A tweet is an emergency when it contains one of ``terms`` (matched as
+    word prefixes on normalized text). Its alert level is the most severe
+    term found, raised one level when the tweet's sentiment is very negative.
+    """
+
+    def __init__(self, terms=None):
+        self.terms = terms or EMERGENCY_TERMS
+        self._pattern = re.compile(
+            r'\b(' + '|'.join(sorted(map(re.escape, self.terms), key=len, reverse=True)) + r')\w*')
+
+    def classify(self, text, sentiment_score=None):
+        """
+        Args:
+            text: Tweet text
+            sentiment_score: Optional 1-5 sentiment score
+        Returns:
+            str: Alert level, or None if the tweet is not an emergency
+        """
+        if not text:
+            return None
+        levels = [ALERT_LEVELS.index(self.terms[match]) for match in self._pattern.findall(normalize_text(text))]
+        if not levels:
+            return None
+        level = max(levels)
+        if sentiment_score == 1:
+            level = min(level + 1, len(ALERT_LEVELS) - 1)
+        return ALERT_LEVELS[level]
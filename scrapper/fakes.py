@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+import random
+import re
+import time
+
+_WORDS = re.compile(r"[a-z']+")
+
+NEGATIVE_WORDS = {
+    'bad', 'worst', 'dirty', 'late', 'delay', 'delayed', 'no', 'not', 'never', 'stolen', 'broken',
+    'help', 'emergency', 'unable', 'sticky', 'stains', 'smell', 'cockroach', 'rude', 'pathetic',
+    'poor', 'vomit', 'vomits', 'blood', 'harassing', 'fight', 'lost', 'complaint', 'issue',
+}
+POSITIVE_WORDS = {
+    'good', 'great', 'thanks', 'thank', 'clean', 'excellent', 'nice', 'best', 'happy', 'on-time',
+    'helpful', 'quick', 'resolved', 'appreciate', 'love', 'comfortable',
+}
+
+class FakeTextAnalyticsClient:
+    """
+    Local stand-in for azure.ai.textanalytics.TextAnalyticsClient.
+
+    analyze_sentiment returns SDK-shaped results scored with a small word
+    lexicon, after sleeping ``latency`` seconds per call (plus up to
+    ``jitter``) to mimic the service round trip. ``error_rate`` makes that
+    share of documents come back as transient errors, to exercise retries.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.documents = 0
+        self._random = random.Random(seed)
+
+    def _score(self, text):
+        words = _WORDS.findall(text.lower())
+        negative = sum(word in NEGATIVE_WORDS for word in words)
+        positive = sum(word in POSITIVE_WORDS for word in words)
+        total = negative + positive + 1
+        return SimpleNamespace(
+            positive=positive / total,
+            neutral=1 / total,
+            negative=negative / total,
+        )
+
+    def analyze_sentiment(self, documents, **kwargs):
+        self.calls += 1
+        self.documents += len(documents)
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        results = []
+        for text in documents:
+            if self.error_rate and self._random.random() < self.error_rate:
+                results.append(SimpleNamespace(
+                    is_error=True,
+                    error=SimpleNamespace(code='InternalServerError', message='Simulated transient error'),
+                ))
+            else:
+                results.append(SimpleNamespace(is_error=False, confidence_scores=self._score(text)))
+        return results
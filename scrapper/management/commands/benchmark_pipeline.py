@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+from config.azure_settings import PIPELINE_BATCH_SIZE, PIPELINE_QUEUE_SIZE, PIPELINE_SENTIMENT_WORKERS
+from scrapper.benchmark import delete_benchmark_tweets, new_run_id, run_benchmark
+import json
+import os
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a labelled tweet CSV as a synthetic live stream through the ingest "
+        "pipeline, against a fake Text Analytics backend with injected latency, and "
+        "report tweet-to-stored and tweet-to-alert latency, throughput and peak memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', nargs='?', default='static/tweets_formatted_data.csv',
+                            help="Labelled tweet CSV to replay")
+        parser.add_argument('--tweets', type=int, default=100000,
+                            help="Tweets to generate; the CSV is repeated with varied text")
+        parser.add_argument('--rate', type=float, help="Target tweets per second (default: as fast as accepted)")
+        parser.add_argument('--azure-latency', type=float, default=0.1,
+                            help="Seconds per fake Text Analytics call")
+        parser.add_argument('--azure-jitter', type=float, default=0.0,
+                            help="Extra random seconds per call, up to this much")
+        parser.add_argument('--azure-error-rate', type=float, default=0.0,
+                            help="Share of documents failing with a transient error")
+        parser.add_argument('--sentiment-workers', type=int, default=PIPELINE_SENTIMENT_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=PIPELINE_BATCH_SIZE)
+        parser.add_argument('--queue-size', type=int, default=PIPELINE_QUEUE_SIZE)
+        parser.add_argument('--max-wait-ms', type=float, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-clusters', action='store_true',
+                            help="Score every near-duplicate tweet separately, for comparison")
+        parser.add_argument('--report-interval', type=float, default=10.0)
+        parser.add_argument('--json', metavar='PATH', help="Also write the report as JSON")
+        parser.add_argument('--keep', action='store_true',
+                            help="Keep the benchmark tweets and alerts instead of deleting them")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['csv']):
+            raise CommandError(f"CSV not found: {options['csv']}")
+
+        rate = f"{options['rate']:g}/s" if options['rate'] else 'unpaced'
+        run = new_run_id()
+        self.stdout.write(f"Replaying {options['tweets']} tweets from {options['csv']} ({rate}) as run {run}")
+        try:
+            report = run_benchmark(
+                options['csv'],
+                options['tweets'],
+                rate=options['rate'],
+                azure_latency=options['azure_latency'],
+                azure_jitter=options['azure_jitter'],
+                azure_error_rate=options['azure_error_rate'],
+                sentiment_workers=options['sentiment_workers'],
+                batch_size=options['batch_size'],
+                max_wait=options['max_wait_ms'] / 1000,
+                queue_size=options['queue_size'],
+                seed=options['seed'],
+                near_duplicates=not options['no_clusters'],
+                run=run,
+                progress=self.progress,
+                report_interval=options['report_interval'],
+            )
+        finally:
+            if not options['keep']:
+                deleted = delete_benchmark_tweets(run)
+                self.stdout.write(f"Deleted {deleted} benchmark tweets")
+
+        self.stdout.write(
+            f"Fed {report['tweets']} tweets at {report['feed_rate']:.0f}/s, stored {report['stored']} "
+            f"in {report['seconds']:.1f}s ({report['throughput']:.0f}/s sustained), {report['alerts']} alerts")
+        for name in ('tweet_to_stored', 'tweet_to_alert'):
+            latencies = report[name]
+            self.stdout.write(
+                f"{name.replace('_', '-'):<16} p50 {self.ms(latencies[50])}  "
+                f"p95 {self.ms(latencies[95])}  p99 {self.ms(latencies[99])}")
+        self.stdout.write(
+            f"Peak RSS {report['peak_rss_mb']:.0f} MB (+{report['rss_growth_mb']:.0f} MB during the run), "
+            f"{report['azure_calls']} Text Analytics calls for {report['azure_documents']} documents")
+        if report['clusters'] is not None:
+            self.stdout.write(
+                f"{report['near_duplicates']} near-duplicates reused the results of {report['clusters']} clusters")
+        for name, stage in report['stages'].items():
+            self.stdout.write(
+                f"  {name:<10} {stage['throughput']:>8.0f}/s  avg batch {stage['avg_batch']:>6.1f}  "
+                f"max queue {stage['max_queue_depth']:>5}  p95 {self.ms(stage['latency_p95'])}  "
+                f"busy {stage['utilization']:.0%}")
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def progress(self, metrics):
+        persist = metrics['stages']['persist']
+        self.stdout.write(
+            f"{metrics['seconds']:.0f}s: {metrics['fed']} fed, {persist['emitted']} stored, "
+            f"tweet-to-stored p95 {self.ms(persist['end_to_end_p95'])}")
+
+    @staticmethod
+    def ms(seconds):
+        return '-' if seconds is None else f"{seconds * 1000:.0f}ms"
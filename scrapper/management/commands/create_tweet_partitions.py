@@ -0,0 +1,22 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from config.azure_settings import TWEET_PARTITION_MONTHS_AHEAD
+from scrapper.partitions import create_future_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Create monthly tweet partitions ahead of time; run from a daily schedule"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=TWEET_PARTITION_MONTHS_AHEAD)
+
+    def handle(self, *args, **options):
+        try:
+            if not is_partitioned():
+                raise CommandError("Tweet table is not partitioned, run 'manage.py partition_tweets' first")
+            created = create_future_partitions(options['months_ahead'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
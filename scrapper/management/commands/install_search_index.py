@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand, CommandError
+from scrapper.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = "Create the full-text index on tweets and the triggers that keep it current"
+
+    def handle(self, *args, **options):
+        if not install_search_index():
+            raise CommandError("Full-text search needs PostgreSQL or SQLite with FTS5")
+        self.stdout.write(self.style.SUCCESS("Full-text search index installed"))
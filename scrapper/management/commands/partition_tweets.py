@@ -0,0 +1,21 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from config.azure_settings import TWEET_PARTITION_MONTHS_AHEAD
+from scrapper.partitions import partition_tweet_table
+
+
+class Command(BaseCommand):
+    help = "One-off conversion of the tweet table to monthly range partitions on timestamp"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=TWEET_PARTITION_MONTHS_AHEAD)
+
+    def handle(self, *args, **options):
+        try:
+            converted = partition_tweet_table(options['months_ahead'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        if converted:
+            self.stdout.write(self.style.SUCCESS("Tweet table converted to monthly partitions"))
+        else:
+            self.stdout.write("Tweet table is already partitioned")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from scrapper.models import TweetArchive
+
+
+class Command(BaseCommand):
+    help = "Rebuild the archive manifest by reading every archive in storage"
+
+    def handle(self, *args, **options):
+        count = TweetArchive().rebuild_manifest()
+        self.stdout.write(self.style.SUCCESS(f"Recorded {count} archives in the manifest"))
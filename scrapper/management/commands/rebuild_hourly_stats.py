@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from scrapper.rollups import rebuild_hourly_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute TweetHourlyStats from raw tweets, optionally limited to a time range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="ISO datetime, inclusive")
+        parser.add_argument('--until', help="ISO datetime, exclusive")
+
+    def handle(self, *args, **options):
+        start = self.parse(options['since'])
+        end = self.parse(options['until'])
+        count = rebuild_hourly_stats(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} hourly rollup rows"))
+
+    def parse(self, value):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.utc)
+        return parsed
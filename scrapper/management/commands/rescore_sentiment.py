@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from scrapper.fakes import FakeTextAnalyticsClient
+from scrapper.pipeline import rescore_unscored
+from scrapper.sentiment import SentimentAnalyzer
+
+
+class Command(BaseCommand):
+    help = "Retry sentiment analysis for tweets stored unscored after Text Analytics errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--limit', type=int, help="Stop after trying this many tweets")
+        parser.add_argument('--fake-azure', action='store_true',
+                            help="Score sentiment with a local stand-in for Text Analytics")
+
+    def handle(self, *args, **options):
+        client = FakeTextAnalyticsClient(latency=0) if options['fake_azure'] else None
+        stats = rescore_unscored(
+            SentimentAnalyzer(client=client),
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {stats['scored']} tweets, {stats['unscored']} still unscored"))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from scrapper.models import TweetArchive
+from scrapper.restore import ArchiveRestorer
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream archives back into the tweet table, skipping tweets already stored. "
+        "Interrupted restores resume from their last checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archives', nargs='*', help="Archive names")
+        parser.add_argument('--since', help="Restore every archive in the manifest from this ISO datetime")
+        parser.add_argument('--until', help="ISO datetime, used with --since")
+        parser.add_argument('--workers', type=int, default=4, help="Archives restored in parallel")
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--no-copy', action='store_true', help="Use bulk_create even on PostgreSQL")
+        parser.add_argument('--restart', action='store_true', help="Ignore checkpoints")
+        parser.add_argument('--update-rollups', action='store_true',
+                            help="Add restored tweets to the hourly rollups, for archives "
+                                 "whose tweets were deleted rather than tiered")
+
+    def handle(self, *args, **options):
+        archive = TweetArchive()
+        names = list(options['archives'])
+        if options['since']:
+            start = self.parse(options['since'])
+            end = self.parse(options['until']) if options['until'] else timezone.now()
+            names += [entry['name'] for entry in archive.find_archives(start, end) if entry['name'] not in names]
+        if not names:
+            raise CommandError("Give archive names or --since")
+
+        restorer = ArchiveRestorer(
+            archive,
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+            update_rollups=options['update_rollups'],
+        )
+        results = restorer.restore_many(
+            names, workers=options['workers'], restart=options['restart'], progress=self.progress)
+
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name}: {stats['inserted']} restored, {stats['skipped']} already present "
+                f"({stats['rows_per_sec']:.0f} rows/s)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Restored {len(results)} archives"))
+
+    def progress(self, name, stats):
+        self.stdout.write(f"{name}: {stats['rows']} rows, {stats['rows_per_sec']:.0f} rows/s")
+
+    def parse(self, value):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.utc)
+        return parsed
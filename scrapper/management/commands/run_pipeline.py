@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from config.azure_settings import (
+    NEAR_DUPLICATE_THRESHOLD,
+    NEAR_DUPLICATE_WINDOW,
+    PIPELINE_BATCH_SIZE,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_SENTIMENT_WORKERS,
+    TWITTER_BEARER_TOKEN,
+    TWITTER_SEARCH_QUERY,
+)
+from scrapper.emergency import EmergencyDetector
+from scrapper.fakes import FakeTextAnalyticsClient
+from scrapper.near_duplicates import NearDuplicateIndex
+from scrapper.pipeline import build_tweet_pipeline
+from scrapper.sentiment import SentimentAnalyzer
+from scrapper.sources import ReplaySource, TwitterSearchSource
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the ingest pipeline (dedupe, cluster, sentiment, emergency, persist, alert) over "
+        "Twitter search or a replayed CSV, reporting per-stage throughput, queue depth "
+        "and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replay', metavar='CSV',
+                            help="Replay a labelled tweet CSV instead of polling Twitter")
+        parser.add_argument('--rate', type=float, help="Replayed tweets per second (default: unpaced)")
+        parser.add_argument('--limit', type=int, help="Stop after this many replayed tweets")
+        parser.add_argument('--query', default=TWITTER_SEARCH_QUERY, help="Twitter search query")
+        parser.add_argument('--fake-azure', action='store_true',
+                            help="Score sentiment with a local stand-in for Text Analytics")
+        parser.add_argument('--azure-latency', type=float, default=0.05,
+                            help="Seconds per call for --fake-azure")
+        parser.add_argument('--sentiment-workers', type=int, default=PIPELINE_SENTIMENT_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=PIPELINE_BATCH_SIZE)
+        parser.add_argument('--queue-size', type=int, default=PIPELINE_QUEUE_SIZE)
+        parser.add_argument('--max-wait-ms', type=float, default=50,
+                            help="Milliseconds a stage waits for a batch to fill")
+        parser.add_argument('--no-clusters', action='store_true',
+                            help="Score and alert on every near-duplicate tweet separately")
+        parser.add_argument('--report-interval', type=float, default=5.0,
+                            help="Seconds between metrics reports")
+
+    def handle(self, *args, **options):
+        if options['replay']:
+            source = ReplaySource(options['replay'], rate=options['rate'], limit=options['limit'])
+        elif TWITTER_BEARER_TOKEN:
+            source = TwitterSearchSource(options['query'], TWITTER_BEARER_TOKEN)
+        else:
+            raise CommandError("Set TWITTER_BEARER_TOKEN or use --replay")
+
+        clusters = None if options['no_clusters'] else NearDuplicateIndex(
+            threshold=NEAR_DUPLICATE_THRESHOLD, window=NEAR_DUPLICATE_WINDOW)
+        client = FakeTextAnalyticsClient(latency=options['azure_latency']) if options['fake_azure'] else None
+        pipeline = build_tweet_pipeline(
+            SentimentAnalyzer(client=client),
+            EmergencyDetector(),
+            sentiment_workers=options['sentiment_workers'],
+            batch_size=options['batch_size'],
+            max_wait=options['max_wait_ms'] / 1000,
+            queue_size=options['queue_size'],
+            clusters=clusters,
+        )
+        try:
+            metrics = pipeline.run(source, progress=self.report, report_interval=options['report_interval'])
+        except KeyboardInterrupt:
+            metrics = pipeline.metrics()
+        self.report(metrics)
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {metrics['fed']} tweets in {metrics['seconds']:.1f}s"))
+        if clusters is not None:
+            self.stdout.write(f"{clusters.members} near-duplicates joined {len(clusters)} live clusters")
+
+    def report(self, metrics):
+        self.stdout.write(f"{metrics['fed']} tweets fed after {metrics['seconds']:.1f}s")
+        for name, stage in metrics['stages'].items():
+            self.stdout.write(
+                f"  {name:<10} {stage['received']:>8} in {stage['emitted']:>8} out "
+                f"{stage['throughput']:>8.0f}/s  queue {stage['queue_depth']:>5} (max {stage['max_queue_depth']})  "
+                f"p50 {self.ms(stage['latency_p50'])}  p95 {self.ms(stage['latency_p95'])}  "
+                f"busy {stage['utilization']:.0%}"
+                + (f"  errors {stage['errors']}" if stage['errors'] else '')
+            )
+
+    @staticmethod
+    def ms(seconds):
+        return '-' if seconds is None else f"{seconds * 1000:.0f}ms"
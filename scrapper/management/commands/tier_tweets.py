@@ -0,0 +1,26 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from config.azure_settings import TWEET_HOT_DAYS
+from scrapper.partitions import is_partitioned, tier_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive tweet partitions older than the hot window through TweetArchive, "
+        "then detach and drop them; run from a daily schedule"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hot-days', type=int, default=TWEET_HOT_DAYS)
+        parser.add_argument('--dry-run', action='store_true', help="List partitions without tiering them")
+
+    def handle(self, *args, **options):
+        try:
+            if not is_partitioned():
+                raise CommandError("Tweet table is not partitioned, run 'manage.py partition_tweets' first")
+            tiered = tier_partitions(options['hot_days'], dry_run=options['dry_run'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        for name in tiered:
+            self.stdout.write(f"{'Would tier' if options['dry_run'] else 'Tiered'} {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(tiered)} partitions tiered"))
@@ -0,0 +1,130 @@
+from bisect import bisect_left, bisect_right
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .archives import ArchiveConflict
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '_manifest.json'
+MAX_WRITE_ATTEMPTS = 5
+
+# Parsed manifests shared by every ArchiveManifest in the process, keyed by backend location
+_cache = {}
+_cache_lock = threading.Lock()
+
+class _Index:
+    """Manifest entries sorted by start, with a running max of end times for bisecting"""
+
+    def __init__(self, entries, loaded_at):
+        self.entries = sorted(entries.values(), key=lambda entry: entry['start'])
+        self.starts = [parse_datetime(entry['start']) for entry in self.entries]
+        self.max_ends = []
+        latest = None
+        for entry in self.entries:
+            end = parse_datetime(entry['end'])
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+        self.loaded_at = loaded_at
+
+class ArchiveManifest:
+    """
+    Index of the archives in a backend, stored next to them as _manifest.json.
+
+    Each entry records the archive's time range, row count, byte size, format
+    and SHA-256. Writers update it with a compare-and-swap on the manifest
+    version, retrying on conflict, so concurrent archive jobs never lose each
+    other's entries. Readers use an in-process copy refreshed every ``ttl``
+    seconds instead of listing the container.
+    """
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+
+    def _load(self):
+        data, _ = self.backend.read_versioned(MANIFEST_NAME)
+        return json.loads(data) if data else {}
+
+    def _index(self, refresh=False):
+        key = self.backend.location
+        with _cache_lock:
+            index = _cache.get(key)
+        if refresh or index is None or time.monotonic() - index.loaded_at > self.ttl:
+            index = _Index(self._load(), time.monotonic())
+            with _cache_lock:
+                _cache[key] = index
+        return index
+
+    def _update(self, change):
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            data, version = self.backend.read_versioned(MANIFEST_NAME)
+            entries = json.loads(data) if data else {}
+            change(entries)
+            try:
+                self.backend.write_versioned(
+                    MANIFEST_NAME, json.dumps(entries, indent=2, sort_keys=True).encode('utf-8'), version)
+            except ArchiveConflict:
+                logger.info("Archive manifest changed while updating it, retrying")
+                continue
+            with _cache_lock:
+                _cache[self.backend.location] = _Index(entries, time.monotonic())
+            return entries
+        raise ArchiveConflict(f"Gave up updating {MANIFEST_NAME} after {MAX_WRITE_ATTEMPTS} attempts")
+
+    def record(self, name, archive_format, start, end, rows, size, checksum):
+        """
+        Add or replace the entry for an archive
+        Args:
+            name: Archive name
+            archive_format: 'ndjson' or 'parquet'
+            start: Earliest tweet timestamp in the archive
+            end: Latest tweet timestamp in the archive
+            rows: Number of tweets
+            size: Stored bytes
+            checksum: SHA-256 hex digest of the stored bytes
+        """
+        entry = {
+            'name': name,
+            'format': archive_format,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'rows': rows,
+            'bytes': size,
+            'sha256': checksum,
+            'created_at': timezone.now().isoformat(),
+        }
+        self._update(lambda entries: entries.__setitem__(name, entry))
+        return entry
+
+    def remove(self, name):
+        self._update(lambda entries: entries.pop(name, None))
+
+    def entries(self, refresh=False):
+        """All archive entries, ordered by start of their time range"""
+        return list(self._index(refresh).entries)
+
+    def get(self, name):
+        for entry in self._index().entries:
+            if entry['name'] == name:
+                return entry
+        return None
+
+    def find(self, start, end=None):
+        """
+        Archives holding tweets in [start, end], or at the instant start when end is None
+        Returns:
+            list: Matching entries ordered by start
+        """
+        end = start if end is None else end
+        index = self._index()
+        # Entries from lo on have some end >= start; entries before hi start <= end
+        lo = bisect_left(index.max_ends, start)
+        hi = bisect_right(index.starts, end)
+        return [
+            entry for entry in index.entries[lo:hi]
+            if parse_datetime(entry['end']) >= start
+        ]
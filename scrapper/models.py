@@ -1,7 +1,27 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.utils import timezone
-from azure.storage.blob import BlobServiceClient
-from config.azure_settings import get_secret
+from django.utils.dateparse import parse_datetime
+from config.azure_clients import provider
+from config.azure_settings import (
+    ARCHIVE_BACKEND,
+    ARCHIVE_FORMAT,
+    ARCHIVE_LOCAL_DIR,
+    ARCHIVE_MANIFEST_TTL,
+)
+from .archives import (
+    ARCHIVE_FORMATS,
+    BLOCK_SIZE,
+    AzureBlobArchiveBackend,
+    ChecksumBackend,
+    LocalArchiveBackend,
+    read_ndjson_gz,
+    write_ndjson_gz,
+)
+from .manifest import MANIFEST_NAME, ArchiveManifest
+import hashlib
 import json
 import logging
 
@@ -11,16 +31,24 @@ class Tweet(models.Model):
     """Model for storing tweets and their sentiment analysis"""
     
     # Tweet content
-    tid = models.CharField(max_length=100, unique=True)  # Twitter ID
+    tid = models.CharField(max_length=100, unique=True)  # Twitter ID; (tid, timestamp) once partitioned
     user = models.CharField(max_length=100)
     tweet = models.TextField()
     timestamp = models.DateTimeField()
     
+    # Sentiment score of tweets that Azure could not score yet; see rescore_sentiment
+    UNSCORED = 0
+    
     # Analysis fields
-    sentiment_score = models.IntegerField(default=3)  # 1-5 scale
+    sentiment_score = models.IntegerField(default=3)  # 1-5 scale, or UNSCORED
     sentiment_confidence = models.FloatField(default=0.0)
     is_emergency = models.BooleanField(default=False)
     is_testing_record = models.BooleanField(default=False)
+    # tid of the first tweet of this tweet's near-duplicate cluster (see scrapper.near_duplicates)
+    cluster_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    
+    # Full-text index of `tweet`, filled by a database trigger (see scrapper.search)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -29,7 +57,13 @@ class Tweet(models.Model):
     class Meta:
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['timestamp']),
+            # Covers analytics_for_window so PostgreSQL can answer it with an index-only scan,
+            # and orders (timestamp, id) for keyset pagination of tweets_list
+            models.Index(
+                fields=['timestamp', 'id'],
+                name='tweet_timestamp_analytics_idx',
+                include=['sentiment_score', 'is_emergency'],
+            ),
             models.Index(fields=['sentiment_score']),
             models.Index(fields=['is_emergency']),
         ]
@@ -37,6 +71,13 @@ class Tweet(models.Model):
     def __str__(self):
         return f"{self.user}: {self.tweet[:50]}..."
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so hourly rollups can apply re-scores as deltas
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     def to_dict(self):
         """Convert tweet to dictionary format"""
         return {
@@ -47,67 +88,188 @@ class Tweet(models.Model):
             'sentiment_score': self.sentiment_score,
             'sentiment_confidence': self.sentiment_confidence,
             'is_emergency': self.is_emergency,
+            'cluster_id': self.cluster_id,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
         }
 
+class TweetHourlyStats(models.Model):
+    """Hourly rollup of tweet analytics, maintained incrementally as tweets are saved"""
+    
+    hour = models.DateTimeField(unique=True)  # UTC, truncated to the hour
+    tweet_count = models.IntegerField(default=0)
+    emergency_count = models.IntegerField(default=0)
+    sentiment_sum = models.BigIntegerField(default=0)
+    sentiment_1_count = models.IntegerField(default=0)
+    sentiment_2_count = models.IntegerField(default=0)
+    sentiment_3_count = models.IntegerField(default=0)
+    sentiment_4_count = models.IntegerField(default=0)
+    sentiment_5_count = models.IntegerField(default=0)
+    
+    # Metadata
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['hour']
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00}: {self.tweet_count} tweets"
+
+class SentimentResult(models.Model):
+    """Persistent tier of the sentiment cache, keyed by normalized text hash"""
+    
+    text_hash = models.CharField(max_length=64)  # SHA-256 of normalized text
+    model_version = models.CharField(max_length=100)
+    sentiment_score = models.IntegerField()
+    sentiment_confidence = models.FloatField()
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['text_hash', 'model_version'],
+                name='unique_sentiment_result',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.text_hash[:12]} ({self.model_version}): {self.sentiment_score}"
+
 class TweetArchive:
-    """Handler for archiving tweets to Azure Blob Storage"""
+    """Handler for archiving tweets to Azure Blob Storage, or a local directory"""
     
-    def __init__(self):
-        connection_string = get_secret('AZURE-STORAGE-CONNECTION-STRING')
+    def __init__(self, backend=None):
         self.container_name = 'tweet-archives'
-        try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            self.container_client = self.blob_service_client.get_container_client(self.container_name)
-        except Exception as e:
-            logger.error(f"Failed to initialize Azure Blob Storage: {str(e)}")
-            raise
+        if backend is None and ARCHIVE_BACKEND == 'local':
+            backend = LocalArchiveBackend(ARCHIVE_LOCAL_DIR)
+        if backend is None:
+            try:
+                # Shared client, so archive pages reuse its credential and connection pool
+                self.blob_service_client = provider.blob_service_client()
+                self.container_client = self.blob_service_client.get_container_client(self.container_name)
+            except Exception as e:
+                logger.error(f"Failed to initialize Azure Blob Storage: {str(e)}")
+                raise
+            backend = AzureBlobArchiveBackend(self.container_client)
+        self.backend = backend
+        self.manifest = ArchiveManifest(backend, ttl=ARCHIVE_MANIFEST_TTL)
+    
+    @staticmethod
+    def archive_name(stem, archive_format=None):
+        """Name for a new archive: the stem plus the extension of the archive format"""
+        return stem + ARCHIVE_FORMATS[archive_format or ARCHIVE_FORMAT]
     
-    def archive_tweets(self, tweets, archive_name=None):
+    def archive_tweets(self, tweets, archive_name=None, chunk_size=2000, archive_format=None):
         """
-        Archive tweets to Azure Blob Storage
+        Archive tweets, streamed from the database
         Args:
             tweets: QuerySet or list of Tweet objects
             archive_name: Optional name for the archive. If not provided, uses timestamp
+            chunk_size: Rows fetched from the database at a time
+            archive_format: 'ndjson' (gzip-compressed NDJSON) or 'parquet' (one
+                Parquet file per day); defaults to ARCHIVE_FORMAT, or the
+                format implied by the archive name's extension
         """
         try:
+            if archive_format is None and archive_name:
+                archive_format = 'parquet' if archive_name.endswith('.parquet') else 'ndjson'
+            archive_format = archive_format or ARCHIVE_FORMAT
             if not archive_name:
-                archive_name = f"tweets_{timezone.now().strftime('%Y%m%d_%H%M%S')}.json"
+                archive_name = self.archive_name(
+                    f"tweets_{timezone.now().strftime('%Y%m%d_%H%M%S')}", archive_format)
             
-            # Convert tweets to dictionary format
-            tweet_data = [tweet.to_dict() for tweet in tweets]
+            # Iterate without caching so memory stays flat however many tweets there are
+            if isinstance(tweets, models.QuerySet):
+                if archive_format == 'parquet':
+                    tweets = tweets.order_by('timestamp', 'id')
+                tweets = tweets.iterator(chunk_size=chunk_size)
+            elif archive_format == 'parquet':
+                tweets = sorted(tweets, key=lambda tweet: tweet.timestamp)
             
-            # Create JSON string
-            json_data = json.dumps(tweet_data, indent=2)
+            span = []
             
-            # Upload to blob storage
-            blob_client = self.container_client.get_blob_client(archive_name)
-            blob_client.upload_blob(json_data, overwrite=True)
+            def track_span(tweets):
+                # Time range for the manifest, recorded as the tweets stream past
+                for tweet in tweets:
+                    if not span:
+                        span.extend([tweet.timestamp, tweet.timestamp])
+                    span[0] = min(span[0], tweet.timestamp)
+                    span[1] = max(span[1], tweet.timestamp)
+                    yield tweet
             
-            logger.info(f"Successfully archived {len(tweet_data)} tweets to {archive_name}")
+            backend = ChecksumBackend(self.backend)
+            if archive_format == 'parquet':
+                from .columnar import write_parquet_archive
+                count = write_parquet_archive(backend, archive_name, track_span(tweets), BLOCK_SIZE)
+            else:
+                count = write_ndjson_gz(
+                    backend, archive_name, (tweet.to_dict() for tweet in track_span(tweets)))
+            
+            if count:
+                self.manifest.record(
+                    archive_name, archive_format, span[0], span[1], count, backend.size, backend.checksum)
+            logger.info(f"Successfully archived {count} tweets to {archive_name}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to archive tweets: {str(e)}")
             return False
     
+    def iter_archive(self, archive_name):
+        """
+        Stream archived tweets without loading the whole archive
+        Args:
+            archive_name: Name of the archive file
+        Yields:
+            dict: Tweet dictionaries in archive order
+        """
+        if archive_name.endswith('.parquet'):
+            from .columnar import iter_parquet_archive
+            yield from iter_parquet_archive(self.backend, archive_name)
+            return
+        chunks = self.backend.read_chunks(archive_name)
+        if archive_name.endswith('.gz'):
+            yield from read_ndjson_gz(chunks)
+        else:
+            # Archives written before streaming support are a single JSON array
+            yield from json.loads(b''.join(chunks))
+    
     def get_archive(self, archive_name):
         """
-        Retrieve archived tweets from Azure Blob Storage
+        Retrieve archived tweets
         Args:
             archive_name: Name of the archive file
         Returns:
             list: List of tweet dictionaries
         """
         try:
-            blob_client = self.container_client.get_blob_client(archive_name)
-            json_data = blob_client.download_blob().readall()
-            return json.loads(json_data)
+            return list(self.iter_archive(archive_name))
         except Exception as e:
             logger.error(f"Failed to retrieve archive {archive_name}: {str(e)}")
             return None
     
+    def query_archive(self, archive_name, start=None, end=None, sentiment=None,
+                      is_emergency=None, columns=None):
+        """
+        Query a Parquet archive, reading only the days, row groups and columns needed
+        Args:
+            archive_name: Name of a Parquet archive
+            start: Optional inclusive lower bound on tweet timestamp
+            end: Optional exclusive upper bound on tweet timestamp
+            sentiment: Optional sentiment score, or list of scores
+            is_emergency: Optional emergency flag
+            columns: Optional list of columns to return
+        Returns:
+            pyarrow.Table: Matching tweets
+        """
+        from .columnar import query_parquet_archive
+        return query_parquet_archive(
+            self.backend, archive_name, start=start, end=end, sentiment=sentiment,
+            is_emergency=is_emergency, columns=columns,
+        )
+    
     def list_archives(self, prefix=None):
         """
         List available tweet archives
@@ -117,16 +279,60 @@ class TweetArchive:
             list: List of archive names
         """
         try:
-            blobs = self.container_client.list_blobs(name_starts_with=prefix)
-            return [blob.name for blob in blobs]
+            return [name for name in self.backend.list(prefix) if name != MANIFEST_NAME]
         except Exception as e:
             logger.error(f"Failed to list archives: {str(e)}")
             return []
+    
+    def find_archives(self, start, end=None):
+        """
+        Look up archives by time through the manifest, without listing storage
+        Args:
+            start: Datetime the archives must cover, or start of a range
+            end: Optional end of the range, inclusive
+        Returns:
+            list: Manifest entries of matching archives
+        """
+        return self.manifest.find(start, end)
+    
+    def rebuild_manifest(self):
+        """
+        Recreate manifest entries for every archive in storage by reading them,
+        for archives written before the manifest existed
+        Returns:
+            int: Number of archives recorded
+        """
+        names = []
+        for name in self.list_archives():
+            # Parquet archives are a directory of day files
+            name = name.split('/date=')[0]
+            if name not in names:
+                names.append(name)
+        
+        for name in names:
+            digest = hashlib.sha256()
+            size = 0
+            for path in sorted(self.backend.list(f'{name}/date=')) if name.endswith('.parquet') else [name]:
+                for chunk in self.backend.read_chunks(path):
+                    digest.update(chunk)
+                    size += len(chunk)
+            
+            count, start, end = 0, None, None
+            for record in self.iter_archive(name):
+                timestamp = parse_datetime(record['timestamp'])
+                start = timestamp if start is None else min(start, timestamp)
+                end = timestamp if end is None else max(end, timestamp)
+                count += 1
+            if count:
+                archive_format = 'parquet' if name.endswith('.parquet') else 'ndjson'
+                self.manifest.record(name, archive_format, start, end, count, size, digest.hexdigest())
+        return len(names)
 
 class EmergencyAlert(models.Model):
     """Model for storing emergency alerts based on tweet analysis"""
     
-    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE)
+    # No database constraint: PostgreSQL cannot reference a partitioned tweet table
+    tweet = models.ForeignKey(Tweet, on_delete=models.CASCADE, db_constraint=False)
     alert_level = models.CharField(max_length=20, choices=[
         ('LOW', 'Low Priority'),
         ('MEDIUM', 'Medium Priority'),
@@ -144,6 +350,8 @@ class EmergencyAlert(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
+            # Keyset pagination of emergency_alerts on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='alert_created_keyset_idx'),
             models.Index(fields=['alert_level']),
             models.Index(fields=['is_resolved']),
         ]
@@ -158,3 +366,53 @@ class EmergencyAlert(models.Model):
         if notes:
             self.notes = notes
         self.save()
+
+class ArchiveRestoreCheckpoint(models.Model):
+    """Progress of restoring one archive into Tweet, so restores can resume"""
+    
+    archive_name = models.CharField(max_length=255, unique=True)
+    rows_done = models.BigIntegerField(default=0)  # Archive records processed, inserted or skipped
+    inserted = models.BigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.archive_name}: {self.rows_done} rows"
+
+# Keep TweetHourlyStats in step with individual Tweet writes. Bulk writes
+# bypass these signals and go through scrapper.rollups.apply_changes instead.
+@receiver(pre_save, sender=Tweet)
+def load_previous_tweet_state(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(field in loaded for field in ('timestamp', 'sentiment_score', 'is_emergency')):
+        return
+    instance._loaded_values = (
+        Tweet.objects.filter(pk=instance.pk)
+        .values('timestamp', 'sentiment_score', 'is_emergency')
+        .first()
+    )
+
+@receiver(post_save, sender=Tweet)
+def update_hourly_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .rollups import apply_changes, rollup_state
+    
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    apply_changes([(rollup_state(previous), rollup_state(instance))])
+    instance._loaded_values = {
+        'timestamp': instance.timestamp,
+        'sentiment_score': instance.sentiment_score,
+        'is_emergency': instance.is_emergency,
+    }
+
+@receiver(post_delete, sender=Tweet)
+def remove_from_hourly_stats(sender, instance, **kwargs):
+    from .rollups import apply_changes, rollup_state
+    
+    apply_changes([(rollup_state(getattr(instance, '_loaded_values', None) or instance), None)])
@@ -0,0 +1,198 @@
+from collections import OrderedDict
+from functools import lru_cache
+from .emergency import ALERT_LEVELS
+from .sentiment_cache import normalize_text
+import hashlib
+import operator
+import re
+import struct
+import threading
+import time
+
+# Mentions and links vary between copies of the same complaint, so they are not compared
+_IGNORED = re.compile(r'https?://\S+|@\w+')
+_TOKEN = re.compile(r'\w+')
+
+def shingles(text):
+    """
+    Return the set of words of normalized tweet text, without mentions and links
+    Args:
+        text (str): Raw tweet text
+    Returns:
+        set: Words compared between tweets
+    """
+    return set(_TOKEN.findall(_IGNORED.sub(' ', normalize_text(text))))
+
+class MinHasher:
+    """
+    MinHash signatures of word sets. The share of equal positions in two
+    signatures estimates the Jaccard similarity of the sets.
+
+    Every word gets ``num_perm`` independent 32-bit hashes from salted
+    BLAKE2b digests, 16 per digest, which keeps signing cheap in pure Python.
+    Tweets share most of their vocabulary, so word hashes are cached.
+    """
+
+    def __init__(self, num_perm=64, seed=1, cache_size=100000):
+        if num_perm % 16:
+            raise ValueError("num_perm must be a multiple of 16")
+        self.num_perm = num_perm
+        self._salts = [struct.pack('<QQ', seed, i) for i in range(num_perm // 16)]
+        self._unpack = struct.Struct(f'<{num_perm}I').unpack
+        self._hashes = lru_cache(maxsize=cache_size)(self._hashes)
+
+    def _hashes(self, word):
+        data = word.encode('utf-8')
+        return self._unpack(b''.join(hashlib.blake2b(data, digest_size=64, salt=salt).digest() for salt in self._salts))
+
+    def signature(self, words):
+        return tuple(map(min, zip(*map(self._hashes, words))))
+
+class Cluster:
+    """
+    A group of near-duplicate tweets, identified by the tid of its first tweet.
+    Holds the sentiment shared by its members and the alert levels already raised for it.
+    """
+    __slots__ = ('id', 'signature', 'created', 'size', 'sentiment', 'scoring', 'alerted')
+
+    def __init__(self, cluster_id, signature, created):
+        self.id = cluster_id
+        self.signature = signature
+        self.created = created
+        self.size = 1
+        self.sentiment = None
+        self.scoring = False
+        self.alerted = []  # alert levels raised, least severe first
+
+class NearDuplicateIndex:
+    """
+    Streaming near-duplicate detector using MinHash-LSH over tweet words.
+
+    Each signature is split into ``bands``; tweets sharing any band with a
+    cluster's representative are candidates, and join the most similar one
+    whose estimated Jaccard similarity is at least ``threshold``. Anything
+    else starts a new cluster. Clusters are kept for ``window`` seconds and at
+    most ``max_clusters`` at a time, oldest first out, so a complaint that
+    comes back later is scored and alerted on again.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, window=6 * 3600,
+                 max_clusters=100000, min_words=3, clock=time.monotonic):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.window = window
+        self.max_clusters = max_clusters
+        self.min_words = min_words
+        self.clock = clock
+        self._clusters = OrderedDict()  # by creation time
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._scored = threading.Condition(self._lock)
+        self.members = 0  # tweets that joined an existing cluster
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _expire(self, now):
+        while self._clusters:
+            cluster = next(iter(self._clusters.values()))
+            if len(self._clusters) <= self.max_clusters and now - cluster.created < self.window:
+                break
+            del self._clusters[cluster.id]
+            for key in self._band_keys(cluster.signature):
+                bucket = self._buckets[key]
+                bucket.remove(cluster.id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def assign(self, key, text):
+        """
+        Place a tweet in the cluster of its nearest earlier duplicate, or a new one
+        Args:
+            key (str): Tweet id, used as the cluster id when it starts a cluster
+            text (str): Raw tweet text
+        Returns:
+            Cluster: The tweet's cluster, or None when the text is too short to compare
+        """
+        words = shingles(text)
+        if len(words) < self.min_words:
+            return None
+        signature = self.hasher.signature(words)
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            candidates = dict.fromkeys(
+                cluster_id for band_key in band_keys for cluster_id in self._buckets.get(band_key, ())
+            )
+            best, best_similarity = None, self.threshold
+            for cluster_id in candidates:
+                cluster = self._clusters[cluster_id]
+                similarity = sum(map(operator.eq, signature, cluster.signature)) / len(signature)
+                if similarity >= best_similarity:
+                    best, best_similarity = cluster, similarity
+            if best is not None:
+                best.size += 1
+                self.members += 1
+                return best
+            cluster = Cluster(key, signature, now)
+            self._clusters[key] = cluster
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, []).append(key)
+            self._expire(now)
+            return cluster
+
+    def get(self, cluster_id):
+        """Return a live cluster by id, or None once it has expired"""
+        with self._lock:
+            return self._clusters.get(cluster_id)
+
+    def claim_sentiment(self, cluster):
+        """Return True when the caller should score the cluster, False when it is scored or being scored"""
+        with self._lock:
+            if cluster.sentiment is not None or cluster.scoring:
+                return False
+            cluster.scoring = True
+            return True
+
+    def finish_sentiment(self, cluster, sentiment):
+        """Release a claimed cluster, sharing its (score, confidence) unless scoring failed (None)"""
+        with self._scored:
+            cluster.scoring = False
+            if sentiment is not None:
+                cluster.sentiment = sentiment
+            self._scored.notify_all()
+
+    def wait_sentiment(self, cluster, timeout):
+        """Wait until nobody is scoring the cluster; returns its (score, confidence) or None"""
+        with self._scored:
+            self._scored.wait_for(lambda: not cluster.scoring, timeout)
+            return cluster.sentiment
+
+    def claim_alert(self, cluster_id, level):
+        """
+        Return True when the cluster has no alert at ``level`` or a more severe
+        one yet, and record it; False when the alert would repeat an earlier one
+        """
+        with self._lock:
+            cluster = self._clusters.get(cluster_id)
+            if cluster is None:
+                return True
+            if cluster.alerted and ALERT_LEVELS.index(cluster.alerted[-1]) >= ALERT_LEVELS.index(level):
+                return False
+            cluster.alerted.append(level)
+            return True
+
+    def release_alert(self, cluster_id, level):
+        """Undo claim_alert after the alert could not be stored"""
+        with self._lock:
+            cluster = self._clusters.get(cluster_id)
+            if cluster is not None and level in cluster.alerted:
+                cluster.alerted.remove(level)
+
+    def __len__(self):
+        return len(self._clusters)
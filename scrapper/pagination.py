@@ -0,0 +1,141 @@
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Q
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'scrapper.pagination'
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset.
+
+    Iterates like a Paginator page. ``next_token`` and ``prev_token`` are
+    opaque strings to pass back as the ``cursor`` query parameter; they are
+    None at either end of the listing.
+    """
+
+    def __init__(self, object_list, next_token=None, prev_token=None, estimated_total=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.prev_token = prev_token
+        self.estimated_total = estimated_total
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_token is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+def _ordering(queryset):
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+    if 'id' not in [name for name, _ in keys]:
+        # The primary key breaks ties so every row has a unique position
+        keys.append(('id', keys[-1][1] if keys else True))
+    return keys
+
+def _encode(obj, keys, direction):
+    values = []
+    for name, _ in keys:
+        value = getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return signing.dumps({'k': [name for name, _ in keys], 'v': values, 'd': direction}, salt=TOKEN_SALT)
+
+def _decode(token, queryset, keys):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None, None
+    if data.get('k') != [name for name, _ in keys] or data.get('d') not in ('next', 'prev'):
+        # Token from a listing with a different sort order, e.g. before a search was added
+        return None, None
+
+    values = []
+    for (name, _), value in zip(keys, data['v']):
+        try:
+            value = queryset.model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            pass  # Annotations such as search_rank are stored as plain JSON values
+        values.append(value)
+    return values, data['d']
+
+def _after(keys, values, backwards):
+    # (k1, k2, ...) strictly after the cursor row in listing order, written so the
+    # leading comparison can drive an index range scan
+    first, first_desc = keys[0]
+    leading = '__lte' if first_desc != backwards else '__gte'
+    condition = Q()
+    for i, (name, descending) in enumerate(keys):
+        step = Q(**{f'{name}__lt' if descending != backwards else f'{name}__gt': values[i]})
+        for j, (prev_name, _) in enumerate(keys[:i]):
+            step &= Q(**{prev_name: values[j]})
+        condition |= step
+    return Q(**{f'{first}{leading}': values[0]}) & condition
+
+def estimate_count(queryset):
+    """
+    Row count estimate from the PostgreSQL planner, without running COUNT(*)
+    Returns:
+        int: Planner estimate, or None on other databases or on error
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.error(f"Error estimating row count: {str(e)}")
+        return None
+
+def keyset_paginate(queryset, per_page, token=None, estimate_total=False):
+    """
+    Paginate a queryset on its ordering columns instead of OFFSET
+    Args:
+        queryset: Ordered queryset; the primary key is added as a tie-breaker
+        per_page: Rows per page
+        token: Cursor from a previous page's next_token or prev_token;
+            missing or invalid tokens return the first page
+        estimate_total: Attach the planner's row estimate for the queryset
+    Returns:
+        KeysetPage: Rows plus tokens for the adjacent pages
+    """
+    keys = _ordering(queryset)
+    order_by = [f'-{name}' if descending else name for name, descending in keys]
+    values, direction = _decode(token, queryset, keys) if token else (None, None)
+    backwards = direction == 'prev'
+
+    rows = queryset
+    if values is not None:
+        rows = rows.filter(_after(keys, values, backwards))
+    if backwards:
+        order_by = [key[1:] if key.startswith('-') else f'-{key}' for key in order_by]
+    rows = list(rows.order_by(*order_by)[:per_page + 1])
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if backwards:
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, values is not None
+
+    return KeysetPage(
+        rows,
+        next_token=_encode(rows[-1], keys, 'next') if rows and has_next else None,
+        prev_token=_encode(rows[0], keys, 'prev') if rows and has_previous else None,
+        estimated_total=estimate_count(queryset) if estimate_total else None,
+    )
@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import EmergencyAlert, Tweet, TweetArchive
+from .search import install_search_index, install_search_trigger, search_index_installed
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+TABLE = Tweet._meta.db_table
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+def month_start(value):
+    """Truncate an aware datetime to the first instant of its UTC month"""
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+def _check_postgresql():
+    if connection.vendor != 'postgresql':
+        raise ImproperlyConfigured(f"Tweet partitioning requires PostgreSQL, not {connection.vendor}")
+
+def is_partitioned():
+    _check_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+def list_partitions():
+    """
+    Monthly partitions of the tweet table
+    Returns:
+        list: (name, start, end) tuples ordered by start; end is exclusive
+    """
+    _check_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def create_partition(month):
+    """
+    Create and attach the partition for one month, if it does not exist yet.
+    Rows already routed to the default partition for that month are moved in.
+    Returns:
+        bool: True if a partition was created
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if name in [partition[0] for partition in list_partitions()]:
+        return False
+
+    end = add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE timestamp >= %s AND timestamp < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [month, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            [month, end],
+        )
+        if search_index_installed():
+            install_search_trigger(cursor, name)
+    logger.info(f"Created tweet partition {name}")
+    return True
+
+def create_future_partitions(months_ahead):
+    """Make sure partitions exist from the current month through months_ahead months from now"""
+    current = month_start(timezone.now())
+    return [
+        partition_name(add_months(current, offset))
+        for offset in range(months_ahead + 1)
+        if create_partition(add_months(current, offset))
+    ]
+
+def partition_tweet_table(months_ahead=3):
+    """
+    Convert the tweet table to range partitioning by month on timestamp.
+
+    PostgreSQL requires the partition key in every unique constraint, so the
+    primary key becomes (id, timestamp) and tid is unique per timestamp, which
+    for a given tweet is the same thing. EmergencyAlert.tweet keeps its
+    relation without a database foreign key, since PostgreSQL 11 cannot
+    reference a partitioned table.
+    """
+    if is_partitioned():
+        return False
+
+    had_search = search_index_installed()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}")
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS) "
+                f"PARTITION BY RANGE (timestamp)"
+            )
+            cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+            cursor.execute(f"SELECT min(timestamp), max(timestamp) FROM {UNPARTITIONED_TABLE}")
+            first, last = cursor.fetchone()
+
+        if first is not None:
+            month = month_start(first)
+            while month <= last:
+                create_partition(month)
+                month = add_months(month, 1)
+        create_future_partitions(months_ahead)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}")
+            # The id sequence is owned by the old table and would be dropped with it
+            sequence = _serial_sequence(cursor, UNPARTITIONED_TABLE)
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+            cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE} CASCADE")
+
+            # Constraints and indexes are built once the data is in place
+            cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, timestamp)")
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_tid_timestamp_uniq "
+                f"UNIQUE (tid, timestamp)"
+            )
+        with connection.schema_editor() as editor:
+            for index in Tweet._meta.indexes:
+                editor.add_index(Tweet, index)
+
+    if had_search:
+        install_search_index()
+    logger.info(f"Converted {TABLE} to monthly range partitions")
+    return True
+
+def _serial_sequence(cursor, table):
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    return cursor.fetchone()[0]
+
+def tier_partitions(hot_days, archive=None, dry_run=False):
+    """
+    Move monthly partitions that ended more than hot_days ago to cold storage.
+
+    Each partition is exported through TweetArchive, its emergency alerts are
+    deleted, and the partition is detached and dropped. A partition whose
+    export fails is left in place. Hourly rollups are kept, so dashboard
+    history is unaffected.
+    Args:
+        hot_days: Days of tweets to keep in the database
+        archive: Optional TweetArchive; created on first use
+        dry_run: Only report which partitions would be tiered
+    Returns:
+        list: Names of tiered partitions
+    """
+    cutoff = timezone.now() - timedelta(days=hot_days)
+    tiered = []
+    for name, start, end in list_partitions():
+        if end > cutoff:
+            continue
+        if dry_run:
+            tiered.append(name)
+            continue
+
+        tweets = Tweet.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        if tweets.exists():
+            archive = archive or TweetArchive()
+            archive_name = archive.archive_name(f"tweets_{start:%Y_%m}")
+            if not archive.archive_tweets(tweets.order_by('timestamp', 'id'), archive_name):
+                logger.error(f"Failed to archive partition {name}, keeping it")
+                continue
+
+        with transaction.atomic():
+            EmergencyAlert.objects.filter(
+                tweet__timestamp__gte=start, tweet__timestamp__lt=end).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+                cursor.execute(f"DROP TABLE {name}")
+        logger.info(f"Tiered tweet partition {name} to archive storage")
+        tiered.append(name)
+    return tiered
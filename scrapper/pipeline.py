@@ -0,0 +1,532 @@
+from collections import Counter, OrderedDict
+from django.db import connection, transaction
+from .models import EmergencyAlert, Tweet
+from .rollups import apply_changes, rollup_state
+from .sentiment import SentimentError
+import logging
+import math
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with constant memory, so percentiles cover
+    every tweet of a long run. Reported values are bucket upper bounds, within
+    ``ratio`` of the true latency.
+    """
+
+    def __init__(self, smallest=1e-4, ratio=1.05):
+        self.smallest = smallest
+        self.ratio = ratio
+        self._log_ratio = math.log(ratio)
+        self.buckets = Counter()
+        self.count = 0
+
+    def add(self, seconds):
+        index = 0 if seconds <= self.smallest else int(math.log(seconds / self.smallest) / self._log_ratio) + 1
+        self.buckets[index] += 1
+        self.count += 1
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def percentile(self, pct):
+        """Latency in seconds below which pct percent of samples fall, or None without samples"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return self.smallest * self.ratio ** index
+
+class _Item:
+    """A tweet travelling through the pipeline, with the times used for latency metrics"""
+    __slots__ = ('data', 'created', 'entered')
+
+    def __init__(self, data, created):
+        self.data = data
+        self.created = created
+        self.entered = created
+
+class StageMetrics:
+    """
+    Counters and latency histograms for one stage, updated by its workers.
+    ``latencies`` run from entering the stage's queue to leaving the stage;
+    ``end_to_end`` from the tweet entering the pipeline to leaving this stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received = 0
+        self.emitted = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.latencies = LatencyHistogram()
+        self.end_to_end = LatencyHistogram()
+
+    def record(self, received, emitted, busy, latencies, end_to_end, error=False):
+        with self._lock:
+            self.received += received
+            self.emitted += emitted
+            self.batches += 1
+            self.errors += int(error)
+            self.busy += busy
+            self.latencies.extend(latencies)
+            self.end_to_end.extend(end_to_end)
+
+    def observe_depth(self, depth):
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def snapshot(self, elapsed, depth, workers):
+        with self._lock:
+            return {
+                'received': self.received,
+                'emitted': self.emitted,
+                'dropped': self.received - self.emitted,
+                'batches': self.batches,
+                'errors': self.errors,
+                'avg_batch': self.received / self.batches if self.batches else 0.0,
+                'throughput': self.received / elapsed if elapsed else 0.0,
+                'utilization': self.busy / (elapsed * workers) if elapsed else 0.0,
+                'queue_depth': depth,
+                'max_queue_depth': self.max_depth,
+                'latency_p50': self.latencies.percentile(50),
+                'latency_p95': self.latencies.percentile(95),
+                'latency_p99': self.latencies.percentile(99),
+                'end_to_end_p50': self.end_to_end.percentile(50),
+                'end_to_end_p95': self.end_to_end.percentile(95),
+                'end_to_end_p99': self.end_to_end.percentile(99),
+            }
+
+class Stage:
+    """
+    One pipeline step run by a pool of worker threads.
+
+    Workers take up to ``batch_size`` items from the stage's bounded input
+    queue, waiting at most ``max_wait`` seconds for a batch to fill, and call
+    ``process`` with the list of tweet dicts. ``process`` returns the dicts to
+    hand to the next stage; anything it leaves out is dropped. Putting into a
+    full downstream queue blocks, which is how backpressure travels upstream.
+    A batch that raises is retried up to ``retries`` times, waiting
+    ``retry_backoff`` seconds and doubling each time, so ``process`` must be
+    safe to repeat. A batch that still fails is logged, counted in ``errors``
+    and dropped.
+    """
+
+    def __init__(self, name, process, workers=1, batch_size=100, max_wait=0.05, queue_size=1000,
+                 retries=0, retry_backoff=0.5, sleep=time.sleep):
+        self.name = name
+        self.process = process
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.sleep = sleep
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.input = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.metrics = StageMetrics()
+        self._threads = []
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._running = self.workers
+        self._threads = [
+            threading.Thread(target=self._work, name=f'pipeline-{self.name}-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def put(self, item):
+        item.entered = time.perf_counter()
+        self.input.put(item)
+        self.metrics.observe_depth(self.input.qsize())
+
+    def stop(self):
+        for _ in range(self.workers):
+            self.input.put(_STOP)
+
+    def _next_batch(self):
+        """Return (batch, stopped); the batch may be empty once the stage is stopping"""
+        first = self.input.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.input.get(timeout=remaining) if remaining > 0 else self.input.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self):
+        try:
+            stopped = False
+            while not stopped:
+                batch, stopped = self._next_batch()
+                if batch:
+                    self._run_batch(batch)
+        finally:
+            # Threads get their own database connection; do not leak it
+            connection.close()
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last and self.next is not None:
+                self.next.stop()
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        items = {id(item.data): item for item in batch}
+        error = False
+        for attempt in range(self.retries + 1):
+            try:
+                results = self.process([item.data for item in batch]) or []
+                break
+            except Exception:
+                if attempt == self.retries:
+                    logger.exception(f"Pipeline stage {self.name} dropped a batch of {len(batch)}")
+                    results = []
+                    error = True
+                    break
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(
+                    f"Pipeline stage {self.name} failed on a batch of {len(batch)}, retrying in {delay:.1f}s",
+                    exc_info=True,
+                )
+                self.sleep(delay)
+        done = time.perf_counter()
+
+        out = [items.get(id(data)) or _Item(data, started) for data in results]
+        self.metrics.record(
+            len(batch), len(out), done - started,
+            [done - item.entered for item in batch],
+            [done - item.created for item in out],
+            error=error,
+        )
+        if self.next is not None:
+            for item in out:
+                self.next.put(item)
+
+class Pipeline:
+    """
+    Chain of stages connected by bounded queues, all in one process.
+
+    ``put`` feeds the first stage and blocks while it is full. ``close``
+    drains the stages in order; ``metrics`` can be read at any time.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for stage, following in zip(self.stages, self.stages[1:]):
+            stage.next = following
+        self.fed = 0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+
+    def put(self, data, created=None):
+        """
+        Feed one tweet dict to the first stage
+        Args:
+            data: Tweet fields
+            created: perf_counter time the tweet arrived, for end-to-end latency; defaults to now
+        """
+        self.stages[0].put(_Item(data, time.perf_counter() if created is None else created))
+        self.fed += 1
+
+    def close(self):
+        """Stop accepting tweets and wait until every stage has drained"""
+        self.stages[0].stop()
+        for stage in self.stages:
+            stage.join()
+        self.finished = time.perf_counter()
+
+    def run(self, source, progress=None, report_interval=5.0):
+        """
+        Feed a source through the pipeline until it is exhausted
+        Args:
+            source: Iterable of tweet dicts, or of (tweet dict, created) pairs
+                to measure end-to-end latency from an earlier time
+            progress: Optional callable receiving metrics() every report_interval seconds
+        Returns:
+            dict: Final metrics
+        """
+        self.start()
+        stop_reporting = threading.Event()
+        if progress:
+            def report():
+                while not stop_reporting.wait(report_interval):
+                    progress(self.metrics())
+            threading.Thread(target=report, name='pipeline-report', daemon=True).start()
+        try:
+            for data in source:
+                if isinstance(data, tuple):
+                    self.put(*data)
+                else:
+                    self.put(data)
+        finally:
+            self.close()
+            stop_reporting.set()
+        return self.metrics()
+
+    def metrics(self):
+        """
+        Returns:
+            dict: fed, seconds, and per-stage throughput, queue depth and latency
+        """
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            'fed': self.fed,
+            'seconds': elapsed,
+            'stages': OrderedDict(
+                (stage.name, stage.metrics.snapshot(elapsed, stage.input.qsize(), stage.workers))
+                for stage in self.stages
+            ),
+        }
+
+class Deduplicator:
+    """Drops tweets seen recently in this process or already stored"""
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        fresh = {}
+        with self._lock:
+            for item in items:
+                if item['tid'] not in self._seen and item['tid'] not in fresh:
+                    fresh[item['tid']] = item
+        stored = set(Tweet.objects.filter(tid__in=list(fresh)).values_list('tid', flat=True))
+        with self._lock:
+            for tid in fresh:
+                self._seen[tid] = None
+                self._seen.move_to_end(tid)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        return [item for tid, item in fresh.items() if tid not in stored]
+
+def cluster_stage(clusters):
+    """Stage function putting each tweet in its near-duplicate cluster (see scrapper.near_duplicates)"""
+    def process(items):
+        for item in items:
+            cluster = clusters.assign(item['tid'], item['tweet'])
+            item['cluster_id'] = cluster.id if cluster else None
+        return items
+    return process
+
+def sentiment_stage(analyzer, clusters=None, wait=10.0):
+    """
+    Stage function scoring a batch with SentimentAnalyzer.analyze_batch_sentiment.
+    With a NearDuplicateIndex, one tweet per cluster is scored and the rest of
+    the cluster reuses its result; a worker that meets a cluster another worker
+    is scoring waits up to ``wait`` seconds for it. Tweets Azure could not
+    score are stored as Tweet.UNSCORED for rescore_unscored to retry.
+    """
+    def score(groups):
+        results = analyzer.analyze_batch_sentiment([members[0]['tweet'] for cluster, members in groups])
+        for (cluster, members), result in zip(groups, results):
+            score, confidence = (Tweet.UNSCORED, 0.0) if isinstance(result, SentimentError) else result
+            for item in members:
+                item['sentiment_score'] = score
+                item['sentiment_confidence'] = confidence
+        return results
+
+    def process(items):
+        groups = OrderedDict()
+        waiting = []
+        for item in items:
+            cluster = clusters.get(item['cluster_id']) if clusters and item.get('cluster_id') else None
+            if cluster is None:
+                groups[id(item)] = (None, [item])
+            elif cluster.id in groups:
+                groups[cluster.id][1].append(item)
+            elif clusters.claim_sentiment(cluster):
+                groups[cluster.id] = (cluster, [item])
+            else:
+                waiting.append((item, cluster))
+
+        sentiments = {}
+        try:
+            for (cluster, members), result in zip(groups.values(), score(list(groups.values()))):
+                # Failures are not shared, so waiting members get scored on their own
+                if cluster is not None and not isinstance(result, SentimentError):
+                    sentiments[cluster.id] = tuple(result)
+        finally:
+            for cluster, members in groups.values():
+                if cluster is not None:
+                    clusters.finish_sentiment(cluster, sentiments.get(cluster.id))
+
+        unscored = OrderedDict()
+        for item, cluster in waiting:
+            sentiment = clusters.wait_sentiment(cluster, wait)
+            if sentiment is None:
+                unscored.setdefault(cluster.id, (cluster, []))[1].append(item)
+            else:
+                item['sentiment_score'], item['sentiment_confidence'] = sentiment
+        if unscored:
+            score(list(unscored.values()))
+        return items
+    return process
+
+def emergency_stage(detector):
+    """
+    Stage function flagging emergencies and their alert level. Every tweet is
+    classified on its own text: near-duplicates can differ in the words that matter.
+    """
+    def process(items):
+        for item in items:
+            item['alert_level'] = detector.classify(item['tweet'], item.get('sentiment_score'))
+            item['is_emergency'] = item['alert_level'] is not None
+        return items
+    return process
+
+def persist_tweets(items):
+    """Insert tweets not stored yet and add them to the hourly rollups; passes on the inserted ones"""
+    fields = [field.name for field in Tweet._meta.concrete_fields]
+    stored = set(
+        Tweet.objects.filter(tid__in=[item['tid'] for item in items]).values_list('tid', flat=True)
+    )
+    new = [item for item in items if item['tid'] not in stored]
+    # Write first inside the transaction, so SQLite takes its write lock up front
+    # instead of failing to upgrade a read lock held alongside other stages
+    with transaction.atomic():
+        Tweet.objects.bulk_create(
+            [Tweet(**{key: value for key, value in item.items() if key in fields}) for item in new],
+            ignore_conflicts=True,
+        )
+        # Bulk inserts skip the rollup signals
+        apply_changes([(None, rollup_state(item)) for item in new])
+    return new
+
+def rescore_unscored(analyzer, batch_size=100, limit=None):
+    """
+    Retry sentiment for tweets stored as Tweet.UNSCORED and update the hourly rollups
+    Args:
+        analyzer: SentimentAnalyzer, or anything with analyze_batch_sentiment
+        batch_size: Tweets per Text Analytics batch
+        limit: Optional maximum number of tweets to try
+    Returns:
+        dict: Number of tweets scored and still unscored
+    """
+    tweets = Tweet.objects.filter(sentiment_score=Tweet.UNSCORED).order_by('id')
+    scored = failed = 0
+    last_id = 0
+    while limit is None or scored + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - scored - failed)
+        batch = list(tweets.filter(id__gt=last_id)[:size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changes = []
+        updated = []
+        for tweet, result in zip(batch, analyzer.analyze_batch_sentiment([tweet.tweet for tweet in batch])):
+            if isinstance(result, SentimentError):
+                failed += 1
+                continue
+            before = rollup_state(tweet)
+            tweet.sentiment_score, tweet.sentiment_confidence = result
+            changes.append((before, rollup_state(tweet)))
+            updated.append(tweet)
+        with transaction.atomic():
+            # Bulk updates skip the rollup signals
+            Tweet.objects.bulk_update(updated, ['sentiment_score', 'sentiment_confidence'])
+            apply_changes(changes)
+        scored += len(updated)
+    return {'scored': scored, 'unscored': failed}
+
+def create_alerts(items, clusters=None):
+    """
+    Create an EmergencyAlert for every emergency tweet; with a NearDuplicateIndex,
+    only when its cluster has not alerted at the same or a higher level yet.
+    Passes on the alerted ones
+    """
+    emergencies = {item['tid']: item for item in items if item.get('is_emergency')}
+    if not emergencies:
+        return []
+    ids = dict(Tweet.objects.filter(tid__in=list(emergencies)).values_list('tid', 'id'))
+    alerted = [item for tid, item in emergencies.items() if tid in ids]
+    claimed = []
+    if clusters is not None:
+        kept = []
+        for item in alerted:
+            if not item.get('cluster_id'):
+                kept.append(item)
+            elif clusters.claim_alert(item['cluster_id'], item['alert_level']):
+                kept.append(item)
+                claimed.append((item['cluster_id'], item['alert_level']))
+        alerted = kept
+    try:
+        with transaction.atomic():
+            EmergencyAlert.objects.bulk_create([
+                EmergencyAlert(tweet_id=ids[item['tid']], alert_level=item['alert_level'])
+                for item in alerted
+            ])
+    except Exception:
+        # Hand the claims back so a retry of this batch raises the alerts
+        for cluster_id, level in claimed:
+            clusters.release_alert(cluster_id, level)
+        raise
+    return alerted
+
+def build_tweet_pipeline(analyzer, detector, sentiment_workers=4, batch_size=100,
+                         max_wait=0.05, queue_size=1000, clusters=None, db_retries=5):
+    """
+    Standard ingest pipeline: dedupe -> [cluster ->] sentiment -> emergency -> persist -> alert
+    Args:
+        analyzer: SentimentAnalyzer, or anything with analyze_batch_sentiment
+        detector: EmergencyDetector, or anything with classify(text, sentiment_score)
+        clusters: Optional NearDuplicateIndex; near-duplicates then share one
+            sentiment score, and alert again only at a higher level
+        sentiment_workers: Concurrent sentiment batches; each waits on Azure round trips
+        batch_size: Tweets per batch in every stage
+        max_wait: Seconds a stage waits for a batch to fill
+        queue_size: Capacity of each stage's input queue
+        db_retries: Attempts to repeat a failed persist or alert batch, with
+            exponential backoff, before its tweets are dropped
+    Returns:
+        Pipeline: Not started yet
+    """
+    options = {'batch_size': batch_size, 'max_wait': max_wait, 'queue_size': queue_size}
+    # Database stages keep a single writer so SQLite and the rollup rows do not contend
+    stages = [Stage('dedupe', Deduplicator(), workers=1, **options)]
+    if clusters is not None:
+        # One worker, so copies arriving together join the same cluster in order
+        stages.append(Stage('cluster', cluster_stage(clusters), workers=1, **options))
+    stages += [
+        Stage('sentiment', sentiment_stage(analyzer, clusters), workers=sentiment_workers, **options),
+        Stage('emergency', emergency_stage(detector), workers=1, **options),
+        # Dedupe has already marked these tweets as seen, so a dropped batch is lost for good
+        Stage('persist', persist_tweets, workers=1, retries=db_retries, **options),
+        Stage('alert', lambda items: create_alerts(items, clusters), workers=1, retries=db_retries, **options),
+    ]
+    return Pipeline(stages)
@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from itertools import islice
+from .models import ArchiveRestoreCheckpoint, Tweet, TweetArchive
+from .rollups import apply_changes, rollup_state
+import csv
+import io
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns restored from an archive record; search_vector is filled by its trigger
+RESTORE_COLUMNS = [
+    'tid', 'user', 'tweet', 'timestamp', 'sentiment_score', 'sentiment_confidence',
+    'is_emergency', 'is_testing_record', 'cluster_id', 'created_at', 'updated_at',
+]
+
+def _chunks(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _row(record):
+    return {
+        'tid': record['tid'],
+        'user': record['user'],
+        'tweet': record['tweet'],
+        'timestamp': parse_datetime(record['timestamp']),
+        'sentiment_score': record['sentiment_score'],
+        'sentiment_confidence': record['sentiment_confidence'],
+        'is_emergency': record['is_emergency'],
+        'is_testing_record': record.get('is_testing_record', False),
+        'cluster_id': record.get('cluster_id'),
+        'created_at': parse_datetime(record['created_at']),
+        'updated_at': parse_datetime(record['updated_at']),
+    }
+
+class ArchiveRestorer:
+    """
+    Streams archives back into the Tweet table in chunks.
+
+    Rows are keyed on tid and tweets that are already stored are skipped.
+    Progress is checkpointed per archive in the same transaction as each
+    chunk, so an interrupted restore resumes after the last committed chunk.
+    PostgreSQL gets a COPY FROM STDIN fast path; other backends use bulk_create.
+
+    Hourly rollups are left alone by default: partitions tiered to archives
+    keep their rollups, so restored tweets are already counted.
+    """
+
+    def __init__(self, archive=None, chunk_size=10000, use_copy=None, update_rollups=False):
+        self.archive = archive or TweetArchive()
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.update_rollups = update_rollups
+
+    def restore(self, archive_name, restart=False, progress=None):
+        """
+        Restore one archive
+        Args:
+            archive_name: Name of the archive to restore
+            restart: Ignore any checkpoint and start from the first record
+            progress: Optional callable receiving (archive_name, stats) after each chunk
+        Returns:
+            dict: rows, inserted, skipped, seconds and rows_per_sec for this run
+        """
+        checkpoint, _ = ArchiveRestoreCheckpoint.objects.get_or_create(archive_name=archive_name)
+        if restart:
+            checkpoint.rows_done = checkpoint.inserted = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+        if checkpoint.completed_at:
+            logger.info(f"Archive {archive_name} already restored, skipping")
+            return {'rows': 0, 'inserted': 0, 'skipped': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+
+        stats = {'rows': 0, 'inserted': 0, 'skipped': 0}
+        started = time.perf_counter()
+        # Archives are read in a fixed order, so the checkpoint is a record offset
+        records = islice(self.archive.iter_archive(archive_name), checkpoint.rows_done, None)
+
+        for rows in _chunks(records, self.chunk_size):
+            with transaction.atomic():
+                inserted = self.copy_rows(rows) if self.use_copy else self.bulk_create_rows(rows)
+                if self.update_rollups:
+                    apply_changes([(None, rollup_state(row)) for row in inserted])
+                checkpoint.rows_done += len(rows)
+                checkpoint.inserted += len(inserted)
+                checkpoint.save(update_fields=['rows_done', 'inserted', 'updated_at'])
+
+            stats['rows'] += len(rows)
+            stats['inserted'] += len(inserted)
+            stats['skipped'] = stats['rows'] - stats['inserted']
+            stats['seconds'] = time.perf_counter() - started
+            stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+            if progress:
+                progress(archive_name, dict(stats))
+
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['completed_at', 'updated_at'])
+        stats.setdefault('seconds', time.perf_counter() - started)
+        stats.setdefault('rows_per_sec', 0.0)
+        logger.info(f"Restored {stats['inserted']} of {stats['rows']} tweets from {archive_name}")
+        return stats
+
+    def bulk_create_rows(self, records):
+        """Insert records whose tid is not stored yet; returns the inserted rows"""
+        rows = [_row(record) for record in records]
+        existing = set(
+            Tweet.objects.filter(tid__in=[row['tid'] for row in rows]).values_list('tid', flat=True)
+        )
+        new = {}
+        for row in rows:
+            if row['tid'] not in existing:
+                new.setdefault(row['tid'], row)
+        Tweet.objects.bulk_create([Tweet(**row) for row in new.values()], ignore_conflicts=True)
+
+        # bulk_create stamps created_at/updated_at with now (auto_now_add/auto_now);
+        # bulk_update does not, so put the archived values back
+        ids = dict(Tweet.objects.filter(tid__in=list(new)).values_list('tid', 'id'))
+        restored = [
+            Tweet(id=ids[tid], created_at=row['created_at'], updated_at=row['updated_at'])
+            for tid, row in new.items() if tid in ids
+        ]
+        Tweet.objects.bulk_update(restored, ['created_at', 'updated_at'], batch_size=500)
+        return list(new.values())
+
+    def copy_rows(self, records):
+        """COPY records into a temp table and insert the ones not stored yet; returns the inserted rows"""
+        table = Tweet._meta.db_table
+        columns = ', '.join(f'"{column}"' for column in RESTORE_COLUMNS)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # Archive records already hold ISO timestamps, which PostgreSQL parses itself
+        for record in records:
+            record = {'is_testing_record': False, 'cluster_id': None, **record}
+            writer.writerow([record[column] for column in RESTORE_COLUMNS])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE tweet_restore (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            # csv writes None and '' alike as an empty field, which COPY reads as NULL;
+            # keep empty texts and usernames as '' so the chunk does not fail NOT NULL
+            cursor.cursor.copy_expert(
+                f"COPY tweet_restore ({columns}) FROM STDIN "
+                f"WITH (FORMAT csv, FORCE_NOT_NULL (tweet, \"user\"))", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM tweet_restore "
+                f"ON CONFLICT DO NOTHING RETURNING timestamp, sentiment_score, is_emergency")
+            return [
+                {'timestamp': timestamp, 'sentiment_score': score, 'is_emergency': is_emergency}
+                for timestamp, score, is_emergency in cursor.fetchall()
+            ]
+
+    def restore_many(self, archive_names, workers=4, restart=False, progress=None):
+        """
+        Restore several archives in parallel, one database connection per worker
+        Returns:
+            dict: Stats per archive name
+        """
+        if connection.vendor == 'sqlite':
+            workers = 1  # SQLite allows a single writer at a time
+
+        def run(archive_name):
+            try:
+                return self.restore(archive_name, restart=restart, progress=progress)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(archive_names, executor.map(run, archive_names)))
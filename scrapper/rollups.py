@@ -0,0 +1,117 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from .models import Tweet, TweetHourlyStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sentiment scores are on a fixed 1-5 scale
+SENTIMENT_SCORES = range(1, 6)
+
+def hour_bucket(timestamp):
+    """Truncate a timestamp to its UTC hour"""
+    return timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+def rollup_state(tweet):
+    """
+    Return the (hour, sentiment_score, is_emergency) a tweet contributes to the rollups
+    Args:
+        tweet: Tweet instance, dict of field values, or None
+    Returns:
+        tuple or None if the tweet does not count towards any hour
+    """
+    if tweet is None:
+        return None
+    if isinstance(tweet, dict):
+        timestamp = tweet.get('timestamp')
+        score = tweet.get('sentiment_score')
+        is_emergency = tweet.get('is_emergency')
+    else:
+        timestamp, score, is_emergency = tweet.timestamp, tweet.sentiment_score, tweet.is_emergency
+    if timestamp is None:
+        return None
+    return hour_bucket(timestamp), score, bool(is_emergency)
+
+def _add(deltas, state, sign):
+    hour, score, is_emergency = state
+    delta = deltas[hour]
+    delta['tweet_count'] += sign
+    delta['sentiment_sum'] += sign * (score or 0)
+    if is_emergency:
+        delta['emergency_count'] += sign
+    if score in SENTIMENT_SCORES:
+        delta[f'sentiment_{score}_count'] += sign
+
+def apply_changes(changes):
+    """
+    Apply tweet inserts, re-scores and deletes to the hourly rollups
+    Args:
+        changes: Iterable of (old_state, new_state) pairs from rollup_state;
+            old_state is None for inserts and new_state is None for deletes
+    """
+    deltas = defaultdict(Counter)
+    for old, new in changes:
+        if old == new:
+            continue
+        if old:
+            _add(deltas, old, -1)
+        if new:
+            _add(deltas, new, 1)
+
+    with transaction.atomic():
+        for hour, delta in deltas.items():
+            updates = {field: F(field) + value for field, value in delta.items() if value}
+            if not updates:
+                continue
+            TweetHourlyStats.objects.get_or_create(hour=hour)
+            TweetHourlyStats.objects.filter(hour=hour).update(**updates)
+
+def rebuild_hourly_stats(start=None, end=None):
+    """
+    Recompute rollups from the raw tweets, e.g. after a backfill
+    Args:
+        start: Optional lower bound, rounded down to the hour
+        end: Optional upper bound, rounded up to the hour
+    Returns:
+        int: Number of hourly rows written
+    """
+    tweets = Tweet.objects.exclude(timestamp=None)
+    stats = TweetHourlyStats.objects.all()
+    if start is not None:
+        start = hour_bucket(start)
+        tweets = tweets.filter(timestamp__gte=start)
+        stats = stats.filter(hour__gte=start)
+    if end is not None:
+        if hour_bucket(end) != end:
+            end = hour_bucket(end) + timedelta(hours=1)
+        tweets = tweets.filter(timestamp__lt=end)
+        stats = stats.filter(hour__lt=end)
+
+    rows = (
+        tweets.annotate(hour=TruncHour('timestamp', tzinfo=timezone.utc))
+        .values('hour')
+        .annotate(
+            tweet_count=Count('id'),
+            emergency_count=Count('id', filter=Q(is_emergency=True)),
+            sentiment_sum=Sum('sentiment_score'),
+            **{
+                f'sentiment_{score}_count': Count('id', filter=Q(sentiment_score=score))
+                for score in SENTIMENT_SCORES
+            },
+        )
+        .order_by('hour')
+    )
+
+    with transaction.atomic():
+        stats.delete()
+        created = TweetHourlyStats.objects.bulk_create(
+            (TweetHourlyStats(**row) for row in rows.iterator()),
+            batch_size=1000,
+        )
+
+    logger.info(f"Rebuilt {len(created)} hourly tweet rollups")
+    return len(created)
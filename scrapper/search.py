@@ -0,0 +1,148 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from .models import Tweet
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'scrapper_tweet_fts'
+
+_installed = {}
+
+POSTGRES_DDL = [
+    f"""
+    CREATE INDEX IF NOT EXISTS tweet_search_vector_gin
+        ON {Tweet._meta.db_table} USING gin (search_vector)
+    """,
+    f"""
+    UPDATE {Tweet._meta.db_table}
+        SET search_vector = to_tsvector('{SEARCH_CONFIG}', coalesce(tweet, ''))
+        WHERE search_vector IS NULL
+    """,
+]
+
+SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(tweet, content='{Tweet._meta.db_table}', content_rowid='id')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {Tweet._meta.db_table} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, tweet) VALUES (new.id, new.tweet);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {Tweet._meta.db_table} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, tweet) VALUES ('delete', old.id, old.tweet);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF tweet ON {Tweet._meta.db_table} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, tweet) VALUES ('delete', old.id, old.tweet);
+        INSERT INTO {FTS_TABLE}(rowid, tweet) VALUES (new.id, new.tweet);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+def install_search_trigger(cursor, table):
+    """
+    Keep search_vector current on one table. Partitioned tweet storage gets the
+    trigger on every partition, since PostgreSQL 11 has no BEFORE ROW triggers
+    on partitioned tables.
+    """
+    cursor.execute(f"DROP TRIGGER IF EXISTS tweet_search_vector_update ON {table}")
+    cursor.execute(f"""
+        CREATE TRIGGER tweet_search_vector_update
+            BEFORE INSERT OR UPDATE OF tweet ON {table}
+            FOR EACH ROW EXECUTE PROCEDURE
+            tsvector_update_trigger(search_vector, 'pg_catalog.{SEARCH_CONFIG}', tweet)
+    """)
+
+def _trigger_tables(cursor):
+    cursor.execute(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+        [Tweet._meta.db_table],
+    )
+    return [row[0] for row in cursor.fetchall()] or [Tweet._meta.db_table]
+
+def install_search_index():
+    """
+    Create the full-text index and the triggers that keep it current on write.
+    PostgreSQL gets a GIN index over Tweet.search_vector, SQLite an FTS5
+    table. Safe to run repeatedly.
+    Returns:
+        bool: False if the database backend has no full-text support here
+    """
+    statements = {'postgresql': POSTGRES_DDL, 'sqlite': SQLITE_DDL}.get(connection.vendor)
+    if statements is None:
+        return False
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in _trigger_tables(cursor):
+                install_search_trigger(cursor, table)
+        for statement in statements:
+            cursor.execute(statement)
+    _installed.pop(connection.alias, None)
+    return True
+
+def search_index_installed():
+    """Check, once per process and connection, whether install_search_index has run"""
+    if connection.alias not in _installed:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT 1 FROM pg_trigger WHERE tgname = 'tweet_search_vector_update'")
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            else:
+                _installed[connection.alias] = False
+                return False
+            _installed[connection.alias] = cursor.fetchone() is not None
+    return _installed[connection.alias]
+
+def _fts5_query(text):
+    # Quote every term so user input cannot inject FTS5 operators
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+def search_tweets(tweets, text):
+    """
+    Filter a Tweet queryset by full-text search, best matches first
+    Args:
+        tweets: Tweet queryset, possibly already filtered
+        text: User search input
+    Returns:
+        QuerySet: Matching tweets annotated with ``search_rank``
+    """
+    if not text.split():
+        return tweets
+
+    if not search_index_installed():
+        logger.warning("Full-text index not installed, falling back to a substring scan")
+        return tweets.filter(tweet__icontains=text).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+        ).order_by('-search_rank', '-timestamp')
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return tweets.filter(search_vector=query).annotate(
+            # ts_rank is a float4; double precision round-trips exactly through pagination cursors
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        ).order_by('-search_rank', '-timestamp')
+
+    # SQLite FTS5: bm25() is lower for better matches
+    match = _fts5_query(text)
+    return tweets.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]),
+    ).annotate(
+        search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {Tweet._meta.db_table}.id",
+            [match],
+        ),
+    ).order_by('-search_rank', '-timestamp')
@@ -1,26 +1,180 @@
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
-from config.azure_settings import AZURE_COGNITIVE_ENDPOINT, AZURE_COGNITIVE_KEY
+from asgiref.sync import sync_to_async
+from config.azure_clients import provider
+from config.azure_settings import (
+    AZURE_COGNITIVE_MAX_RETRIES,
+    AZURE_COGNITIVE_MAX_WORKERS,
+    AZURE_SENTIMENT_MODEL_VERSION,
+    SENTIMENT_CACHE_SIZE,
+    SENTIMENT_CACHE_USE_DB,
+)
+from .sentiment_cache import SentimentCache, text_hash
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Bump when the score mapping below changes so cached results are not reused
+SCORE_MAPPING_VERSION = 1
+MODEL_VERSION = f"azure-{AZURE_SENTIMENT_MODEL_VERSION}-v{SCORE_MAPPING_VERSION}"
+# 'latest' names no particular model, so its scores are only cached in memory
+CACHE_USE_DB = SENTIMENT_CACHE_USE_DB and AZURE_SENTIMENT_MODEL_VERSION != 'latest'
+
+# Document error codes that will not succeed on retry
+PERMANENT_ERROR_CODES = {'InvalidDocument', 'UnsupportedLanguageCode', 'InvalidCountryHint'}
+
+class SentimentError(tuple):
+    """
+    Neutral (3, 0.0) placeholder for a document Azure could not score.
+    Unpacks like a regular result; ``reason`` carries the failure message.
+    """
+
+    def __new__(cls, reason):
+        result = super().__new__(cls, (3, 0.0))
+        result.reason = reason
+        return result
+
+    def __repr__(self):
+        return f"SentimentError({self.reason!r})"
+
+def to_score(response):
+    """Convert Azure sentiment scores to a (score, confidence) tuple on the 1-5 scale"""
+    if response.confidence_scores.positive > 0.8:
+        return 5, response.confidence_scores.positive
+    elif response.confidence_scores.positive > 0.6:
+        return 4, response.confidence_scores.positive
+    elif response.confidence_scores.neutral > 0.6:
+        return 3, response.confidence_scores.neutral
+    elif response.confidence_scores.negative > 0.6:
+        return 2, response.confidence_scores.negative
+    else:
+        return 1, response.confidence_scores.negative
+
+def _apply_responses(pending, responses, results):
+    """
+    Fill in results from one Azure response, shared by the sync and async retry loops
+    Args:
+        pending (list): Indexes into results of the documents that were sent
+        responses (list): Azure document results, in the order they were sent
+        results (list): Results being assembled for the chunk
+    Returns:
+        tuple: (indexes to retry, message of the last transient error or None)
+    """
+    retry = []
+    reason = None
+    for i, response in zip(pending, responses):
+        if not response.is_error:
+            results[i] = to_score(response)
+        elif response.error.code in PERMANENT_ERROR_CODES:
+            results[i] = SentimentError(response.error.message)
+        else:
+            reason = response.error.message
+            retry.append(i)
+    return retry, reason
+
+def _plan_chunks(texts, keys, cached, batch_size):
+    """
+    Return (miss_keys, chunks): every distinct uncached text once, split into
+    chunks of at most batch_size for Azure
+    """
+    misses = {}
+    for text, key in zip(texts, keys):
+        if key and key not in cached and key not in misses:
+            misses[key] = text
+    miss_keys = list(misses)
+    chunks = [
+        [misses[key] for key in miss_keys[i:i + batch_size]]
+        for i in range(0, len(miss_keys), batch_size)
+    ]
+    return miss_keys, chunks
+
+def _merge_results(keys, cached, miss_keys, chunk_results):
+    """
+    Combine cached and freshly scored results
+    Args:
+        keys (list): text_hash per input text, None for empty texts
+        cached (dict): Cache hits, updated in place
+        miss_keys (list): Hashes that were sent to Azure
+        chunk_results (list): Per-chunk result lists, in miss_keys order
+    Returns:
+        tuple: (results in input order, fresh results to write to the cache)
+    """
+    fresh = {}
+    failed = {}
+    for key, result in zip(miss_keys, (result for results in chunk_results for result in results)):
+        if isinstance(result, SentimentError):
+            failed[key] = result
+        else:
+            fresh[key] = result
+
+    if failed:
+        logger.error(f"Sentiment analysis failed for {len(failed)} of {len(miss_keys)} documents")
+
+    cached.update(fresh)
+    cached.update(failed)
+    return [cached[key] if key else (3, 0.0) for key in keys], fresh
+
 class SentimentAnalyzer:
-    def __init__(self):
-        self.client = self._authenticate_client()
+    # Azure Cognitive Services has a limit of 10 texts per batch
+    BATCH_SIZE = 10
+    RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+
+    def __init__(self, cache=None, max_workers=None, max_retries=None, client=None):
+        # client overrides the shared Azure client, e.g. with scrapper.fakes.FakeTextAnalyticsClient
+        self.client = client or self._authenticate_client()
+        self.max_workers = max_workers or AZURE_COGNITIVE_MAX_WORKERS
+        self.max_retries = AZURE_COGNITIVE_MAX_RETRIES if max_retries is None else max_retries
+        self.model_version = MODEL_VERSION
+        self.cache = cache or SentimentCache(
+            self.model_version,
+            max_size=SENTIMENT_CACHE_SIZE,
+            use_db=CACHE_USE_DB,
+        )
 
     def _authenticate_client(self):
-        """Authenticate with Azure Cognitive Services"""
+        """Return the process-wide Azure Cognitive Services client"""
         try:
-            credential = AzureKeyCredential(AZURE_COGNITIVE_KEY)
-            return TextAnalyticsClient(
-                endpoint=AZURE_COGNITIVE_ENDPOINT, 
-                credential=credential
-            )
+            return provider.text_analytics_client()
         except Exception as e:
             logger.error(f"Failed to authenticate with Azure Cognitive Services: {str(e)}")
             raise
 
+    def _analyze_chunk(self, texts):
+        """
+        Send one chunk of at most BATCH_SIZE texts to Azure, retrying only what failed
+        Args:
+            texts (list): Non-empty texts to analyze
+        Returns:
+            list: (score, confidence) tuples or SentimentError markers, in input order
+        """
+        results = [None] * len(texts)
+        pending = list(range(len(texts)))
+        reason = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                responses = self.client.analyze_sentiment(
+                    [texts[i] for i in pending],
+                    model_version=AZURE_SENTIMENT_MODEL_VERSION,
+                )
+            except Exception as e:
+                reason = str(e)
+                logger.warning(f"Sentiment batch failed (attempt {attempt + 1}): {reason}")
+                continue
+
+            pending, error = _apply_responses(pending, responses, results)
+            reason = error or reason
+            if not pending:
+                break
+
+        for i in pending:
+            results[i] = SentimentError(reason)
+        return results
+
     def analyze_sentiment(self, text):
         """
         Analyze sentiment of text using Azure Cognitive Services
@@ -28,27 +182,8 @@ class SentimentAnalyzer:
             - score (int): 1-5 (1 being very negative, 5 being very positive)
             - confidence (float): confidence score of the analysis
         """
-        try:
-            if not text:
-                return 3, 0.0  # Neutral sentiment for empty text
-                
-            response = self.client.analyze_sentiment([text])[0]
-            
-            # Convert Azure sentiment scores to 1-5 scale
-            if response.confidence_scores.positive > 0.8:
-                return 5, response.confidence_scores.positive
-            elif response.confidence_scores.positive > 0.6:
-                return 4, response.confidence_scores.positive
-            elif response.confidence_scores.neutral > 0.6:
-                return 3, response.confidence_scores.neutral
-            elif response.confidence_scores.negative > 0.6:
-                return 2, response.confidence_scores.negative
-            else:
-                return 1, response.confidence_scores.negative
-                
-        except Exception as e:
-            logger.error(f"Error analyzing sentiment: {str(e)}")
-            return 3, 0.0  # Return neutral sentiment in case of error
+        # Same caching and error handling as a batch of one
+        return self.analyze_batch_sentiment([text])[0]
 
     def analyze_batch_sentiment(self, texts):
         """
@@ -56,42 +191,155 @@ class SentimentAnalyzer:
         Args:
             texts (list): List of texts to analyze
         Returns:
-            list: List of (score, confidence) tuples
+            list: List of (score, confidence) tuples in input order. Documents
+                that could not be scored are SentimentError markers, which
+                unpack as a neutral (3, 0.0).
         """
         try:
             if not texts:
                 return []
-                
-            # Filter out empty texts
-            valid_texts = [text for text in texts if text]
-            if not valid_texts:
-                return [(3, 0.0)] * len(texts)
-                
-            # Azure Cognitive Services has a limit of 10 texts per batch
-            batch_size = 10
-            results = []
-            
-            for i in range(0, len(valid_texts), batch_size):
-                batch = valid_texts[i:i + batch_size]
-                responses = self.client.analyze_sentiment(batch)
-                
-                for response in responses:
-                    if response.confidence_scores.positive > 0.8:
-                        results.append((5, response.confidence_scores.positive))
-                    elif response.confidence_scores.positive > 0.6:
-                        results.append((4, response.confidence_scores.positive))
-                    elif response.confidence_scores.neutral > 0.6:
-                        results.append((3, response.confidence_scores.neutral))
-                    elif response.confidence_scores.negative > 0.6:
-                        results.append((2, response.confidence_scores.negative))
-                    else:
-                        results.append((1, response.confidence_scores.negative))
-                        
+
+            # Empty texts are neutral; everything else is looked up in the cache first
+            keys = [text_hash(text) if text else None for text in texts]
+            cached = self.cache.get_many([key for key in keys if key])
+            # Send each distinct uncached text to Azure only once
+            miss_keys, chunks = _plan_chunks(texts, keys, cached, self.BATCH_SIZE)
+
+            chunk_results = []
+            if chunks:
+                # Chunks are independent, so dispatch them concurrently; map keeps input order
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                    chunk_results = list(executor.map(self._analyze_chunk, chunks))
+
+            results, fresh = _merge_results(keys, cached, miss_keys, chunk_results)
+            self.cache.set_many(fresh)
             return results
-            
+
         except Exception as e:
             logger.error(f"Error analyzing batch sentiment: {str(e)}")
-            return [(3, 0.0)] * len(texts)  # Return neutral sentiment in case of error
+            return [SentimentError(str(e))] * len(texts)
+
+    def cache_stats(self):
+        """Return sentiment cache hit/miss counters"""
+        return self.cache.stats()
+
+class AsyncSentimentAnalyzer:
+    """
+    asyncio variant of SentimentAnalyzer built on the aio Text Analytics client.
+
+    One instance owns one client, and with it one aiohttp session and
+    connection pool, so it must only be used from the event loop it was
+    created on. Use ``get_async_analyzer`` to share an instance per loop.
+    """
+    BATCH_SIZE = SentimentAnalyzer.BATCH_SIZE
+    RETRY_BACKOFF = SentimentAnalyzer.RETRY_BACKOFF
+
+    def __init__(self, cache=None, max_concurrency=None, max_retries=None):
+        self.client = self._authenticate_client()
+        self.max_retries = AZURE_COGNITIVE_MAX_RETRIES if max_retries is None else max_retries
+        self.model_version = MODEL_VERSION
+        self.cache = cache or SentimentCache(
+            self.model_version,
+            max_size=SENTIMENT_CACHE_SIZE,
+            use_db=CACHE_USE_DB,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency or AZURE_COGNITIVE_MAX_WORKERS)
+
+    def _authenticate_client(self):
+        """Return an Azure Cognitive Services client for the running loop, on the process-wide credential"""
+        try:
+            return provider.async_text_analytics_client()
+        except Exception as e:
+            logger.error(f"Failed to authenticate with Azure Cognitive Services: {str(e)}")
+            raise
+
+    async def close(self):
+        """Close the underlying client and its connection pool"""
+        await self.client.close()
+
+    async def _analyze_chunk(self, texts):
+        """Async counterpart of SentimentAnalyzer._analyze_chunk"""
+        results = [None] * len(texts)
+        pending = list(range(len(texts)))
+        reason = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                async with self._semaphore:
+                    responses = await self.client.analyze_sentiment(
+                        [texts[i] for i in pending],
+                        model_version=AZURE_SENTIMENT_MODEL_VERSION,
+                    )
+            except Exception as e:
+                reason = str(e)
+                logger.warning(f"Sentiment batch failed (attempt {attempt + 1}): {reason}")
+                continue
+
+            pending, error = _apply_responses(pending, responses, results)
+            reason = error or reason
+            if not pending:
+                break
+
+        for i in pending:
+            results[i] = SentimentError(reason)
+        return results
+
+    async def analyze_sentiment(self, text):
+        """
+        Analyze sentiment of text without blocking the event loop
+        Returns:
+            tuple: (score, confidence), see SentimentAnalyzer.analyze_sentiment
+        """
+        return (await self.analyze_batch_sentiment([text]))[0]
+
+    async def analyze_batch_sentiment(self, texts):
+        """
+        Analyze sentiment for a batch of texts, sending chunks concurrently
+        Args:
+            texts (list): List of texts to analyze
+        Returns:
+            list: (score, confidence) tuples or SentimentError markers, in input order
+        """
+        try:
+            if not texts:
+                return []
+
+            keys = [text_hash(text) if text else None for text in texts]
+            cached = await sync_to_async(self.cache.get_many)([key for key in keys if key])
+            miss_keys, chunks = _plan_chunks(texts, keys, cached, self.BATCH_SIZE)
+            chunk_results = await asyncio.gather(*(self._analyze_chunk(chunk) for chunk in chunks))
+
+            results, fresh = _merge_results(keys, cached, miss_keys, chunk_results)
+            await sync_to_async(self.cache.set_many)(fresh)
+            return results
+
+        except Exception as e:
+            logger.error(f"Error analyzing batch sentiment: {str(e)}")
+            return [SentimentError(str(e))] * len(texts)
+
+# One AsyncSentimentAnalyzer per event loop, since aio clients are loop-bound
+_async_analyzers = weakref.WeakKeyDictionary()
+
+def get_async_analyzer(cache=None):
+    """
+    Return the AsyncSentimentAnalyzer shared by every request on the running loop
+    Args:
+        cache: Optional SentimentCache to share with a sync SentimentAnalyzer
+    """
+    loop = asyncio.get_running_loop()
+    analyzer = _async_analyzers.get(loop)
+    if analyzer is None:
+        analyzer = AsyncSentimentAnalyzer(cache=cache)
+        _async_analyzers[loop] = analyzer
+    return analyzer
+
+async def close_async_analyzer():
+    """Close the analyzer bound to the running loop, if one was created"""
+    analyzer = _async_analyzers.pop(asyncio.get_running_loop(), None)
+    if analyzer is not None:
+        await analyzer.close()
 
 # Example usage
 if __name__ == "__main__":
@@ -117,3 +365,5 @@ if __name__ == "__main__":
         print(f"Text: {text}")
         print(f"Sentiment score: {score}/5")
         print(f"Confidence: {confidence:.2f}\n")
+
+    print(f"Cache stats: {analyzer.cache_stats()}")
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_RETWEET_PREFIX = re.compile(r'^rt @\w+:\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Normalize tweet text so retweets and copy-pasted complaints share a cache key
+    Args:
+        text (str): Raw tweet text
+    Returns:
+        str: Casefolded text with retweet prefix and redundant whitespace removed
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _WHITESPACE.sub(' ', text).strip()
+    return _RETWEET_PREFIX.sub('', text)
+
+
+def text_hash(text):
+    """Return the SHA-256 hex digest of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    """
+    Two-tier cache for sentiment results.
+
+    The first tier is an in-process LRU, the second the ``SentimentResult``
+    table. Entries are keyed by ``text_hash`` and tagged with the analyzer
+    model version so a model upgrade never serves stale scores.
+    """
+
+    def __init__(self, model_version, max_size=10000, use_db=True):
+        self.model_version = model_version
+        self.max_size = max_size
+        self.use_db = use_db
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """
+        Look up cached results for a list of text hashes
+        Args:
+            keys (list): Text hashes as returned by ``text_hash``
+        Returns:
+            dict: Mapping of hash to (score, confidence) for every cached key
+        """
+        found = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.memory_hits += 1
+                elif key not in pending:
+                    pending.append(key)
+
+        if pending and self.use_db:
+            stored = self._db_get_many(pending)
+            self._remember(stored)
+            found.update(stored)
+            with self._lock:
+                self.db_hits += len(stored)
+                self.misses += len(pending) - len(stored)
+        else:
+            with self._lock:
+                self.misses += len(pending)
+
+        return found
+
+    def get(self, key):
+        """Return the cached (score, confidence) for a text hash, or None"""
+        return self.get_many([key]).get(key)
+
+    def set_many(self, results):
+        """
+        Store freshly analyzed results in both tiers
+        Args:
+            results (dict): Mapping of text hash to (score, confidence)
+        """
+        if not results:
+            return
+        self._remember(results)
+        if self.use_db:
+            self._db_set_many(results)
+
+    def set(self, key, result):
+        """Store a single (score, confidence) result"""
+        self.set_many({key: result})
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+                'size': len(self._lru),
+            }
+
+    def clear(self):
+        """Drop the in-process tier and reset counters"""
+        with self._lock:
+            self._lru.clear()
+            self.memory_hits = self.db_hits = self.misses = 0
+
+    def _remember(self, results):
+        with self._lock:
+            for key, result in results.items():
+                self._lru[key] = tuple(result)
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def _db_get_many(self, keys):
+        try:
+            from .models import SentimentResult
+
+            rows = SentimentResult.objects.filter(
+                text_hash__in=keys,
+                model_version=self.model_version,
+            ).values_list('text_hash', 'sentiment_score', 'sentiment_confidence')
+            return {key: (score, confidence) for key, score, confidence in rows}
+        except Exception as e:
+            logger.warning(f"Sentiment cache lookup failed, falling back to Azure: {str(e)}")
+            return {}
+
+    def _db_set_many(self, results):
+        try:
+            from .models import SentimentResult
+
+            SentimentResult.objects.bulk_create(
+                [
+                    SentimentResult(
+                        text_hash=key,
+                        model_version=self.model_version,
+                        sentiment_score=score,
+                        sentiment_confidence=confidence,
+                    )
+                    for key, (score, confidence) in results.items()
+                ],
+                ignore_conflicts=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to persist sentiment cache entries: {str(e)}")
@@ -0,0 +1,130 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import csv
+import logging
+import requests
+import time
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = 'https://api.twitter.com/2/tweets/search/recent'
+
+class TwitterSearchSource:
+    """
+    Polls the Twitter v2 recent search endpoint and yields new tweets as dicts.
+
+    Keeps a since_id in memory, pages through every new result with
+    next_token, and sleeps until the window resets when the rate-limit
+    headers say the budget is spent.
+    """
+
+    def __init__(self, query, bearer_token, interval=15, max_results=100, session=None):
+        self.query = query
+        self.bearer_token = bearer_token
+        self.interval = interval
+        self.max_results = max_results
+        self.session = session or requests.Session()
+        self.since_id = None
+
+    def _get(self, params):
+        while True:
+            response = self.session.get(
+                SEARCH_URL,
+                params=params,
+                headers={'Authorization': f'Bearer {self.bearer_token}'},
+                timeout=30,
+            )
+            reset = response.headers.get('x-rate-limit-reset')
+            if response.status_code == 429:
+                delay = max(0, int(reset) - time.time()) + 1 if reset else 60
+                logger.info(f"Twitter search rate limited, sleeping {delay:.0f}s")
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            if response.headers.get('x-rate-limit-remaining') == '0' and reset:
+                time.sleep(max(0, int(reset) - time.time()) + 1)
+            return response.json()
+
+    def poll(self):
+        """Return every tweet newer than since_id, newest first"""
+        params = {
+            'query': self.query,
+            'max_results': self.max_results,
+            'tweet.fields': 'created_at,author_id',
+            'expansions': 'author_id',
+            'user.fields': 'username',
+        }
+        if self.since_id:
+            params['since_id'] = self.since_id
+        tweets = []
+        newest = None
+        while True:
+            data = self._get(params)
+            users = {user['id']: user['username'] for user in data.get('includes', {}).get('users', [])}
+            for tweet in data.get('data', []):
+                tweets.append({
+                    'tid': tweet['id'],
+                    'user': users.get(tweet.get('author_id'), tweet.get('author_id', '')),
+                    'tweet': tweet['text'],
+                    'timestamp': parse_datetime(tweet['created_at']),
+                })
+            meta = data.get('meta', {})
+            newest = newest or meta.get('newest_id')
+            if not meta.get('next_token'):
+                break
+            params['next_token'] = meta['next_token']
+        if newest:
+            self.since_id = newest
+        return tweets
+
+    def __iter__(self):
+        while True:
+            started = time.monotonic()
+            try:
+                yield from self.poll()
+            except requests.RequestException as e:
+                logger.error(f"Twitter search failed: {str(e)}")
+            time.sleep(max(0, self.interval - (time.monotonic() - started)))
+
+class ReplaySource:
+    """
+    Local stand-in for Twitter: replays a labelled tweet CSV (label,text) as a live stream.
+
+    Every tweet gets a fresh tid and the current time as its timestamp.
+    ``rate`` paces the stream in tweets per second (unpaced when None) and
+    ``limit`` stops it after that many tweets; the file is replayed from the
+    start until the limit is reached, or once when there is no limit.
+    """
+
+    def __init__(self, path, rate=None, limit=None, user='replay'):
+        self.path = path
+        self.rate = rate
+        self.limit = limit
+        self.user = user
+
+    def texts(self):
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return [row[1] for row in csv.reader(f) if len(row) > 1]
+
+    def __iter__(self):
+        texts = self.texts()
+        if not texts:
+            return
+        run = time.time_ns() // 1000
+        started = time.perf_counter()
+        count = 0
+        while self.limit is None or count < self.limit:
+            text = texts[count % len(texts)]
+            if self.rate:
+                delay = started + count / self.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield {
+                'tid': f'{run}{count:09d}',
+                'user': self.user,
+                'tweet': text,
+                'timestamp': timezone.now(),
+            }
+            count += 1
+            if self.limit is None and count == len(texts):
+                break
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from django.test import SimpleTestCase
+from scrapper.archives import LocalArchiveBackend
+from scrapper.columnar import SCHEMA, day_file, iter_parquet_archive, query_parquet_archive, write_parquet_archive
+from types import SimpleNamespace
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+import tempfile
+
+TIMESTAMP = datetime(2024, 1, 1, 5, tzinfo=timezone.utc)
+
+class ParquetArchiveTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = LocalArchiveBackend(directory.name)
+        self.tweet = SimpleNamespace(
+            tid='1', user='passenger', tweet='fire in coach B2', timestamp=TIMESTAMP,
+            sentiment_score=1, sentiment_confidence=0.9, is_emergency=True, cluster_id='1',
+            created_at=TIMESTAMP, updated_at=TIMESTAMP,
+        )
+
+    def test_cluster_id_round_trips(self):
+        write_parquet_archive(self.backend, 'archive', [self.tweet], block_size=1 << 20)
+        self.assertEqual([record['cluster_id'] for record in iter_parquet_archive(self.backend, 'archive')], ['1'])
+        table = query_parquet_archive(self.backend, 'archive', start=TIMESTAMP)
+        self.assertEqual(table.column('cluster_id').to_pylist(), ['1'])
+
+    def test_archives_without_cluster_id_read_it_as_null(self):
+        schema = pa.schema([field for field in SCHEMA if field.name != 'cluster_id'])
+        data = io.BytesIO()
+        pq.write_table(pa.Table.from_pylist([{name: getattr(self.tweet, name) for name in schema.names}], schema=schema), data)
+        writer = self.backend.open_writer(day_file('old', TIMESTAMP.date()))
+        writer.write(data.getvalue())
+        writer.commit()
+
+        table = query_parquet_archive(self.backend, 'old', is_emergency=True)
+        self.assertEqual(table.column('cluster_id').to_pylist(), [None])
+        self.assertEqual(table.column('tid').to_pylist(), ['1'])
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from django.test import SimpleTestCase
+from scrapper.archives import ArchiveConflict, LocalArchiveBackend
+from scrapper.manifest import MANIFEST_NAME, MAX_WRITE_ATTEMPTS, ArchiveManifest
+import json
+import tempfile
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class RacingBackend(LocalArchiveBackend):
+    """Runs ``interrupt`` just before each of the next ``races`` manifest writes, like a concurrent writer"""
+
+    def __init__(self, root, interrupt, races=1):
+        super().__init__(root)
+        self.interrupt = interrupt
+        self.races = races
+        self.writes = 0
+
+    def write_versioned(self, name, data, version):
+        self.writes += 1
+        if self.races:
+            self.races -= 1
+            self.interrupt()
+        return super().write_versioned(name, data, version)
+
+class ArchiveManifestTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def record(self, manifest, name, day):
+        return manifest.record(
+            name, 'ndjson', START + timedelta(days=day), START + timedelta(days=day, hours=23),
+            rows=10, size=100, checksum='0' * 64)
+
+    @staticmethod
+    def names(entries):
+        return [entry['name'] for entry in entries]
+
+    def stored_names(self):
+        data, _ = LocalArchiveBackend(self.root).read_versioned(MANIFEST_NAME)
+        return sorted(json.loads(data))
+
+    def test_write_with_stale_version_conflicts(self):
+        backend = LocalArchiveBackend(self.root)
+        backend.write_versioned(MANIFEST_NAME, b'{}', None)
+        _, version = backend.read_versioned(MANIFEST_NAME)
+        backend.write_versioned(MANIFEST_NAME, b'{"a": {}}', version)
+        with self.assertRaises(ArchiveConflict):
+            backend.write_versioned(MANIFEST_NAME, b'{"b": {}}', version)
+        with self.assertRaises(ArchiveConflict):
+            backend.write_versioned(MANIFEST_NAME, b'{"b": {}}', None)
+
+    def test_concurrent_writer_entries_are_kept(self):
+        other = ArchiveManifest(LocalArchiveBackend(self.root))
+        backend = RacingBackend(self.root, lambda: self.record(other, 'other.ndjson.gz', 1))
+        self.record(ArchiveManifest(backend), 'mine.ndjson.gz', 2)
+        self.assertEqual(backend.writes, 2)  # the first write lost the race and was retried
+        self.assertEqual(self.stored_names(), ['mine.ndjson.gz', 'other.ndjson.gz'])
+
+    def test_remove_retries_on_conflict(self):
+        manifest = ArchiveManifest(LocalArchiveBackend(self.root))
+        self.record(manifest, 'old.ndjson.gz', 1)
+        other = ArchiveManifest(LocalArchiveBackend(self.root))
+        backend = RacingBackend(self.root, lambda: self.record(other, 'new.ndjson.gz', 2))
+        ArchiveManifest(backend).remove('old.ndjson.gz')
+        self.assertEqual(self.stored_names(), ['new.ndjson.gz'])
+
+    def test_gives_up_after_max_attempts(self):
+        other = ArchiveManifest(LocalArchiveBackend(self.root))
+        days = iter(range(100))
+        backend = RacingBackend(
+            self.root, lambda: self.record(other, f'other-{next(days)}.ndjson.gz', 1), races=MAX_WRITE_ATTEMPTS)
+        with self.assertRaises(ArchiveConflict):
+            self.record(ArchiveManifest(backend), 'mine.ndjson.gz', 2)
+        self.assertEqual(backend.writes, MAX_WRITE_ATTEMPTS)
+        self.assertNotIn('mine.ndjson.gz', self.stored_names())
+
+    def test_find_by_time_range(self):
+        manifest = ArchiveManifest(LocalArchiveBackend(self.root))
+        for day in range(5):
+            self.record(manifest, f'day-{day}.ndjson.gz', day)
+        self.assertEqual(self.names(manifest.find(START + timedelta(days=2, hours=5))), ['day-2.ndjson.gz'])
+        self.assertEqual(
+            self.names(manifest.find(START + timedelta(days=1, hours=12), START + timedelta(days=3))),
+            ['day-1.ndjson.gz', 'day-2.ndjson.gz', 'day-3.ndjson.gz'])
+        self.assertEqual(manifest.find(START + timedelta(days=10)), [])
+
+    def test_readers_refresh_after_ttl(self):
+        reader = ArchiveManifest(LocalArchiveBackend(self.root), ttl=3600)
+        self.assertEqual(reader.entries(), [])
+        # Written straight to the backend, as another process would
+        backend = LocalArchiveBackend(self.root)
+        _, version = backend.read_versioned(MANIFEST_NAME)
+        backend.write_versioned(MANIFEST_NAME, json.dumps({'x.ndjson.gz': {
+            'name': 'x.ndjson.gz', 'start': START.isoformat(), 'end': START.isoformat(),
+        }}).encode('utf-8'), version)
+        self.assertEqual(reader.entries(), [])
+        self.assertEqual(self.names(reader.entries(refresh=True)), ['x.ndjson.gz'])
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from django.test import SimpleTestCase, TransactionTestCase
+from scrapper.emergency import EmergencyDetector
+from scrapper.models import EmergencyAlert, Tweet
+from scrapper.near_duplicates import NearDuplicateIndex, shingles
+from scrapper.pipeline import build_tweet_pipeline
+import threading
+
+COMPLAINT = 'Train 12951 delayed by four hours at the station and no announcement made'
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class NearDuplicateIndexTests(SimpleTestCase):
+    def test_shingles_ignore_mentions_and_links(self):
+        self.assertEqual(
+            shingles('@RailMinIndia Train delayed again https://t.co/abc'),
+            shingles('Train delayed again @IR_CRB'))
+
+    def test_copies_join_the_first_tweets_cluster(self):
+        index = NearDuplicateIndex()
+        first = index.assign('1', COMPLAINT)
+        self.assertEqual(first.id, '1')
+        self.assertIs(index.assign('2', f'@RailMinIndia {COMPLAINT} https://t.co/x'), first)
+        self.assertIs(index.assign('3', f'{COMPLAINT} #IndianRailways'), first)
+        self.assertEqual((first.size, index.members, len(index)), (3, 2, 1))
+
+    def test_different_tweets_start_new_clusters(self):
+        index = NearDuplicateIndex()
+        first = index.assign('1', COMPLAINT)
+        other = index.assign('2', 'Coach B4 toilets are dirty and there is no water since morning')
+        self.assertIsNot(other, first)
+        self.assertEqual(other.id, '2')
+        self.assertEqual(len(index), 2)
+
+    def test_short_texts_are_not_clustered(self):
+        self.assertIsNone(NearDuplicateIndex().assign('1', 'train late'))
+
+    def test_clusters_expire_after_window(self):
+        clock = FakeClock()
+        index = NearDuplicateIndex(window=60, clock=clock)
+        first = index.assign('1', COMPLAINT)
+        clock.now = 59
+        self.assertIs(index.assign('2', COMPLAINT), first)
+        clock.now = 61
+        self.assertEqual(index.assign('3', COMPLAINT).id, '3')
+        self.assertIsNone(index.get('1'))
+
+    def test_oldest_clusters_are_evicted_beyond_max_clusters(self):
+        index = NearDuplicateIndex(max_clusters=2)
+        index.assign('1', COMPLAINT)
+        index.assign('2', 'Coach B4 toilets are dirty and there is no water since morning')
+        index.assign('3', 'Great food and very polite staff on the Rajdhani today')
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.get('1'))
+        self.assertIsNotNone(index.get('3'))
+
+    def test_one_worker_scores_a_cluster_and_others_wait(self):
+        index = NearDuplicateIndex()
+        cluster = index.assign('1', COMPLAINT)
+        self.assertTrue(index.claim_sentiment(cluster))
+        self.assertFalse(index.claim_sentiment(cluster))
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(index.wait_sentiment(cluster, 5)))
+        waiter.start()
+        index.finish_sentiment(cluster, (1, 0.9))
+        waiter.join(5)
+        self.assertEqual(results, [(1, 0.9)])
+        self.assertFalse(index.claim_sentiment(cluster))
+
+    def test_failed_scoring_is_not_shared(self):
+        index = NearDuplicateIndex()
+        cluster = index.assign('1', COMPLAINT)
+        self.assertTrue(index.claim_sentiment(cluster))
+        index.finish_sentiment(cluster, None)
+        self.assertIsNone(index.wait_sentiment(cluster, 0))
+        self.assertTrue(index.claim_sentiment(cluster))
+
+    def test_alerts_repeat_only_at_a_higher_level(self):
+        index = NearDuplicateIndex()
+        index.assign('1', COMPLAINT)
+        self.assertTrue(index.claim_alert('1', 'LOW'))
+        self.assertFalse(index.claim_alert('1', 'LOW'))
+        self.assertTrue(index.claim_alert('1', 'CRITICAL'))
+        self.assertFalse(index.claim_alert('1', 'HIGH'))
+        index.release_alert('1', 'CRITICAL')
+        self.assertTrue(index.claim_alert('1', 'HIGH'))
+        self.assertTrue(index.claim_alert('unknown', 'LOW'))
+
+class ClusteredPipelineTests(TransactionTestCase):
+    def test_members_are_classified_on_their_own_text(self):
+        class Analyzer:
+            calls = 0
+
+            def analyze_batch_sentiment(self, texts):
+                self.calls += len(texts)
+                return [(2, 0.9)] * len(texts)
+
+        analyzer = Analyzer()
+        texts = [COMPLAINT, f'{COMPLAINT} please help', f'{COMPLAINT} smoke', f'{COMPLAINT} fire']
+        pipeline = build_tweet_pipeline(
+            analyzer, EmergencyDetector(), batch_size=1, max_wait=0, clusters=NearDuplicateIndex())
+        pipeline.run(
+            {'tid': str(i), 'user': 'passenger', 'tweet': text, 'timestamp': datetime(2024, 1, 1, tzinfo=timezone.utc)}
+            for i, text in enumerate(texts)
+        )
+
+        self.assertEqual(analyzer.calls, 1)
+        self.assertEqual(set(Tweet.objects.values_list('cluster_id', flat=True)), {'0'})
+        self.assertEqual(
+            sorted(Tweet.objects.values_list('tid', 'is_emergency')),
+            [('0', False), ('1', True), ('2', True), ('3', True)])
+        # 'fire' repeats the CRITICAL alert 'smoke' already raised for the cluster
+        self.assertEqual(
+            list(EmergencyAlert.objects.order_by('id').values_list('tweet__tid', 'alert_level')),
+            [('1', 'LOW'), ('2', 'CRITICAL')])
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from django.core import signing
+from django.test import TestCase
+from scrapper.models import Tweet
+from scrapper.pagination import TOKEN_SALT, keyset_paginate
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class KeysetPaginateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Pairs of tweets share a timestamp, so pages must break ties on id
+        Tweet.objects.bulk_create([
+            Tweet(tid=str(i), user='passenger', tweet=f'tweet {i}', timestamp=START + timedelta(minutes=i // 2))
+            for i in range(25)
+        ])
+        cls.expected = list(Tweet.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def walk_forward(self, per_page):
+        pages, token = [], None
+        while True:
+            page = keyset_paginate(Tweet.objects.all(), per_page, token)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            token = page.next_token
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.walk_forward(10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([tweet.id for page in pages for tweet in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertTrue(pages[-1].has_previous)
+
+    def test_prev_token_returns_the_previous_page(self):
+        pages = self.walk_forward(10)
+        page = keyset_paginate(Tweet.objects.all(), 10, pages[-1].prev_token)
+        self.assertEqual([tweet.id for tweet in page], [tweet.id for tweet in pages[1]])
+        self.assertTrue(page.has_next)
+        page = keyset_paginate(Tweet.objects.all(), 10, page.prev_token)
+        self.assertEqual([tweet.id for tweet in page], self.expected[:10])
+        self.assertFalse(page.has_previous)
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_later_pages(self):
+        first = keyset_paginate(Tweet.objects.all(), 10)
+        Tweet.objects.create(tid='new', user='passenger', tweet='newest', timestamp=START + timedelta(days=1))
+        second = keyset_paginate(Tweet.objects.all(), 10, first.next_token)
+        self.assertEqual([tweet.id for tweet in second], self.expected[10:20])
+
+    def test_ascending_ordering(self):
+        page = keyset_paginate(Tweet.objects.order_by('timestamp'), 20)
+        page = keyset_paginate(Tweet.objects.order_by('timestamp'), 20, page.next_token)
+        self.assertEqual([tweet.id for tweet in page], sorted(self.expected)[20:])
+
+    def test_invalid_or_foreign_token_returns_the_first_page(self):
+        foreign = signing.dumps({'k': ['user', 'id'], 'v': ['passenger', 1], 'd': 'next'}, salt=TOKEN_SALT)
+        for token in ('garbage', foreign):
+            page = keyset_paginate(Tweet.objects.all(), 10, token)
+            self.assertEqual([tweet.id for tweet in page], self.expected[:10])
+            self.assertFalse(page.has_previous)
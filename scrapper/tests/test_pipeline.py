@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from django.test import SimpleTestCase, TransactionTestCase
+from scrapper.emergency import EmergencyDetector
+from scrapper.models import EmergencyAlert, Tweet
+from scrapper.pipeline import Pipeline, Stage, build_tweet_pipeline, rescore_unscored
+from scrapper.sentiment import SentimentError
+import threading
+import time
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class StubAnalyzer:
+    """Scores every text 2, except those containing ``fail``, which come back as SentimentError"""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+
+    def analyze_batch_sentiment(self, texts):
+        return [SentimentError('unavailable') if self.fail and self.fail in text else (2, 0.9) for text in texts]
+
+class StageTests(SimpleTestCase):
+    def test_close_drains_every_stage(self):
+        out = []
+        pipeline = Pipeline([
+            Stage('double', lambda items: items + [dict(item, copy=True) for item in items], workers=3, batch_size=7),
+            Stage('sink', lambda items: out.extend(items) or items, batch_size=5),
+        ])
+        metrics = pipeline.run({'n': n} for n in range(100))
+        self.assertEqual(len(out), 200)
+        self.assertEqual(metrics['fed'], 100)
+        self.assertEqual(metrics['stages']['double']['emitted'], 200)
+        self.assertEqual(metrics['stages']['sink']['received'], 200)
+
+    def test_full_queues_block_the_feeder(self):
+        release = threading.Event()
+        out = []
+
+        def slow(items):
+            release.wait()
+            out.extend(items)
+            return items
+
+        pipeline = Pipeline([
+            Stage('pass', lambda items: items, batch_size=1, queue_size=2),
+            Stage('slow', slow, batch_size=1, queue_size=2),
+        ])
+        source = ({'n': n} for n in range(50))
+        feeder = threading.Thread(target=pipeline.run, args=(source,))
+        feeder.start()
+        time.sleep(0.2)
+        # One item held by each worker plus a full queue in front of each stage
+        self.assertLessEqual(pipeline.fed, 7)
+        self.assertTrue(feeder.is_alive())
+        release.set()
+        feeder.join(5)
+        self.assertFalse(feeder.is_alive())
+        self.assertEqual(len(out), 50)
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        attempts, sleeps, out = [], [], []
+
+        def flaky(items):
+            attempts.append(len(items))
+            if len(attempts) < 3:
+                raise RuntimeError('database unavailable')
+            return items
+
+        pipeline = Pipeline([
+            Stage('persist', flaky, retries=3, retry_backoff=0.5, sleep=sleeps.append),
+            Stage('sink', lambda items: out.extend(items) or items),
+        ])
+        with self.assertLogs('scrapper.pipeline', 'WARNING'):
+            metrics = pipeline.run({'n': n} for n in range(5))
+        self.assertEqual(attempts, [5, 5, 5])
+        self.assertEqual(sleeps, [0.5, 1.0])
+        self.assertEqual(len(out), 5)
+        self.assertEqual(metrics['stages']['persist']['errors'], 0)
+
+    def test_batch_failing_every_retry_is_dropped(self):
+        def broken(items):
+            raise RuntimeError('database unavailable')
+
+        pipeline = Pipeline([Stage('persist', broken, retries=2, sleep=lambda seconds: None)])
+        with self.assertLogs('scrapper.pipeline', 'ERROR'):
+            metrics = pipeline.run({'n': n} for n in range(5))
+        stage = metrics['stages']['persist']
+        self.assertEqual((stage['received'], stage['emitted'], stage['errors']), (5, 0, 1))
+
+class TweetPipelineTests(TransactionTestCase):
+    def tweets(self, texts):
+        return [
+            {'tid': str(i), 'user': 'passenger', 'tweet': text, 'timestamp': START}
+            for i, text in enumerate(texts)
+        ]
+
+    def test_tweets_are_stored_once_with_alerts(self):
+        pipeline = build_tweet_pipeline(StubAnalyzer(), EmergencyDetector(), max_wait=0.01)
+        texts = ['train running late', 'fire in coach B2', 'fire in coach B2']
+        pipeline.run(self.tweets(texts) + self.tweets(texts))
+        self.assertEqual(Tweet.objects.count(), 3)
+        self.assertEqual(
+            sorted(Tweet.objects.values_list('tid', 'sentiment_score', 'is_emergency')),
+            [('0', 2, False), ('1', 2, True), ('2', 2, True)])
+        self.assertEqual(sorted(EmergencyAlert.objects.values_list('tweet__tid', 'alert_level')),
+                         [('1', 'CRITICAL'), ('2', 'CRITICAL')])
+
+    def test_unscored_tweets_are_rescored(self):
+        pipeline = build_tweet_pipeline(StubAnalyzer(fail='late'), EmergencyDetector(), max_wait=0.01)
+        pipeline.run(self.tweets(['train running late', 'clean coach']))
+        self.assertEqual(
+            dict(Tweet.objects.values_list('tid', 'sentiment_score')), {'0': Tweet.UNSCORED, '1': 2})
+
+        self.assertEqual(rescore_unscored(StubAnalyzer(fail='late')), {'scored': 0, 'unscored': 1})
+        self.assertEqual(rescore_unscored(StubAnalyzer()), {'scored': 1, 'unscored': 0})
+        self.assertEqual(Tweet.objects.get(tid='0').sentiment_score, 2)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from scrapper.archives import LocalArchiveBackend
+from scrapper.models import ArchiveRestoreCheckpoint, Tweet, TweetArchive
+from scrapper.restore import ArchiveRestorer
+import tempfile
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ARCHIVE = 'restore.ndjson.gz'
+
+class Interrupted(Exception):
+    pass
+
+class ArchiveRestorerTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = TweetArchive(LocalArchiveBackend(directory.name))
+
+        for n in range(7):
+            Tweet.objects.create(
+                tid=str(n), user='passenger', tweet=f'train {n} delayed', timestamp=START + timedelta(minutes=n),
+                sentiment_score=n % 5 + 1, is_emergency=n == 3)
+        # Metadata an archive must bring back, rather than the restore time
+        for tweet in Tweet.objects.all():
+            Tweet.objects.filter(pk=tweet.pk).update(
+                created_at=tweet.timestamp + timedelta(seconds=1), updated_at=tweet.timestamp + timedelta(days=1))
+
+        tweets = list(Tweet.objects.order_by('tid'))
+        # A record repeated within the archive is restored once
+        self.assertTrue(self.archive.archive_tweets(tweets[:4] + tweets[3:4] + tweets[4:], ARCHIVE))
+        self.archived = {
+            tid: (created_at, updated_at)
+            for tid, created_at, updated_at in Tweet.objects.values_list('tid', 'created_at', 'updated_at')
+        }
+        Tweet.objects.all().delete()
+
+    def restorer(self):
+        return ArchiveRestorer(self.archive, chunk_size=3, use_copy=False)
+
+    def test_interrupted_restore_resumes_from_checkpoint(self):
+        def interrupt(archive_name, stats):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            self.restorer().restore(ARCHIVE, progress=interrupt)
+        checkpoint = ArchiveRestoreCheckpoint.objects.get(archive_name=ARCHIVE)
+        self.assertEqual((checkpoint.rows_done, checkpoint.inserted), (3, 3))
+        self.assertIsNone(checkpoint.completed_at)
+        self.assertEqual(sorted(Tweet.objects.values_list('tid', flat=True)), ['0', '1', '2'])
+
+        # Stored meanwhile, e.g. by the poller, so the restore skips it
+        Tweet.objects.create(tid='5', user='passenger', tweet='train 5 delayed', timestamp=START)
+
+        stats = self.restorer().restore(ARCHIVE)
+        # Only the 5 records after the checkpoint are read again
+        self.assertEqual((stats['rows'], stats['inserted'], stats['skipped']), (5, 3, 2))
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.rows_done, checkpoint.inserted), (8, 6))
+        self.assertIsNotNone(checkpoint.completed_at)
+        self.assertEqual(Tweet.objects.count(), 7)
+
+        self.assertEqual(self.restorer().restore(ARCHIVE)['rows'], 0)
+
+    def test_restored_tweets_keep_archived_timestamps(self):
+        self.restorer().restore(ARCHIVE)
+        self.assertEqual(
+            {tid: (created_at, updated_at)
+             for tid, created_at, updated_at in Tweet.objects.values_list('tid', 'created_at', 'updated_at')},
+            self.archived)
+
+    def test_restart_ignores_the_checkpoint(self):
+        self.restorer().restore(ARCHIVE)
+        Tweet.objects.filter(tid__in=['0', '6']).delete()
+        stats = self.restorer().restore(ARCHIVE, restart=True)
+        self.assertEqual((stats['rows'], stats['inserted']), (8, 2))
+        self.assertEqual(Tweet.objects.count(), 7)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from scrapper.analytics import analytics_for_window
+from scrapper.models import Tweet, TweetHourlyStats
+from scrapper.pipeline import persist_tweets, rescore_unscored
+from scrapper.rollups import SENTIMENT_SCORES, apply_changes, rebuild_hourly_stats, rollup_state
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+FIELDS = ['hour', 'tweet_count', 'emergency_count', 'sentiment_sum'] + [
+    f'sentiment_{score}_count' for score in SENTIMENT_SCORES
+]
+
+class StubAnalyzer:
+    def analyze_batch_sentiment(self, texts):
+        return [(4, 0.8) for _ in texts]
+
+class HourlyRollupTests(TestCase):
+    def tweet(self, tid, minutes, score=3, is_emergency=False):
+        return Tweet.objects.create(
+            tid=tid, user='passenger', tweet=f'train {tid} delayed', timestamp=START + timedelta(minutes=minutes),
+            sentiment_score=score, is_emergency=is_emergency)
+
+    @staticmethod
+    def rollups():
+        # Hours emptied by deletes keep a row of zeros, which a rebuild does not write
+        return list(TweetHourlyStats.objects.exclude(tweet_count=0).values_list(*FIELDS))
+
+    def assertRollupsMatchTweets(self):
+        # A partial first hour is stitched from raw tweets onto the whole-hour rollups
+        half_past = START + timedelta(minutes=30)
+        for start, end in [(START, None), (half_past, None), (half_past, START + timedelta(hours=2))]:
+            self.assertEqual(
+                analytics_for_window(start, end, use_rollups=True), analytics_for_window(start, end))
+        incremental = self.rollups()
+        rebuild_hourly_stats()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_saves_rescores_and_deletes_update_rollups(self):
+        tweets = [
+            self.tweet('1', 10, score=1, is_emergency=True),
+            self.tweet('2', 45, score=5),
+            self.tweet('3', 70, score=Tweet.UNSCORED),
+            self.tweet('4', 150, score=2),
+        ]
+        self.assertRollupsMatchTweets()
+
+        tweets[2].sentiment_score = 4
+        tweets[2].save()
+        self.assertRollupsMatchTweets()
+
+        # Loaded fresh, so the pre_save signal reads the stored state
+        tweet = Tweet.objects.get(tid='2')
+        tweet.timestamp += timedelta(hours=1)
+        tweet.is_emergency = True
+        tweet.save()
+        self.assertRollupsMatchTweets()
+
+        tweets[0].delete()
+        Tweet.objects.filter(tid='4').delete()
+        self.assertRollupsMatchTweets()
+        self.assertEqual(analytics_for_window(START, use_rollups=True)['total_tweets'], 2)
+
+    def test_bulk_writes_update_rollups_through_apply_changes(self):
+        self.tweet('1', 20, score=2)
+        persist_tweets([
+            {'tid': str(tid), 'user': 'passenger', 'tweet': 'fire in coach', 'timestamp': START + timedelta(minutes=25 * tid),
+             'sentiment_score': Tweet.UNSCORED if tid % 2 else 1, 'is_emergency': tid % 3 == 0}
+            for tid in range(1, 8)
+        ])
+        self.assertEqual(Tweet.objects.count(), 7)  # tid 1 was already stored
+        self.assertRollupsMatchTweets()
+
+        self.assertEqual(rescore_unscored(StubAnalyzer()), {'scored': 3, 'unscored': 0})
+        self.assertRollupsMatchTweets()
+
+        tweets = Tweet.objects.filter(tid__in=['5', '6']).order_by('tid')
+        before = [rollup_state(tweet) for tweet in tweets]
+        tweets.update(is_emergency=False, timestamp=START)
+        apply_changes(zip(before, [rollup_state(tweet) for tweet in tweets]))
+        self.assertRollupsMatchTweets()
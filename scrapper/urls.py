@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.dashboard, name='dashboard'),
+    path('tweets/', views.tweets_list, name='tweets_list'),
+    path('analyze/', views.analyze_tweet, name='analyze_tweet'),
+    path('analyze/async/', views.analyze_tweet_async, name='analyze_tweet_async'),
+    path('alerts/', views.emergency_alerts, name='emergency_alerts'),
+    path('archives/', views.archive_management, name='archive_management'),
+]
@@ -1,17 +1,45 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
 from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Avg, Count
-from django.core.paginator import Paginator
 from .models import Tweet, EmergencyAlert, TweetArchive
-from .sentiment import SentimentAnalyzer
+from .analytics import analytics_for_window
+from .pagination import keyset_paginate
+from .search import search_tweets
+from .sentiment import SentimentAnalyzer, get_async_analyzer
+from .coalescer import SentimentCoalescer, get_async_coalescer
+from config.azure_settings import (
+    AZURE_COGNITIVE_MAX_WORKERS,
+    SENTIMENT_COALESCE_BATCH_SIZE,
+    SENTIMENT_COALESCE_ENABLED,
+    SENTIMENT_COALESCE_MAX_WAIT_MS,
+)
+from asgiref.sync import sync_to_async
+from functools import wraps
 import logging
 import json
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 sentiment_analyzer = SentimentAnalyzer()
+sentiment_coalescer = SentimentCoalescer(
+    sentiment_analyzer,
+    max_batch_size=SENTIMENT_COALESCE_BATCH_SIZE,
+    max_wait=SENTIMENT_COALESCE_MAX_WAIT_MS / 1000,
+    max_in_flight=AZURE_COGNITIVE_MAX_WORKERS,
+)
+
+def async_login_required(view_func):
+    """login_required for async views, which Django's decorator does not support yet"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
 
 @login_required
 def dashboard(request):
@@ -28,18 +56,8 @@ def dashboard(request):
         else:
             start_time = timezone.now() - timedelta(hours=24)
 
-        # Get tweets within time range
-        tweets = Tweet.objects.filter(timestamp__gte=start_time)
-
-        # Calculate analytics
-        analytics = {
-            'total_tweets': tweets.count(),
-            'avg_sentiment': tweets.aggregate(Avg('sentiment_score'))['sentiment_score__avg'] or 0,
-            'emergency_count': tweets.filter(is_emergency=True).count(),
-            'sentiment_distribution': tweets.values('sentiment_score').annotate(
-                count=Count('sentiment_score')
-            ).order_by('sentiment_score'),
-        }
+        # Calculate analytics; longer ranges read the hourly rollups (at most 720 rows)
+        analytics = analytics_for_window(start_time, use_rollups=time_range in ('7d', '30d'))
 
         # Get recent emergency alerts
         emergency_alerts = EmergencyAlert.objects.filter(
@@ -76,12 +94,12 @@ def tweets_list(request):
         if emergency:
             tweets = tweets.filter(is_emergency=emergency.lower() == 'true')
         if search:
-            tweets = tweets.filter(tweet__icontains=search)
+            tweets = search_tweets(tweets, search)
             
         # Pagination
-        page = request.GET.get('page', 1)
-        paginator = Paginator(tweets, 25)
-        tweets_page = paginator.get_page(page)
+        tweets_page = keyset_paginate(
+            tweets, 25, token=request.GET.get('cursor'), estimate_total=True,
+        )
         
         context = {
             'tweets': tweets_page,
@@ -111,8 +129,51 @@ def analyze_tweet(request):
         if not tweet_text:
             return JsonResponse({'error': 'Tweet text is required'}, status=400)
             
-        # Analyze sentiment
-        score, confidence = sentiment_analyzer.analyze_sentiment(tweet_text)
+        # Analyze sentiment, batched with concurrent requests when coalescing is enabled.
+        # Under ASGI sync views run one at a time, so there is nothing to batch with;
+        # analyze_tweet_async coalesces there instead.
+        if SENTIMENT_COALESCE_ENABLED and not isinstance(request, ASGIRequest):
+            score, confidence = sentiment_coalescer.analyze_sentiment(tweet_text)
+        else:
+            score, confidence = sentiment_analyzer.analyze_sentiment(tweet_text)
+        
+        return JsonResponse({
+            'sentiment_score': score,
+            'confidence': confidence,
+        })
+        
+    except Exception as e:
+        logger.error(f"Error analyzing tweet: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+@async_login_required
+async def analyze_tweet_async(request):
+    """
+    Async API endpoint for analyzing a single tweet. Served under ASGI it
+    awaits Azure without holding a worker thread for the round trip.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Only POST method is allowed'}, status=405)
+        
+    try:
+        data = json.loads(request.body)
+        tweet_text = data.get('tweet')
+        
+        if not tweet_text:
+            return JsonResponse({'error': 'Tweet text is required'}, status=400)
+            
+        # Analyze sentiment, sharing the result cache with the sync analyzer and
+        # batched with concurrent requests on this event loop when coalescing is enabled
+        if SENTIMENT_COALESCE_ENABLED:
+            analyzer = get_async_coalescer(
+                cache=sentiment_analyzer.cache,
+                max_batch_size=SENTIMENT_COALESCE_BATCH_SIZE,
+                max_wait=SENTIMENT_COALESCE_MAX_WAIT_MS / 1000,
+                max_in_flight=AZURE_COGNITIVE_MAX_WORKERS,
+            )
+        else:
+            analyzer = get_async_analyzer(cache=sentiment_analyzer.cache)
+        score, confidence = await analyzer.analyze_sentiment(tweet_text)
         
         return JsonResponse({
             'sentiment_score': score,
@@ -154,9 +215,9 @@ def emergency_alerts(request):
             alerts = alerts.filter(alert_level=level)
             
         # Pagination
-        page = request.GET.get('page', 1)
-        paginator = Paginator(alerts, 20)
-        alerts_page = paginator.get_page(page)
+        alerts_page = keyset_paginate(
+            alerts, 20, token=request.GET.get('cursor'), estimate_total=True,
+        )
         
         context = {
             'alerts': alerts_page,
@@ -201,11 +262,19 @@ def archive_management(request):
                 # Delete archive (implement if needed)
                 pass
                 
-        # List available archives
-        archives = archive_handler.list_archives()
+        # Archives come from the cached manifest, optionally narrowed to one day
+        date = request.GET.get('date')
+        if date:
+            day = timezone.make_aware(datetime.strptime(date, '%Y-%m-%d'), timezone.utc)
+            archives = archive_handler.find_archives(day, day + timedelta(days=1) - timedelta(microseconds=1))
+        else:
+            archives = archive_handler.manifest.entries()
         
         context = {
             'archives': archives,
+            'filters': {
+                'date': date,
+            }
         }
         
         return render(request, 'dashboard/archives.html', context)